@@ -0,0 +1,6 @@
+import sys
+
+from src.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,516 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.portfolio_engine import MultiAssetRotationEngine
+from src.regime_engine import RegimeEngine
+from src.risk_engine import RiskEngine
+from src.trend_engine import TrendEngine
+from src.vol_target_engine import VolTargetEngine
+from src.walk_forward import WalkForwardEngine
+
+
+# ============================
+# CONFIG
+# ============================
+
+BENCHMARK_DIR = "benchmarks"
+
+DEFAULT_YEARS = (10, 25, 50, 100)
+
+DEFAULT_ASSETS = (3, 50, 500)
+
+# Same schema (and column order) as data_processed/macro_v4_clean.csv
+PANEL_COLUMNS = [
+    "US10Y", "FEDFUNDS", "DXY", "OIL", "USDINR",
+    "US_M2", "ECB_ASSETS", "NIFTY", "GLD", "SPY", "NIFTY_RET"
+]
+
+CORE_ASSETS = ["NIFTY", "SPY", "GLD"]
+
+# Slowdown (current / baseline) flagged as a regression
+REGRESSION_THRESHOLD = 1.25
+
+# Stages faster than this are timer noise, never flagged
+MIN_SECONDS = 0.01
+
+
+# ======================================
+# SYNTHETIC PANELS
+# ======================================
+
+def synthetic_asset_names(n_assets: int):
+
+    """
+    NIFTY, SPY, GLD followed by EQ004, EQ005, ... up to n_assets.
+    """
+
+    if n_assets < len(CORE_ASSETS):
+        raise ValueError(f"n_assets must be >= {len(CORE_ASSETS)}.")
+
+    extra = [f"EQ{i:03d}" for i in range(len(CORE_ASSETS) + 1, n_assets + 1)]
+
+    return CORE_ASSETS + extra
+
+
+def synthetic_panel(
+    years: int = 10,
+    n_assets: int = 3,
+    seed: int = 0,
+    start: str = "1990-01-01"
+) -> pd.DataFrame:
+
+    """
+    Deterministic daily panel with the macro_v4_clean schema.
+
+    - calendar days, weekends carried forward (as the CSV)
+    - rates / FX / oil as bounded random walks
+    - US_M2 monthly and ECB_ASSETS weekly step series with a
+      slowly switching growth regime, so every regime state occurs
+    - asset prices as geometric random walks with a common factor;
+      assets beyond NIFTY, SPY, GLD are appended as EQ004 ...
+
+    Same (years, n_assets, seed) → identical panel.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    index = pd.date_range(
+        start,
+        periods=int(round(years * 365.25)),
+        freq="D"
+    )
+
+    n = len(index)
+
+    trading = index.dayofweek < 5
+
+    def walk(level, step, low, high):
+
+        path = level + np.cumsum(rng.normal(0.0, step, n))
+
+        return np.clip(path, low, high)
+
+    data = {
+
+        "US10Y": walk(4.0, 0.04, 0.1, 12.0),
+        "FEDFUNDS": walk(3.0, 0.02, 0.0, 12.0),
+        "DXY": walk(95.0, 0.4, 60.0, 140.0),
+        "OIL": walk(60.0, 1.0, 10.0, 200.0),
+        "USDINR": walk(60.0, 0.2, 30.0, 120.0),
+
+    }
+
+    # -----------------------------------
+    # Liquidity: regime switching growth
+    # -----------------------------------
+    months = np.asarray(index.year * 12 + index.month)
+    months -= months[0]
+
+    regime_growth = rng.choice(
+        [-0.004, 0.002, 0.006, 0.012],
+        size=months[-1] // 24 + 1
+    )
+
+    monthly_growth = (
+        regime_growth[np.arange(months[-1] + 1) // 24]
+        + rng.normal(0.0, 0.002, months[-1] + 1)
+    )
+
+    data["US_M2"] = 3500.0 * np.cumprod(1 + monthly_growth)[months]
+
+    weeks = (np.arange(n) // 7)
+
+    weekly_growth = (
+        regime_growth[months[::7] // 24] / 4
+        + rng.normal(0.0, 0.003, weeks[-1] + 1)
+    )
+
+    data["ECB_ASSETS"] = 1e6 * np.cumprod(1 + weekly_growth)[weeks]
+
+    # -----------------------------------
+    # Assets: one factor + idiosyncratic
+    # -----------------------------------
+    names = synthetic_asset_names(n_assets)
+
+    factor = rng.normal(0.0003, 0.008, n)
+
+    beta = rng.uniform(0.5, 1.5, n_assets)
+    beta[names.index("GLD")] = 0.1
+
+    noise = rng.normal(0.0, 0.01, (n, n_assets))
+
+    returns = np.where(
+        trading[:, None],
+        factor[:, None] * beta[None, :] + noise,
+        0.0
+    )
+
+    prices = 100.0 * np.cumprod(1 + returns, axis=0)
+
+    panel = pd.concat(
+        [
+            pd.DataFrame(data, index=index),
+            pd.DataFrame(prices, index=index, columns=names)
+        ],
+        axis=1
+    )
+
+    panel["NIFTY_RET"] = panel["NIFTY"].pct_change()
+
+    columns = PANEL_COLUMNS + names[len(CORE_ASSETS):]
+
+    return panel[columns]
+
+
+# ======================================
+# MEASUREMENT
+# ======================================
+
+def _measure(func, repeats):
+
+    """
+    Best-of-N wall time, then one traced call for peak memory
+    (tracemalloc slows the call, so it is timed separately).
+    Engine diagnostics printed to stdout are discarded.
+    """
+
+    timings = []
+
+    with contextlib.redirect_stdout(io.StringIO()):
+
+        for _ in range(repeats):
+
+            start = time.perf_counter()
+
+            func()
+
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return min(timings), peak / 2 ** 20
+
+
+def _stages(df, assets, warmup_years):
+
+    """
+    (engine, stage, callable) for every engine and every
+    backtest stage. Each callable is self contained; inputs it
+    needs from earlier stages are built here, untimed.
+    """
+
+    # -----------------------------------
+    # Untimed inputs
+    # -----------------------------------
+    base = MultiAssetRotationEngine(df=df, assets=assets)
+    base.backtest()
+
+    regime = RegimeEngine()
+    regime.fit(df)
+
+    raw_weights = base.weights.copy()
+
+    raw_returns = (
+        (base.weights * base.monthly_returns.loc[base.weights.index])
+        .sum(axis=1)
+    )
+
+    def portfolio_after(*steps):
+
+        engine = MultiAssetRotationEngine(df=df, assets=assets)
+
+        for step in steps:
+            getattr(engine, step)()
+
+        return engine
+
+    monthly = portfolio_after("_build_monthly_data")
+    with_regime = portfolio_after("_build_monthly_data", "_build_regime")
+    with_momentum = portfolio_after(
+        "_build_monthly_data", "_build_regime", "_build_momentum"
+    )
+    with_weights = portfolio_after(
+        "_build_monthly_data", "_build_regime",
+        "_build_momentum", "_generate_weights"
+    )
+
+    trend = TrendEngine()
+
+    def risk_full():
+
+        engine = RiskEngine(returns=base.monthly_returns)
+        engine.apply_inverse_vol_weights(raw_weights)
+
+    def trend_all():
+
+        for asset in assets:
+            trend.generate_signal(base.monthly_prices[asset])
+
+    return [
+
+        ("RegimeEngine", "fit", lambda: RegimeEngine().fit(df)),
+        ("RegimeEngine", "predict", lambda: regime.predict(df)),
+
+        ("RiskEngine", "compute_volatility",
+         lambda: RiskEngine(returns=base.monthly_returns).compute_volatility()),
+        ("RiskEngine", "apply_inverse_vol_weights", risk_full),
+
+        ("VolTargetEngine", "apply_vol_targeting",
+         lambda: VolTargetEngine().apply_vol_targeting(raw_returns)),
+        ("VolTargetEngine", "apply_vol_targeting_assets",
+         lambda: VolTargetEngine().apply_vol_targeting(base.monthly_returns)),
+
+        ("TrendEngine", "generate_signal", trend_all),
+
+        ("MultiAssetRotationEngine", "_build_monthly_data",
+         lambda: MultiAssetRotationEngine(df=df, assets=assets)
+         ._build_monthly_data()),
+        ("MultiAssetRotationEngine", "_build_regime",
+         lambda: monthly._build_regime()),
+        ("MultiAssetRotationEngine", "_build_momentum",
+         lambda: with_regime._build_momentum()),
+        ("MultiAssetRotationEngine", "_generate_weights",
+         lambda: with_momentum._generate_weights()),
+        ("MultiAssetRotationEngine", "_build_portfolio_returns",
+         lambda: with_weights._build_portfolio_returns()),
+        ("MultiAssetRotationEngine", "backtest",
+         lambda: MultiAssetRotationEngine(df=df, assets=assets).backtest()),
+        ("MultiAssetRotationEngine", "backtest_daily",
+         lambda: base.backtest_daily()),
+
+        ("WalkForwardEngine", "run",
+         lambda: WalkForwardEngine(df, warmup_years=warmup_years).run()),
+        ("WalkForwardEngine", "run_portfolio_backtest",
+         lambda: WalkForwardEngine(
+             df, warmup_years=warmup_years
+         ).run_portfolio_backtest(
+             assets=assets, incremental=True
+         )),
+
+    ]
+
+
+def run_benchmarks(
+    years=DEFAULT_YEARS,
+    n_assets=DEFAULT_ASSETS,
+    repeats: int = 3,
+    seed: int = 0,
+    engines=None
+) -> pd.DataFrame:
+
+    """
+    Time and memory-profile every engine stage on synthetic
+    panels of each (years, n_assets) size.
+
+    engines : optional subset of engine names to run.
+
+    Returns one row per (years, n_assets, engine, stage) with
+    best-of-``repeats`` seconds and traced peak MB.
+    """
+
+    rows = []
+
+    for n_years in years:
+
+        for n in n_assets:
+
+            df = synthetic_panel(years=n_years, n_assets=n, seed=seed)
+
+            assets = synthetic_asset_names(n)
+
+            # Short panels still get out-of-sample splits
+            warmup_years = min(10, n_years // 2)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                stages = _stages(df, assets, warmup_years)
+
+            for engine, stage, func in stages:
+
+                if engines is not None and engine not in engines:
+                    continue
+
+                seconds, peak_mb = _measure(func, repeats)
+
+                rows.append({
+
+                    "years": n_years,
+                    "n_assets": n,
+                    "rows": len(df),
+                    "engine": engine,
+                    "stage": stage,
+                    "seconds": seconds,
+                    "peak_mb": peak_mb
+
+                })
+
+                print(
+                    f"{n_years:>4}y {n:>4} assets  "
+                    f"{engine}.{stage}: "
+                    f"{seconds * 1e3:.1f} ms, {peak_mb:.1f} MB"
+                )
+
+    return pd.DataFrame(rows)
+
+
+# ======================================
+# RESULTS (JSON)
+# ======================================
+
+def environment_info() -> dict:
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+
+        "timestamp": pd.Timestamp.now("UTC").isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+
+    }
+
+
+def save_results(results: pd.DataFrame, path: str):
+
+    """
+    Write results with environment metadata as JSON:
+    {"meta": {...}, "results": [{...}, ...]}
+    """
+
+    directory = os.path.dirname(path)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    payload = {
+        "meta": environment_info(),
+        "results": results.to_dict(orient="records")
+    }
+
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def load_results(path: str) -> pd.DataFrame:
+
+    with open(path) as f:
+        payload = json.load(f)
+
+    return pd.DataFrame(payload["results"])
+
+
+def compare_results(
+    baseline: pd.DataFrame,
+    current: pd.DataFrame,
+    threshold: float = REGRESSION_THRESHOLD,
+    min_seconds: float = MIN_SECONDS
+) -> pd.DataFrame:
+
+    """
+    Join two result tables on (years, n_assets, engine, stage).
+
+    ratio > threshold (on stages slower than min_seconds in the
+    current run) marks a regression.
+    """
+
+    keys = ["years", "n_assets", "engine", "stage"]
+
+    merged = baseline[keys + ["seconds", "peak_mb"]].merge(
+        current[keys + ["seconds", "peak_mb"]],
+        on=keys,
+        suffixes=("_baseline", "_current")
+    )
+
+    merged["ratio"] = merged["seconds_current"] / merged["seconds_baseline"]
+
+    merged["memory_ratio"] = (
+        merged["peak_mb_current"] / merged["peak_mb_baseline"]
+    )
+
+    merged["regression"] = (
+        (merged["ratio"] > threshold)
+        & (merged["seconds_current"] > min_seconds)
+    )
+
+    return merged
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark every engine on synthetic panels."
+    )
+
+    parser.add_argument("--years", type=int, nargs="+", default=list(DEFAULT_YEARS))
+    parser.add_argument("--assets", type=int, nargs="+", default=list(DEFAULT_ASSETS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", nargs="+", default=None)
+    parser.add_argument("--output", default=None)
+    parser.add_argument(
+        "--baseline", default=None,
+        help="earlier results JSON; exit 1 on regressions"
+    )
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        years=args.years,
+        n_assets=args.assets,
+        repeats=args.repeats,
+        seed=args.seed,
+        engines=args.engines
+    )
+
+    output = args.output or os.path.join(
+        BENCHMARK_DIR,
+        f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+
+    save_results(results, output)
+
+    print(f"Results written: {output}")
+
+    if args.baseline is not None:
+
+        comparison = compare_results(
+            load_results(args.baseline),
+            results,
+            threshold=args.threshold
+        )
+
+        regressions = comparison[comparison["regression"]]
+
+        print(comparison.to_string(index=False))
+
+        if not regressions.empty:
+
+            print(f"{len(regressions)} regression(s) above {args.threshold}x")
+
+            raise SystemExit(1)
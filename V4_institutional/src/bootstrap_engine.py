@@ -0,0 +1,243 @@
+import numpy as np
+import pandas as pd
+
+from src.metrics import batch_metrics
+from src.portfolio_engine import allocation_weights
+from src.risk_engine import inverse_vol_scale
+from src.rolling import rolling_std
+from src.vol_target_engine import VolTargetEngine
+
+
+class BootstrapEngine:
+    """
+    Block Bootstrap Robustness Engine
+
+    Resamples monthly history into many synthetic paths (one 2-D
+    index array) and evaluates every path in batched array passes:
+
+    - resample_returns : a strategy return stream (e.g. OOS returns)
+    - run_strategy     : asset returns + regimes, re-running the
+                         allocation, inverse vol, cost and vol
+                         target overlays on every path
+
+    Blocks keep serial dependence (vol clustering, momentum) that
+    an i.i.d. resample would destroy. Paths are processed in
+    chunks of ``chunk_size`` to bound memory.
+    """
+
+    def __init__(
+        self,
+        n_paths=10000,
+        block_size=6,
+        method="stationary",
+        chunk_size=2000,
+        seed=None
+    ):
+
+        if method not in ("stationary", "moving"):
+            raise ValueError(
+                "method must be 'stationary' or 'moving'."
+            )
+
+        self.n_paths = n_paths
+        self.block_size = block_size
+        self.method = method
+        self.chunk_size = chunk_size
+        self.seed = seed
+
+        self.metrics = None
+
+    # --------------------------------------------------
+    # Resampling Indices (paths × length)
+    # --------------------------------------------------
+    def sample_indices(self, n_obs, n_paths, length, rng):
+
+        """
+        Stationary (Politis-Romano, geometric block lengths with
+        mean ``block_size``) or moving block bootstrap; blocks wrap
+        around the end of the sample.
+        """
+
+        t = np.arange(length)
+
+        if self.method == "stationary":
+
+            new_block = rng.random((n_paths, length)) < 1 / self.block_size
+            new_block[:, 0] = True
+
+            block_start = np.maximum.accumulate(
+                np.where(new_block, t, 0),
+                axis=1
+            )
+
+        else:
+
+            block_start = np.broadcast_to(
+                (t // self.block_size) * self.block_size,
+                (n_paths, length)
+            )
+
+        starts = rng.integers(0, n_obs, size=(n_paths, length))
+
+        first = np.take_along_axis(starts, block_start, axis=1)
+
+        return (first + (t - block_start)) % n_obs
+
+    def _chunks(self, n_obs, length):
+
+        rng = np.random.default_rng(self.seed)
+
+        for done in range(0, self.n_paths, self.chunk_size):
+
+            n = min(self.chunk_size, self.n_paths - done)
+
+            yield self.sample_indices(n_obs, n, length, rng)
+
+    # --------------------------------------------------
+    # Strategy Return Stream
+    # --------------------------------------------------
+    def resample_returns(self, returns, length=None, periods_per_year=12):
+
+        """
+        Bootstrap a single return series (e.g. WalkForwardEngine
+        OOS returns). Returns one metrics row per path.
+        """
+
+        values = pd.Series(returns).dropna().to_numpy(dtype=float)
+
+        length = length or len(values)
+
+        results = []
+
+        for idx in self._chunks(len(values), length):
+
+            results.append(
+                batch_metrics(values[idx].T, periods_per_year=periods_per_year)
+            )
+
+        self.metrics = pd.concat(results, ignore_index=True)
+
+        return self.metrics
+
+    # --------------------------------------------------
+    # Full Strategy on Resampled Assets
+    # --------------------------------------------------
+    def run_strategy(self, portfolio, length=None):
+
+        """
+        Bootstrap the monthly asset returns of a backtested (or
+        prepared) MultiAssetRotationEngine jointly with its monthly
+        regime states, then rebuild momentum and rerun allocation,
+        inverse vol, costs and vol targeting on every path.
+        """
+
+        if portfolio.monthly_returns is None or portfolio.regime_monthly is None:
+
+            raise RuntimeError(
+                "Portfolio must be backtested before bootstrapping."
+            )
+
+        assets = list(portfolio.assets)
+
+        index = portfolio.monthly_returns.index.intersection(
+            portfolio.regime_monthly.index
+        )
+
+        returns = portfolio.monthly_returns.loc[index, assets].to_numpy(dtype=float)
+        states = portfolio.regime_monthly.loc[index].to_numpy(dtype=float)
+
+        equity_cols, defensive_cols = portfolio.sleeve_columns()
+
+        length = length or len(returns)
+
+        vol_target = VolTargetEngine(
+            target_vol=portfolio.vol_target_engine.target_vol,
+            lookback=portfolio.vol_target_engine.lookback
+        )
+
+        results = []
+
+        for idx in self._chunks(len(returns), length):
+
+            # time first: (months, paths, assets)
+            path_returns = returns[idx.T]
+            path_states = states[idx.T]
+
+            # -----------------------------------
+            # Momentum from resampled prices
+            # -----------------------------------
+            prices = np.ones((length + 1,) + path_returns.shape[1:])
+            prices[1:] = np.cumprod(1 + path_returns, axis=0)
+
+            momentum = np.full(path_returns.shape, np.nan)
+            momentum[portfolio.lookback - 1:] = (
+                prices[portfolio.lookback:]
+                / prices[:length + 1 - portfolio.lookback]
+                - 1
+            )
+
+            # -----------------------------------
+            # Allocation → shift → inverse vol
+            # -----------------------------------
+            vol = rolling_std(path_returns, portfolio.vol_lookback) * np.sqrt(12)
+
+            weights = allocation_weights(
+                momentum,
+                path_states,
+                portfolio.allocation_table,
+                equity_cols,
+                defensive_cols,
+                top_k=portfolio.top_k,
+                weighting=portfolio.selection_weighting,
+                vol=vol
+            )
+
+            weights[1:] = weights[:-1].copy()
+            weights[0] = 0.0
+
+            weights = inverse_vol_scale(weights, vol)
+
+            # -----------------------------------
+            # Returns, costs, vol target
+            # -----------------------------------
+            gross = (weights * path_returns).sum(axis=-1)
+
+            # cost engine works on (paths, months, assets)
+            turnover, cost = portfolio.cost_engine.costs(
+                weights.swapaxes(0, 1),
+                assets=assets
+            )
+
+            turnover = turnover.T
+
+            raw = pd.DataFrame(gross - cost.T)
+
+            net = vol_target.apply_vol_targeting(raw)
+
+            results.append(
+                batch_metrics(net, turnover=turnover)
+            )
+
+        self.metrics = pd.concat(results, ignore_index=True)
+
+        return self.metrics
+
+    # --------------------------------------------------
+    # Distribution Summary
+    # --------------------------------------------------
+    def summary(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+
+        """
+        Quantiles of every metric across paths.
+        """
+
+        if self.metrics is None:
+            raise RuntimeError("Run a bootstrap first.")
+
+        table = self.metrics.quantile(list(quantiles)).T
+
+        table.columns = [f"q{int(q * 100):02d}" for q in quantiles]
+
+        table["mean"] = self.metrics.mean()
+
+        return table
@@ -0,0 +1,783 @@
+"""
+Command line entry point: python -m src <command>
+
+    fetch        download / refresh data and rebuild the panel
+    backtest     full-sample MultiAssetRotationEngine backtest
+    walkforward  out-of-sample walk-forward portfolio backtest
+    sweep        batched parameter sweep
+    optimize     walk-forward regime threshold / smoothing search
+    runs         list / filter stored runs (backtest, walkforward --store)
+    serve        local HTTP service for the current regime / weights
+
+Only argparse / logging load at startup. pandas and the engines
+are imported inside the command that runs, and network clients
+(yfinance, fredapi) only by fetch, so backtest-only workers never
+load them.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+
+DEFAULT_ASSETS = ["NIFTY", "SPY", "GLD"]
+
+
+# ======================================
+# SHARED HELPERS
+# ======================================
+
+def _root(args):
+
+    from src.data_pipeline import find_project_root
+
+    return args.root or find_project_root()
+
+
+def _load_panel(args, align=False):
+
+    """
+    The full macro panel, as the engines take it from a script.
+    align=True starts it at the first date with every asset priced
+    (the walk-forward history).
+    """
+
+    from src.data_pipeline import load_macro_panel
+
+    df = load_macro_panel(_root(args))
+
+    if not align:
+        return df
+
+    # Align portfolio history to asset availability
+    asset_start = df[args.assets].dropna().index[0]
+
+    return df.loc[asset_start:]
+
+
+def _pipeline(args):
+
+    """
+    Cached intermediates (--cache), persisted under the project's
+    data_processed/cache.
+    """
+
+    if not args.cache:
+        return None
+
+    from src.data_pipeline import CACHE_DIR, ArtifactCache, strategy_pipeline
+
+    return strategy_pipeline(
+        ArtifactCache(os.path.join(_root(args), CACHE_DIR))
+    )
+
+
+def _report(args):
+
+    from src.profiling import PipelineReport
+
+    return PipelineReport(trace_memory=args.trace_memory)
+
+
+def _cost_engine(args, transaction_cost=0.0):
+
+    """
+    CostEngine with --spread / --impact, or None (proportional
+    transaction_cost only).
+    """
+
+    if not (args.spread or args.impact):
+        return None
+
+    from src.cost_engine import CostEngine
+
+    return CostEngine(
+        proportional=transaction_cost,
+        spread=args.spread,
+        impact=args.impact
+    )
+
+
+def _regime_model(args):
+
+    if args.regime == "zscore":
+        return None
+
+    from src.hmm_regime_engine import HMMRegimeEngine
+
+    return HMMRegimeEngine()
+
+
+def _run_store(args):
+
+    """
+    RunStore (--store) under the project's data_processed/runs.
+    """
+
+    if not args.store:
+        return None
+
+    from src.run_store import RUNS_DIR, RunStore
+
+    return RunStore(os.path.join(_root(args), RUNS_DIR))
+
+
+def _compute_dtype(args):
+
+    return "float32" if args.float32 else "float64"
+
+
+def _splits(args):
+
+    return dict(
+        warmup_years=args.warmup_years,
+        window=args.window,
+        train_years=args.train_years,
+        test_months=args.test_months,
+        purge_days=args.purge_days,
+        embargo_days=args.embargo_days
+    )
+
+
+def _peak(report):
+
+    if report.peak_mb is not None:
+        print(f"peak traced memory: {report.peak_mb:.1f} MB", file=sys.stderr)
+
+
+def _stored(run):
+
+    print(f"run {run['meta']['run_id']}", file=sys.stderr)
+
+    return run
+
+
+def _emit(table, output):
+
+    """
+    Print a result table, or write it (.csv / .json) to ``output``.
+    """
+
+    if output is None:
+
+        print(table.to_string())
+
+    elif output.endswith(".json"):
+
+        table.to_json(output, orient="table", indent=2)
+
+    else:
+
+        table.to_csv(output)
+
+
+def _metrics(returns, turnover=None, periods_per_year=12):
+
+    from src.metrics import batch_metrics
+
+    return batch_metrics(
+        returns,
+        turnover=turnover,
+        periods_per_year=periods_per_year
+    ).T
+
+
+# ======================================
+# COMMANDS
+# ======================================
+
+def cmd_fetch(args):
+
+    from src import fetch_macro_data
+
+    # fetch writes data_raw/ and data_processed/ under the root
+    if args.root:
+        os.chdir(args.root)
+
+    try:
+        providers = fetch_macro_data.default_providers(args.fred_api_key)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    fetch_macro_data.fetch_all(
+        refresh=args.refresh,
+        providers=providers
+    )
+
+
+def cmd_backtest(args):
+
+    from src.portfolio_engine import (
+        MultiAssetRotationEngine,
+        rebalance_comparison,
+    )
+
+    df = _load_panel(args)
+
+    settings = dict(
+
+        assets=args.assets,
+        lookback=args.lookback,
+        transaction_cost=args.transaction_cost,
+        defensive_assets=args.defensive,
+        top_k=args.top_k,
+        selection_weighting=args.weighting,
+        target_vol=args.target_vol,
+        pipeline=_pipeline(args),
+        report=_report(args),
+        compute_dtype=_compute_dtype(args),
+        cost_engine=_cost_engine(args, args.transaction_cost),
+        regime_model=_regime_model(args)
+
+    )
+
+    store = _run_store(args)
+
+    if store is not None and (args.daily or args.rebalance == "compare"):
+        raise SystemExit("--store keeps monthly / event runs only")
+
+    if args.rebalance == "compare":
+
+        if args.daily:
+            raise SystemExit("--daily does not combine with --rebalance compare")
+
+        _emit(
+            rebalance_comparison(df, drift_band=args.drift_band, **settings),
+            args.output
+        )
+
+        return
+
+    if store is not None:
+
+        from src.run_store import backtest_run
+
+        run = _stored(backtest_run(
+            df,
+            store=store,
+            rebalance=args.rebalance,
+            drift_band=args.drift_band,
+            **settings
+        ))
+
+        _emit(
+            _metrics(run["returns"].rename("value"), turnover=run["turnover"]),
+            args.output
+        )
+
+        settings["report"].log_summary()
+
+        _peak(settings["report"])
+
+        return
+
+    engine = MultiAssetRotationEngine(
+        df=df,
+        rebalance=args.rebalance,
+        drift_band=args.drift_band,
+        **settings
+    )
+
+    engine.backtest()
+
+    if args.daily:
+
+        engine.backtest_daily()
+
+        returns = engine.daily_returns
+
+        # observed rows per year (the panel keeps some weekends)
+        years = (returns.index[-1] - returns.index[0]).days / 365.25
+
+        table = _metrics(
+            returns.rename("value"),
+            turnover=engine.daily_turnover,
+            periods_per_year=len(returns) / years
+        )
+
+    else:
+
+        table = _metrics(
+            engine.portfolio_returns.rename("value"),
+            turnover=engine.turnover
+        )
+
+    _emit(table, args.output)
+
+    engine.report.log_summary()
+
+    _peak(engine.report)
+
+
+def cmd_walkforward(args):
+
+    from src.walk_forward import WalkForwardEngine
+
+    df = _load_panel(args, align=True)
+
+    splits = dict(
+        pipeline=_pipeline(args),
+        report=_report(args),
+        regime_model=_regime_model(args),
+        **_splits(args)
+    )
+
+    backtest = dict(
+
+        assets=args.assets,
+        lookback=args.lookback,
+        transaction_cost=args.transaction_cost,
+        incremental=not args.full_refit,
+        n_jobs=args.n_jobs,
+        compute_dtype=_compute_dtype(args),
+        cost_engine=_cost_engine(args, args.transaction_cost)
+
+    )
+
+    store = _run_store(args)
+
+    if store is not None:
+
+        from src.run_store import walk_forward_run
+
+        run = _stored(
+            walk_forward_run(df, store=store, splits=splits, **backtest)
+        )
+
+        oos_returns = run["returns"]
+
+    else:
+
+        wf = WalkForwardEngine(data=df, **splits)
+
+        oos_returns = wf.run_portfolio_backtest(**backtest)
+
+    _emit(_metrics(oos_returns.rename("oos")), args.output)
+
+    splits["report"].log_summary()
+
+    _peak(splits["report"])
+
+
+def cmd_sweep(args):
+
+    from src.sweep_engine import ParameterSweepEngine
+
+    df = _load_panel(args)
+
+    sweep = ParameterSweepEngine(
+        df,
+        assets=args.assets,
+        defensive_assets=args.defensive,
+        top_k=args.top_k,
+        selection_weighting=args.weighting,
+        pipeline=_pipeline(args),
+        cost_engine=_cost_engine(args)
+    )
+
+    results = sweep.run(
+
+        lookback=args.lookback,
+        transaction_cost=args.transaction_cost,
+        target_vol=args.target_vol,
+        vol_lookback=args.vol_lookback,
+        start=args.start
+
+    )
+
+    results = results.sort_values("sharpe", ascending=False)
+
+    _emit(results, args.output)
+
+
+def cmd_optimize(args):
+
+    from src.regime_optimizer import RegimeOptimizer, threshold_grid
+
+    df = _load_panel(args, align=True)
+
+    optimizer = RegimeOptimizer(
+        df,
+        assets=args.assets,
+        lookback=args.lookback,
+        transaction_cost=args.transaction_cost,
+        metric=args.metric,
+        report=_report(args),
+        **_splits(args)
+    )
+
+    results = optimizer.run(
+        thresholds=threshold_grid(args.lows, args.mids, args.highs),
+        smoothing=args.smoothing,
+        weights=[(w, 1 - w) for w in args.us_weight],
+        n_jobs=args.n_jobs
+    )
+
+    _emit(results, args.output)
+
+    print(
+        _metrics(optimizer.oos_returns.rename("oos")).to_string(),
+        file=sys.stderr
+    )
+
+    optimizer.report.log_summary()
+
+
+def cmd_runs(args):
+
+    import json
+
+    from src.run_store import RUNS_DIR, RunStore
+
+    store = RunStore(os.path.join(_root(args), RUNS_DIR))
+
+    params = {}
+
+    for condition in args.where:
+
+        name, _, value = condition.partition("=")
+
+        try:
+            params[name.replace("-", "_")] = json.loads(value)
+        except ValueError:
+            params[name.replace("-", "_")] = value
+
+    runs = store.find(
+        kind=args.kind,
+        code_version=args.code_version,
+        since=args.since,
+        until=args.until,
+        **params
+    )
+
+    columns = [
+
+        "kind", "created", "git_commit", "start", "end",
+        "cagr", "sharpe", "max_drawdown", "annual_turnover"
+
+    ]
+
+    if not args.all_columns:
+        runs = runs[[c for c in columns if c in runs.columns]]
+
+    _emit(runs, args.output)
+
+
+def cmd_serve(args):
+
+    import asyncio
+
+    from src.signal_service import PanelFileSource, SignalService, SignalState
+
+    state = SignalState(
+
+        _load_panel(args),
+        fit_end=args.fit_end,
+        assets=args.assets,
+        defensive_assets=args.defensive,
+        lookback=args.lookback,
+        top_k=args.top_k,
+        selection_weighting=args.weighting
+
+    )
+
+    service = SignalService(
+
+        state,
+        host=args.host,
+        port=args.port,
+        source=PanelFileSource(_root(args)) if args.poll else None,
+        poll_seconds=args.poll
+
+    )
+
+    print(f"serving on http://{args.host}:{args.port}", file=sys.stderr)
+
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+# ======================================
+# PARSER
+# ======================================
+
+def build_parser():
+
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="V4 liquidity regime strategy."
+    )
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # -----------------------------------
+    # Shared options
+    # -----------------------------------
+    data = argparse.ArgumentParser(add_help=False)
+
+    data.add_argument(
+        "--root", default=None,
+        help="project root (default: nearest dir with data_processed/)"
+    )
+
+    data.add_argument(
+        "--log-level", default="WARNING",
+        help="DEBUG, INFO, WARNING (default) ..."
+    )
+
+    strategy = argparse.ArgumentParser(add_help=False, parents=[data])
+
+    strategy.add_argument("--assets", nargs="+", default=DEFAULT_ASSETS)
+    strategy.add_argument("--defensive", nargs="+", default=["GLD"])
+    strategy.add_argument("--output", default=None, help=".csv or .json")
+    strategy.add_argument(
+        "--cache", action="store_true",
+        help="reuse cached intermediates (data_processed/cache)"
+    )
+    strategy.add_argument(
+        "--spread", type=float, default=0.0,
+        help="bid-ask spread, half paid per unit traded"
+    )
+    strategy.add_argument(
+        "--impact", type=float, default=0.0,
+        help="square-root impact coefficient (cost = c * trade ** 1.5)"
+    )
+
+    engine = argparse.ArgumentParser(add_help=False, parents=[strategy])
+
+    engine.add_argument(
+        "--float32", action="store_true",
+        help="compact float32 panel (results within FLOAT32_TOLERANCE)"
+    )
+    engine.add_argument(
+        "--regime", default="zscore", choices=["zscore", "hmm"],
+        help="z-score buckets or a 4 state Gaussian HMM"
+    )
+    engine.add_argument(
+        "--trace-memory", action="store_true",
+        help="report the traced peak memory on stderr"
+    )
+    engine.add_argument(
+        "--store", action="store_true",
+        help="load the run from data_processed/runs, or run and save it"
+    )
+
+    splits = argparse.ArgumentParser(add_help=False)
+
+    splits.add_argument("--warmup-years", type=int, default=10)
+    splits.add_argument("--n-jobs", type=int, default=1)
+    splits.add_argument(
+        "--window", default="expanding", choices=["expanding", "rolling"]
+    )
+    splits.add_argument(
+        "--train-years", type=int, default=None,
+        help="rolling train window (default: --warmup-years)"
+    )
+    splits.add_argument("--test-months", type=int, default=12)
+    splits.add_argument("--purge-days", type=int, default=0)
+    splits.add_argument("--embargo-days", type=int, default=0)
+
+    # -----------------------------------
+    # fetch
+    # -----------------------------------
+    fetch = commands.add_parser("fetch", parents=[data], help="download data")
+
+    fetch.add_argument("--refresh", action="store_true")
+    fetch.add_argument(
+        "--fred-api-key", default=None,
+        help="default: $FRED_API_KEY"
+    )
+
+    fetch.set_defaults(func=cmd_fetch)
+
+    # -----------------------------------
+    # backtest
+    # -----------------------------------
+    backtest = commands.add_parser(
+        "backtest", parents=[engine], help="full-sample backtest"
+    )
+
+    backtest.add_argument("--lookback", type=int, default=12)
+    backtest.add_argument("--transaction-cost", type=float, default=0.001)
+    backtest.add_argument("--target-vol", type=float, default=0.10)
+    backtest.add_argument("--top-k", type=int, default=1)
+    backtest.add_argument(
+        "--weighting", default="equal",
+        choices=["equal", "rank", "inverse_vol"]
+    )
+    backtest.add_argument(
+        "--daily", action="store_true",
+        help="daily mode with intramonth weight drift"
+    )
+    backtest.add_argument(
+        "--rebalance", default="monthly",
+        choices=["monthly", "event", "compare"],
+        help="event: trade on regime / leader change or drift band "
+             "breach; compare: both, metrics side by side"
+    )
+    backtest.add_argument(
+        "--drift-band", type=float, default=0.05,
+        help="event mode: max weight drift before a rebalance"
+    )
+
+    backtest.set_defaults(func=cmd_backtest)
+
+    # -----------------------------------
+    # walkforward
+    # -----------------------------------
+    walkforward = commands.add_parser(
+        "walkforward", parents=[engine, splits], help="out-of-sample backtest"
+    )
+
+    walkforward.add_argument("--lookback", type=int, default=12)
+    walkforward.add_argument("--transaction-cost", type=float, default=0.001)
+    walkforward.add_argument(
+        "--full-refit", action="store_true",
+        help="rebuild the engine per split instead of incremental"
+    )
+
+    walkforward.set_defaults(func=cmd_walkforward)
+
+    # -----------------------------------
+    # sweep
+    # -----------------------------------
+    sweep = commands.add_parser(
+        "sweep", parents=[strategy], help="parameter sweep"
+    )
+
+    sweep.add_argument("--lookback", type=int, nargs="+", default=[12])
+    sweep.add_argument(
+        "--transaction-cost", type=float, nargs="+", default=[0.001]
+    )
+    sweep.add_argument("--target-vol", type=float, nargs="+", default=[0.10])
+    sweep.add_argument("--vol-lookback", type=int, nargs="+", default=[12])
+    sweep.add_argument("--top-k", type=int, default=1)
+    sweep.add_argument(
+        "--weighting", default="equal",
+        choices=["equal", "rank", "inverse_vol"]
+    )
+    sweep.add_argument("--start", default=None)
+
+    sweep.set_defaults(func=cmd_sweep)
+
+    # -----------------------------------
+    # optimize
+    # -----------------------------------
+    optimize = commands.add_parser(
+        "optimize", parents=[data, splits],
+        help="walk-forward regime parameter search"
+    )
+
+    optimize.add_argument("--assets", nargs="+", default=DEFAULT_ASSETS)
+    optimize.add_argument("--lookback", type=int, default=12)
+    optimize.add_argument("--transaction-cost", type=float, default=0.001)
+    optimize.add_argument("--output", default=None, help=".csv or .json")
+    optimize.add_argument(
+        "--trace-memory", action="store_true",
+        help="report the traced peak memory on stderr"
+    )
+    optimize.add_argument(
+        "--lows", type=float, nargs="+", default=[-1.5, -1.0, -0.5]
+    )
+    optimize.add_argument(
+        "--mids", type=float, nargs="+", default=[-0.25, 0.0, 0.25]
+    )
+    optimize.add_argument(
+        "--highs", type=float, nargs="+", default=[0.5, 1.0, 1.5]
+    )
+    optimize.add_argument("--smoothing", type=int, nargs="+", default=[3])
+    optimize.add_argument(
+        "--us-weight", type=float, nargs="+", default=[0.5],
+        help="US M2 weight of the composite (ECB assets: 1 - w)"
+    )
+    optimize.add_argument(
+        "--metric", default="sharpe",
+        help="batch_metrics column maximised on the training months"
+    )
+
+    optimize.set_defaults(func=cmd_optimize)
+
+    # -----------------------------------
+    # runs
+    # -----------------------------------
+    runs = commands.add_parser(
+        "runs", parents=[data], help="list stored runs"
+    )
+
+    runs.add_argument("--kind", default=None, choices=["backtest", "walkforward"])
+    runs.add_argument(
+        "--where", nargs="+", default=[], metavar="PARAM=VALUE",
+        help="parameter filters, e.g. lookback=12 window=rolling"
+    )
+    runs.add_argument(
+        "--code-version", default=None,
+        help="git commit or source hash prefix"
+    )
+    runs.add_argument("--since", default=None, help="created on / after")
+    runs.add_argument("--until", default=None, help="created on / before")
+    runs.add_argument(
+        "--all-columns", action="store_true",
+        help="include every stored parameter"
+    )
+    runs.add_argument("--output", default=None, help=".csv or .json")
+
+    runs.set_defaults(func=cmd_runs)
+
+    # -----------------------------------
+    # serve
+    # -----------------------------------
+    serve = commands.add_parser(
+        "serve", parents=[data], help="signal HTTP service"
+    )
+
+    serve.add_argument("--assets", nargs="+", default=DEFAULT_ASSETS)
+    serve.add_argument("--defensive", nargs="+", default=["GLD"])
+    serve.add_argument("--lookback", type=int, default=12)
+    serve.add_argument("--top-k", type=int, default=1)
+    serve.add_argument(
+        "--weighting", default="equal",
+        choices=["equal", "rank", "inverse_vol"]
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument(
+        "--fit-end", default=None,
+        help="last date of the regime training window (default: all)"
+    )
+    serve.add_argument(
+        "--poll", type=float, default=None,
+        help="seconds between checks of the panel CSV for new rows"
+    )
+
+    serve.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+
+    args = build_parser().parse_args(argv)
+
+    level = getattr(logging, str(args.log_level).upper(), None)
+
+    if not isinstance(level, int):
+        raise SystemExit(f"Unknown log level: {args.log_level}")
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s"
+    )
+
+    logging.getLogger("src").setLevel(level)
+
+    args.func(args)
+
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
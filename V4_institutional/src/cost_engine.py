@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+
+def trades(weights, initial=None):
+
+    """
+    Absolute weight changes per asset, (..., dates, assets).
+
+    The first date trades from ``initial`` (e.g. cash = 0) when
+    given, otherwise it is 0 like weights.diff().fillna(0).
+    """
+
+    weights = np.asarray(weights, dtype=float)
+
+    out = np.empty(weights.shape)
+
+    np.subtract(
+        weights[..., 1:, :],
+        weights[..., :-1, :],
+        out=out[..., 1:, :]
+    )
+
+    if initial is None:
+        out[..., 0, :] = 0.0
+    else:
+        out[..., 0, :] = weights[..., 0, :] - initial
+
+    return np.abs(out, out=out)
+
+
+class CostEngine:
+    """
+    Transaction Cost Engine
+
+    One cost model for every backtest path. Per date, with
+    t = |Δw| per asset (turnover = Σ t):
+
+        cost = Σ t · (proportional + spread / 2)     linear
+             + Σ impact · t ** 1.5                   square-root impact
+
+    - proportional : commission / fee per unit traded
+    - spread       : quoted bid-ask spread (half paid per trade)
+    - impact       : square-root impact coefficient, see
+                     impact_coefficient()
+
+    Each parameter is a scalar, a sequence aligned to the assets,
+    a dict asset → value (missing assets 0) or an array that
+    broadcasts against (dates, assets) for time varying costs.
+
+    Weights may carry any leading axes (paths, configurations):
+    turnover and costs come out of one array pass.
+    """
+
+    def __init__(
+        self,
+        proportional=0.001,
+        spread=0.0,
+        impact=0.0
+    ):
+
+        self.proportional = proportional
+        self.spread = spread
+        self.impact = impact
+
+    @staticmethod
+    def impact_coefficient(volatility, adv, aum=1.0, k=1.0):
+
+        """
+        Square-root law coefficient k · σ · sqrt(AUM / ADV).
+
+        Trading a weight change t costs σ · k · sqrt(t · AUM / ADV)
+        per unit traded, i.e. coefficient · t ** 1.5 of NAV.
+        ``volatility`` is the per period vol, ``adv`` the average
+        traded value per period in the same currency as ``aum``.
+        """
+
+        return k * np.asarray(volatility, dtype=float) * np.sqrt(
+            aum / np.asarray(adv, dtype=float)
+        )
+
+    # --------------------------------------------------
+    # Per Asset Parameters
+    # --------------------------------------------------
+    @staticmethod
+    def _per_asset(value, assets):
+
+        if isinstance(value, dict):
+
+            if assets is None:
+                raise ValueError("Per asset costs by name need assets.")
+
+            return np.array([value.get(a, 0.0) for a in assets], dtype=float)
+
+        if isinstance(value, (pd.Series, pd.DataFrame)):
+
+            if isinstance(value, pd.DataFrame):
+                value = value if assets is None else value[assets]
+            elif assets is not None:
+                value = value.reindex(assets)
+
+            return value.fillna(0.0).to_numpy(dtype=float)
+
+        return value if np.isscalar(value) else np.asarray(value, dtype=float)
+
+    def linear_rate(self, assets=None, proportional=True):
+
+        """
+        Linear cost per unit traded (proportional + half spread).
+        """
+
+        rate = (
+            self._per_asset(self.proportional, assets)
+            if proportional
+            else 0.0
+        )
+
+        spread = self._per_asset(self.spread, assets)
+
+        if np.isscalar(spread) and spread == 0:
+            return rate
+
+        return rate + spread / 2
+
+    @property
+    def has_impact(self):
+
+        return not (np.isscalar(self.impact) and self.impact == 0)
+
+    # --------------------------------------------------
+    # Costs
+    # --------------------------------------------------
+    def trade_cost(
+        self,
+        traded,
+        assets=None,
+        proportional=True,
+        turnover=None
+    ):
+
+        """
+        Cost per date of absolute trades (..., dates, assets).
+
+        proportional=False leaves out the proportional rate (the
+        sweep grids it separately); spread and impact still apply.
+        ``turnover`` (Σ traded) is reused when already computed.
+        """
+
+        traded = np.asarray(traded, dtype=float)
+
+        rate = self.linear_rate(assets, proportional=proportional)
+
+        if np.isscalar(rate):
+
+            if turnover is None:
+                turnover = traded.sum(axis=-1)
+
+            cost = turnover * rate
+
+        else:
+            cost = (traded * rate).sum(axis=-1)
+
+        if self.has_impact:
+
+            impact = self._per_asset(self.impact, assets)
+
+            cost = cost + (impact * traded ** 1.5).sum(axis=-1)
+
+        return cost
+
+    def costs(self, weights, assets=None, initial=None, proportional=True):
+
+        """
+        Turnover and cost per date of weights (..., dates, assets).
+
+        A DataFrame (dates × assets) returns two Series and uses
+        its columns as the asset names.
+        """
+
+        if isinstance(weights, pd.DataFrame):
+
+            turnover, cost = self.costs(
+                weights.to_numpy(),
+                assets=list(weights.columns) if assets is None else assets,
+                initial=initial,
+                proportional=proportional
+            )
+
+            return (
+                pd.Series(turnover, index=weights.index),
+                pd.Series(cost, index=weights.index)
+            )
+
+        traded = trades(weights, initial=initial)
+
+        turnover = traded.sum(axis=-1)
+
+        return turnover, self.trade_cost(
+            traded,
+            assets=assets,
+            proportional=proportional,
+            turnover=turnover
+        )
@@ -0,0 +1,747 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# ============================
+# CONFIG
+# ============================
+
+DATA_DIR = "data_processed"
+
+CSV_NAME = "macro_v4_clean.csv"
+
+STORE_NAME = "macro_v4_store"
+
+INDEX_FILE = "index.npy"
+
+META_FILE = "meta.json"
+
+# Artifact cache for pipeline intermediates
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+CACHE_MAX_BYTES = 512 * 2 ** 20
+
+_MISSING = object()
+
+
+# ======================================
+# CSV (LEGACY PATH)
+# ======================================
+
+def load_csv(path: str, columns=None) -> pd.DataFrame:
+
+    """
+    Load the cleaned panel from CSV (full parse + date parsing).
+    """
+
+    df = pd.read_csv(
+        path,
+        index_col=0,
+        parse_dates=True
+    )
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    return df
+
+
+# ======================================
+# COLUMNAR STORE
+# ======================================
+
+def write_dataset(df: pd.DataFrame, path: str):
+
+    """
+    Write a DatetimeIndex panel as a columnar store:
+
+    path/
+        index.npy        datetime64 index
+        <column>.npy     one typed array per column
+        meta.json        column order, dtypes, index name
+
+    The store is written to a temporary sibling directory and
+    renamed into place, so an interrupted or concurrent write never
+    leaves a mix of old and new files (nor truncates arrays a
+    reader has memory mapped).
+    """
+
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("Data must have DatetimeIndex.")
+
+    columns = [str(c) for c in df.columns]
+
+    parent = os.path.dirname(os.path.abspath(path))
+
+    os.makedirs(parent, exist_ok=True)
+
+    staging = tempfile.mkdtemp(prefix=".dataset_", dir=parent)
+
+    try:
+
+        np.save(
+            os.path.join(staging, INDEX_FILE),
+            df.index.to_numpy()
+        )
+
+        for col in columns:
+
+            values = df[col].to_numpy()
+
+            if values.dtype == object:
+                raise ValueError(
+                    f"{col} has object dtype; store numeric columns only."
+                )
+
+            np.save(os.path.join(staging, f"{col}.npy"), values)
+
+        meta = {
+
+            "columns": columns,
+            "dtypes": {c: str(df[c].dtype) for c in columns},
+            "index_name": df.index.name,
+            "rows": len(df)
+
+        }
+
+        # meta written last: a store without it is incomplete
+        with open(os.path.join(staging, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+
+        _replace_dir(staging, path)
+
+    except BaseException:
+
+        shutil.rmtree(staging, ignore_errors=True)
+
+        raise
+
+
+def _replace_dir(staging, path):
+
+    """
+    Move a complete directory to ``path``. A rename cannot replace a
+    non-empty directory, so an existing one is first renamed aside
+    (readers see the old store, briefly none, then the new one)
+    and removed afterwards.
+    """
+
+    retired = None
+
+    if os.path.exists(path):
+
+        retired = tempfile.mkdtemp(
+            prefix=".retired_", dir=os.path.dirname(os.path.abspath(path))
+        )
+
+        try:
+            os.replace(path, retired)
+        except FileNotFoundError:
+            pass
+
+    try:
+
+        os.replace(staging, path)
+
+    except OSError:
+
+        # a concurrent writer renamed its complete store in first
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            raise
+
+        shutil.rmtree(staging, ignore_errors=True)
+
+    if retired is not None:
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+def load_dataset(
+    path: str,
+    columns=None,
+    mmap: bool = True
+) -> pd.DataFrame:
+
+    """
+    Load the panel from a columnar store.
+
+    Only the requested columns are opened; with mmap=True their
+    pages are read lazily by the OS instead of parsed up front.
+    Columns stay separate blocks over the mapped arrays (no
+    consolidating copy); the mapping is copy-on-write, so writes to
+    the frame stay private and never reach the files.
+    """
+
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+
+    if columns is None:
+        columns = meta["columns"]
+
+    missing = [c for c in columns if c not in meta["columns"]]
+
+    if missing:
+        raise ValueError(f"Columns not in store: {missing}")
+
+    mmap_mode = "c" if mmap else None
+
+    index = pd.DatetimeIndex(
+        np.load(os.path.join(path, INDEX_FILE)),
+        name=meta["index_name"]
+    )
+
+    data = {
+
+        col: pd.Series(
+            np.load(os.path.join(path, f"{col}.npy"), mmap_mode=mmap_mode),
+            index=index,
+            copy=False
+        )
+
+        for col in columns
+
+    }
+
+    return pd.DataFrame(data, columns=list(columns), copy=False)
+
+
+def store_is_current(csv_path: str, store_path: str) -> bool:
+
+    meta_path = os.path.join(store_path, META_FILE)
+
+    if not os.path.exists(meta_path):
+        return False
+
+    if not os.path.exists(csv_path):
+        return True
+
+    return os.path.getmtime(meta_path) >= os.path.getmtime(csv_path)
+
+
+# ======================================
+# PROJECT ENTRY POINT
+# ======================================
+
+def find_project_root(start: str = None) -> str:
+
+    """
+    Nearest directory at or above ``start`` (default: cwd)
+    containing data_processed/.
+    """
+
+    current = os.path.abspath(start or os.getcwd())
+
+    while not os.path.exists(os.path.join(current, DATA_DIR)):
+
+        parent = os.path.dirname(current)
+
+        if parent == current:
+            raise FileNotFoundError(
+                f"No {DATA_DIR}/ found at or above {start or os.getcwd()}."
+            )
+
+        current = parent
+
+    return current
+
+
+def load_macro_panel(root: str = ".", columns=None) -> pd.DataFrame:
+
+    """
+    Load data_processed/macro_v4_clean from the columnar store,
+    (re)building the store from the CSV when missing or stale.
+    """
+
+    csv_path = os.path.join(root, DATA_DIR, CSV_NAME)
+    store_path = os.path.join(root, DATA_DIR, STORE_NAME)
+
+    if not store_is_current(csv_path, store_path):
+        write_dataset(load_csv(csv_path), store_path)
+
+    return load_dataset(store_path, columns=columns)
+
+
+# ======================================
+# CONTENT HASHING
+# ======================================
+
+def content_hash(obj) -> str:
+
+    """
+    SHA-256 of a DataFrame / Series / ndarray (values, index,
+    labels, dtypes) or of the repr of anything else.
+    """
+
+    digest = hashlib.sha256()
+
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+
+        digest.update(type(obj).__name__.encode())
+
+        digest.update(
+            pd.util.hash_pandas_object(obj, index=True)
+            .to_numpy()
+            .tobytes()
+        )
+
+        if isinstance(obj, pd.DataFrame):
+            labels = [(str(c), str(t)) for c, t in obj.dtypes.items()]
+        else:
+            labels = [(str(obj.name), str(obj.dtype))]
+
+        digest.update(repr(labels).encode())
+
+    elif isinstance(obj, np.ndarray):
+
+        digest.update(str((obj.dtype, obj.shape)).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+
+    else:
+
+        digest.update(repr(obj).encode())
+
+    return digest.hexdigest()
+
+
+# ======================================
+# ARTIFACT CACHE (DISK, LRU)
+# ======================================
+
+class ArtifactCache:
+    """
+    Bounded on-disk cache of pipeline artifacts.
+
+    One pickle per key. Reads refresh the file's mtime, and when
+    the directory grows past ``max_bytes`` the least recently
+    used files are evicted. Writes go through a temp file plus
+    rename, so concurrent workers never see partial artifacts.
+    """
+
+    SUFFIX = ".pkl"
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key, default=None):
+
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+
+        # mark as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        self.hits += 1
+
+        return value
+
+    def put(self, key, value):
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp, self._path(key))
+
+        self.evict()
+
+    def entries(self):
+
+        """
+        (path, bytes, last use) of every artifact, oldest first.
+        """
+
+        out = []
+
+        for name in os.listdir(self.directory):
+
+            if not name.endswith(self.SUFFIX):
+                continue
+
+            path = os.path.join(self.directory, name)
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            out.append((path, stat.st_size, stat.st_mtime))
+
+        return sorted(out, key=lambda e: e[2])
+
+    def size(self):
+
+        return sum(e[1] for e in self.entries())
+
+    def evict(self):
+
+        entries = self.entries()
+
+        total = sum(e[1] for e in entries)
+
+        for path, size, _ in entries:
+
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            total -= size
+
+    def clear(self):
+
+        for path, _, _ in self.entries():
+            os.remove(path)
+
+
+# ======================================
+# PIPELINE DAG
+# ======================================
+
+class Pipeline:
+    """
+    Declared intermediates with content-hashed keys.
+
+    Each node names its input nodes and the run parameters it
+    depends on. A node's key hashes its name, version, parameter
+    values and its inputs' keys (source nodes: the content hash
+    of the frame), so any change upstream changes every key
+    downstream and nothing stale is ever returned.
+
+    Results are kept in a small in-memory LRU and, with a
+    ``cache``, in an ArtifactCache shared across runs and
+    processes. Sources are treated as immutable: their hash is
+    memoized per object.
+    """
+
+    def __init__(self, cache=None, memory_items: int = 64):
+
+        self.cache = cache
+        self.memory_items = memory_items
+
+        self.nodes = {}
+
+        self._memory = OrderedDict()
+        self._source_keys = {}
+
+    # --------------------------------------------------
+    # Declaration
+    # --------------------------------------------------
+    def source(self, name):
+
+        self.nodes[name] = {"source": True}
+
+        return self
+
+    def node(self, name, func, inputs=(), params=(), version="1"):
+
+        """
+        func(*input values, **{p: params[p] for p in params})
+        """
+
+        missing = [i for i in inputs if i not in self.nodes]
+
+        if missing:
+            raise ValueError(f"{name}: unknown inputs {missing}")
+
+        self.nodes[name] = {
+
+            "source": False,
+            "func": func,
+            "inputs": tuple(inputs),
+            "params": tuple(params),
+            "version": version
+
+        }
+
+        return self
+
+    # --------------------------------------------------
+    # Keys
+    # --------------------------------------------------
+    def _source_key(self, frame):
+
+        entry = self._source_keys.get(id(frame))
+
+        if entry is not None and entry[0]() is frame:
+            return entry[1]
+
+        key = content_hash(frame)
+
+        try:
+            self._source_keys[id(frame)] = (weakref.ref(frame), key)
+        except TypeError:
+            pass
+
+        return key
+
+    def key(self, name, sources, params):
+
+        node = self.nodes[name]
+
+        if node["source"]:
+            return self._source_key(sources[name])
+
+        missing = [p for p in node["params"] if p not in params]
+
+        if missing:
+            raise ValueError(f"{name}: missing parameters {missing}")
+
+        spec = (
+            name,
+            node["version"],
+            [(p, params[p]) for p in node["params"]],
+            [self.key(i, sources, params) for i in node["inputs"]]
+        )
+
+        return hashlib.sha256(repr(spec).encode()).hexdigest()
+
+    # --------------------------------------------------
+    # Evaluation
+    # --------------------------------------------------
+    def run(self, name, sources, **params):
+
+        """
+        Value of ``name`` given source frames and parameters,
+        computing only nodes missing from both caches.
+        """
+
+        node = self.nodes[name]
+
+        if node["source"]:
+            return sources[name]
+
+        key = self.key(name, sources, params)
+
+        if key in self._memory:
+
+            self._memory.move_to_end(key)
+
+            return self._memory[key]
+
+        value = _MISSING
+
+        if self.cache is not None:
+            value = self.cache.get(key, _MISSING)
+
+        if value is _MISSING:
+
+            inputs = [self.run(i, sources, **params) for i in node["inputs"]]
+
+            value = node["func"](
+                *inputs,
+                **{p: params[p] for p in node["params"]}
+            )
+
+            if self.cache is not None:
+                self.cache.put(key, value)
+
+        self._memory[key] = value
+
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+        return value
+
+    def __getstate__(self):
+
+        # process pools: ship the DAG and cache, not the memos
+        state = self.__dict__.copy()
+
+        state["_memory"] = OrderedDict()
+        state["_source_keys"] = {}
+
+        return state
+
+
+# --------------------------------------------------
+# Strategy Intermediates
+# --------------------------------------------------
+def _liquidity(panel, smoothing_window, weights):
+
+    from src.regime_engine import RegimeEngine
+
+    return RegimeEngine(
+        smoothing_window=smoothing_window,
+        weights=weights
+    )._build_liquidity_composite(panel)
+
+
+def _liquidity_monthly(liquidity):
+
+    return liquidity.ffill().resample("ME").last()
+
+
+def _monthly_prices(panel, assets):
+
+    from src.portfolio_engine import month_end_last
+
+    return month_end_last(panel[list(assets)]).dropna()
+
+
+def _monthly_returns(monthly_prices):
+
+    return monthly_prices.pct_change().dropna()
+
+
+def _momentum(monthly_prices, lookback):
+
+    return monthly_prices.pct_change(lookback)
+
+
+def _volatility(monthly_returns, vol_lookback):
+
+    from src.risk_engine import RiskEngine
+
+    return RiskEngine(
+        returns=monthly_returns,
+        vol_lookback=vol_lookback
+    ).compute_volatility()
+
+
+def strategy_pipeline(cache=None) -> Pipeline:
+
+    """
+    DAG of the MultiAssetRotationEngine intermediates:
+
+    panel ─┬─ liquidity(smoothing_window, weights) ── liquidity_monthly
+           └─ monthly_prices(assets) ─┬─ momentum(lookback)
+                                      └─ monthly_returns ── volatility(vol_lookback)
+
+    cache : ArtifactCache, or True for the default project cache.
+    """
+
+    from src.regime_engine import LIQUIDITY_COLUMNS
+
+    if cache is True:
+        cache = ArtifactCache()
+
+    liquidity_version = f"2:{LIQUIDITY_COLUMNS}"
+
+    return (
+
+        Pipeline(cache=cache)
+        .source("panel")
+        .node(
+            "liquidity", _liquidity, ["panel"],
+            ["smoothing_window", "weights"], version=liquidity_version
+        )
+        .node("liquidity_monthly", _liquidity_monthly, ["liquidity"])
+        .node("monthly_prices", _monthly_prices, ["panel"], ["assets"])
+        .node("monthly_returns", _monthly_returns, ["monthly_prices"])
+        .node("momentum", _momentum, ["monthly_prices"], ["lookback"])
+        .node("volatility", _volatility, ["monthly_returns"], ["vol_lookback"])
+
+    )
+
+
+# ======================================
+# BENCHMARK (CSV vs STORE)
+# ======================================
+
+def benchmark_load(
+    csv_path: str,
+    store_path: str,
+    column_sets=None,
+    repeats: int = 5
+) -> pd.DataFrame:
+
+    """
+    Best-of-N load time for CSV vs columnar store,
+    for the full panel and each projected column set.
+    """
+
+    if column_sets is None:
+
+        column_sets = {
+
+            "all": None,
+            "liquidity": ["US_M2", "ECB_ASSETS"],
+            "assets": ["NIFTY", "SPY", "GLD"]
+
+        }
+
+    loaders = {
+
+        "csv": lambda cols: load_csv(csv_path, cols),
+        "store": lambda cols: load_dataset(store_path, cols),
+        "store_no_mmap": lambda cols: load_dataset(
+            store_path, cols, mmap=False
+        )
+
+    }
+
+    rows = []
+
+    for set_name, cols in column_sets.items():
+
+        for loader_name, loader in loaders.items():
+
+            timings = []
+
+            for _ in range(repeats):
+
+                start = time.perf_counter()
+
+                loaded = loader(cols)
+
+                # touch the data so lazy pages are counted
+                loaded.sum(numeric_only=True)
+
+                timings.append(time.perf_counter() - start)
+
+            rows.append({
+
+                "columns": set_name,
+                "loader": loader_name,
+                "best_ms": min(timings) * 1e3,
+                "rows": len(loaded),
+                "n_columns": loaded.shape[1]
+
+            })
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+
+    csv_path = os.path.join(DATA_DIR, CSV_NAME)
+    store_path = os.path.join(DATA_DIR, STORE_NAME)
+
+    write_dataset(load_csv(csv_path), store_path)
+
+    print(f"Store written: {store_path}")
+
+    print(benchmark_load(csv_path, store_path).to_string(index=False))
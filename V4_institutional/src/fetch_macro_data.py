@@ -1,8 +1,27 @@
-import pandas as pd
-import yfinance as yf
-from fredapi import Fred
+import argparse
+import io
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
+from src.data_pipeline import (
+    CSV_NAME,
+    DATA_DIR,
+    STORE_NAME,
+    load_csv,
+    load_dataset,
+    write_dataset,
+)
+
 
 # ============================
 # CONFIG
@@ -11,179 +30,741 @@ from datetime import datetime
 START = "1995-01-01"
 END = datetime.today().strftime("%Y-%m-%d")
 
-fred = Fred(api_key="edb0f55bbf21a1970f4d5fcd6ac848c7")
+# Read from the environment; never commit keys
+FRED_API_KEY = os.environ.get("FRED_API_KEY")
+
+# Per-series raw store (last observations + manifest)
+SERIES_STORE = os.path.join("data_raw", "series_store")
+
+# Tail re-requested on refresh so revised observations are merged
+REVISION_WINDOW_DAYS = 90
+
+# Concurrent requests allowed per provider (rate limits)
+PROVIDER_LIMITS = {
+
+    "fred": 4,
+    "yahoo": 4
+
+}
+
+FETCH_RETRIES = 3
+
+FETCH_BACKOFF_SECONDS = 0.5
+
+# name → (provider, series id); order is the panel column order
+MACRO_SERIES = {
+
+    "US10Y": ("fred", "DGS10"),
+    "FEDFUNDS": ("fred", "FEDFUNDS"),
+    "DXY": ("yahoo", "DX-Y.NYB"),
+    "OIL": ("yahoo", "CL=F"),
+    "USDINR": ("yahoo", "INR=X"),
+    "US_M2": ("fred", "WM2NS"),        # Global liquidity
+    "ECB_ASSETS": ("fred", "ECBASSETSW")  # ECB balance sheet proxy
+
+}
+
+ASSET_SERIES = {
+
+    "NIFTY": ("yahoo", "^NSEI"),
+    "GLD": ("yahoo", "GLD"),
+    "SPY": ("yahoo", "SPY")
+
+}
 
 
 # ============================
-# FRED MACRO DATA
+# PROVIDERS
 # ============================
 
-print("Downloading FRED data...")
+class SeriesProvider:
+    """
+    Source of a single time series.
+
+    fetch() returns a float Series indexed by date for
+    observations in [start, end]; empty if none.
+
+    Providers that can serve several ids in one request set
+    supports_batch and override fetch_many().
+    """
+
+    supports_batch = False
+
+    def fetch(self, series_id, start, end) -> pd.Series:
+        raise NotImplementedError
+
+    def fetch_many(self, series_ids, start, end) -> dict:
+
+        return {
+            sid: self.fetch(sid, start, end)
+            for sid in series_ids
+        }
+
+
+class FredProvider(SeriesProvider):
+
+    def __init__(self, api_key=None):
+
+        api_key = api_key or FRED_API_KEY
+
+        if not api_key:
+            raise ValueError(
+                "FRED API key missing: set FRED_API_KEY or pass api_key."
+            )
+
+        from fredapi import Fred
+
+        self.fred = Fred(api_key=api_key)
+
+    def fetch(self, series_id, start, end):
+
+        return self.fred.get_series(
+            series_id,
+            observation_start=start,
+            observation_end=end
+        )
+
+
+class YahooProvider(SeriesProvider):
+
+    supports_batch = True
+
+    def fetch(self, series_id, start, end):
+
+        import yfinance as yf
+
+        data = yf.download(
+            series_id,
+            start=start,
+            end=end,
+            auto_adjust=True,   # removes Adj Close problems
+            progress=False
+        )
+
+        if data.empty:
+            return pd.Series(dtype="float64")
+
+        close = data["Close"]
+
+        if isinstance(close, pd.DataFrame):
+            close = close.iloc[:, 0]
+
+        return close
+
+    def fetch_many(self, series_ids, start, end):
+
+        """
+        One multi-ticker download for the whole batch.
+        """
+
+        import yfinance as yf
+
+        data = yf.download(
+            list(series_ids),
+            start=start,
+            end=end,
+            auto_adjust=True,
+            progress=False,
+            group_by="column"
+        )
+
+        out = {}
 
-us10y = fred.get_series("DGS10")
-fedfunds = fred.get_series("FEDFUNDS")
+        for sid in series_ids:
 
-# Global liquidity
-us_m2 = fred.get_series("WM2NS")
+            if data.empty or sid not in data["Close"]:
+                out[sid] = pd.Series(dtype="float64")
+            else:
+                out[sid] = data["Close"][sid].dropna()
 
-# ECB balance sheet proxy
-ecb_assets = fred.get_series("ECBASSETSW")
+        return out
+
+
+class LocalFileProvider(SeriesProvider):
+    """
+    File-backed stand-in for FRED / Yahoo.
+
+    Reads <directory>/<series_id>.csv with a date column and a
+    value column.
+    """
+
+    def __init__(self, directory):
+
+        self.directory = directory
+
+    def fetch(self, series_id, start, end):
+
+        path = os.path.join(self.directory, f"{series_id}.csv")
+
+        series = pd.read_csv(
+            path,
+            index_col=0,
+            parse_dates=True
+        ).iloc[:, 0]
+
+        return series.sort_index().loc[start:end]
+
+
+class HttpCsvProvider(SeriesProvider):
+    """
+    Fetches <base_url>/<series_id>.csv over HTTP.
+
+    Lets the orchestrator run against a local stub server, e.g.
+    ``python -m http.server`` over a directory of series CSVs.
+    """
+
+    def __init__(self, base_url, timeout=30):
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def fetch(self, series_id, start, end):
+
+        url = (
+            f"{self.base_url}/"
+            f"{urllib.parse.quote(series_id)}.csv"
+            f"?start={start}&end={end}"
+        )
+
+        with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+            body = resp.read().decode()
+
+        series = pd.read_csv(
+            io.StringIO(body),
+            index_col=0,
+            parse_dates=True
+        ).iloc[:, 0]
+
+        return series.sort_index().loc[start:end]
+
+
+def default_providers(fred_api_key=None):
+
+    return {
+
+        "fred": FredProvider(api_key=fred_api_key),
+        "yahoo": YahooProvider()
+
+    }
 
 
 # ============================
-# YAHOO FINANCE FETCH HELPER
+# PER-SERIES STORE
 # ============================
 
-def fetch_close(ticker):
+class SeriesStore:
+    """
+    One columnar dataset per series plus a manifest holding
+    the last observation date and refresh time of each.
+    """
 
-    data = yf.download(
-        ticker,
-        start=START,
-        end=END,
-        auto_adjust=True,   # removes Adj Close problems
-        progress=False
-    )
+    def __init__(self, path=SERIES_STORE):
+
+        self.path = path
+
+        self.manifest_path = os.path.join(path, "manifest.json")
+
+        self.manifest = {}
+
+        if os.path.exists(self.manifest_path):
+
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def load(self, name):
+
+        if name not in self.manifest:
+            return None
+
+        return load_dataset(
+            os.path.join(self.path, name),
+            mmap=False
+        )[name]
+
+    def last_observation(self, name):
+
+        entry = self.manifest.get(name)
+
+        if entry is None or entry["last_observation"] is None:
+            return None
+
+        return pd.Timestamp(entry["last_observation"])
+
+    def save(self, name, series):
+
+        write_dataset(
+            series.to_frame(name),
+            os.path.join(self.path, name)
+        )
+
+        self.manifest[name] = {
+
+            "last_observation": (
+                series.index.max().isoformat()
+                if not series.empty else None
+            ),
+            "refreshed_at": datetime.now().isoformat(timespec="seconds"),
+            "rows": len(series)
+
+        }
+
+        with open(self.manifest_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+
+
+def merge_series(existing, update):
+
+    """
+    Merge a fetched tail into the stored series.
+
+    Fetched values win on overlapping dates (revisions).
+
+    Returns
+    -------
+    merged series, first changed date (None if nothing changed),
+    and whether the first overlapping observation was revised —
+    a sign the provider restated history (e.g. dividend
+    back-adjustment) and the series needs a full fetch.
+    """
+
+    update = update.astype("float64")
+    update.index = pd.to_datetime(update.index)
+
+    if existing is None or existing.empty:
+
+        first = update.index.min() if not update.empty else None
+
+        return update.sort_index(), first, False
+
+    overlap = existing.index.intersection(update.index)
 
-    return data["Close"].squeeze()
+    new_values = update.loc[overlap].to_numpy()
+    old_values = existing.loc[overlap].to_numpy()
 
+    # NaN == NaN counts as unchanged (FRED holidays)
+    revised = overlap[
+        (new_values != old_values)
+        & ~(np.isnan(new_values) & np.isnan(old_values))
+    ]
 
-print("Downloading Yahoo Finance data...")
+    added = update.index.difference(existing.index)
 
-dxy = fetch_close("DX-Y.NYB")
+    changed = revised.union(added)
 
-oil = fetch_close("CL=F")
+    merged = update.combine_first(existing).sort_index()
 
-usdinr = fetch_close("INR=X")
+    first = changed.min() if len(changed) else None
+
+    restated = len(overlap) > 0 and overlap[0] in revised
+
+    return merged, first, restated
 
 
 # ============================
-# BUILD MACRO DATAFRAME
+# REFRESH
 # ============================
 
-df = pd.DataFrame({
+def tail_start(store, name, start=START, full=False):
 
-    "US10Y": us10y,
-    "FEDFUNDS": fedfunds,
-    "DXY": dxy,
-    "OIL": oil,
-    "USDINR": usdinr,
-    "US_M2": us_m2,
-    "ECB_ASSETS": ecb_assets
+    """
+    First date to request: the series start for a full fetch,
+    otherwise the last stored observation minus the revision window.
+    """
 
-})
+    last = store.last_observation(name)
 
-df.index = pd.to_datetime(df.index)
+    if full or last is None:
+        return start
 
-df = df.loc[START:END]
+    return max(
+        pd.Timestamp(start),
+        last - pd.Timedelta(days=REVISION_WINDOW_DAYS)
+    ).strftime("%Y-%m-%d")
 
-# ======================================
-# FETCH ASSET PRICES (NIFTY / GLD / SPY)
-# ======================================
 
-print("Downloading Asset Prices...")
+def merge_into_store(store, name, update, refetch, full=False):
 
-assets = {
+    """
+    Merge a fetched tail into the store.
 
-    "NIFTY": "^NSEI",
-    "GLD": "GLD",
-    "SPY": "SPY"
+    ``refetch()`` returns the full history and is only called
+    when the provider restated history.
 
-}
+    Returns the first date whose value changed, or None.
+    """
+
+    existing = None if full else store.load(name)
+
+    merged, first_changed, restated = merge_series(existing, update)
+
+    if restated:
+
+        print(f"{name}: history restated — full fetch.")
 
-asset_prices = pd.DataFrame()
+        merged, _, _ = merge_series(None, refetch())
 
-for name, ticker in assets.items():
+        first_changed = merged.index.min() if not merged.empty else None
 
-    print(f"Downloading {name}...")
+    if first_changed is not None or name not in store.manifest:
+        store.save(name, merged)
 
-    data = yf.download(
+    return first_changed
 
-        ticker,
 
-        start=START,
-        end=END,
+def refresh_series(
+    store,
+    providers,
+    name,
+    provider_key,
+    series_id,
+    start=START,
+    end=END,
+    full=False
+):
 
-        auto_adjust=True,
-        progress=False
+    """
+    Fetch only the missing tail (plus the revision window) of one
+    series and merge it into the store.
 
+    Returns the first date whose value changed, or None.
+    """
+
+    provider = providers[provider_key]
+
+    update = provider.fetch(
+        series_id,
+        tail_start(store, name, start, full),
+        end
+    )
+
+    return merge_into_store(
+        store,
+        name,
+        update,
+        refetch=lambda: provider.fetch(series_id, start, end),
+        full=full
     )
 
-    if data.empty:
 
-        raise ValueError(
-            f"{name} download failed."
+# ============================
+# CONCURRENT FETCH
+# ============================
+
+class FetchOrchestrator:
+    """
+    Issues series requests concurrently on a thread pool.
+
+    - per-provider concurrency limits (semaphores)
+    - retry with exponential backoff + jitter
+    - batch-capable providers get one request per provider
+      covering all of their series
+    """
+
+    def __init__(
+        self,
+        providers,
+        max_workers=16,
+        provider_limits=None,
+        retries=FETCH_RETRIES,
+        backoff=FETCH_BACKOFF_SECONDS
+    ):
+
+        self.providers = providers
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+
+        limits = {**PROVIDER_LIMITS, **(provider_limits or {})}
+
+        self.semaphores = {
+
+            key: threading.BoundedSemaphore(limits.get(key, 1))
+            for key in providers
+
+        }
+
+    def call(self, provider_key, method, *args):
+
+        """
+        Run one provider call under its concurrency limit, retrying
+        failures with exponential backoff.
+        """
+
+        fn = getattr(self.providers[provider_key], method)
+
+        for attempt in range(self.retries + 1):
+
+            try:
+
+                with self.semaphores[provider_key]:
+                    return fn(*args)
+
+            except Exception as exc:
+
+                if attempt == self.retries:
+                    raise
+
+                delay = self.backoff * 2 ** attempt * (1 + random.random())
+
+                print(
+                    f"{provider_key} {args[0]} failed ({exc}); "
+                    f"retry {attempt + 1} in {delay:.1f}s"
+                )
+
+                time.sleep(delay)
+
+    def fetch(self, requests):
+
+        """
+        requests : name → (provider, series id, start, end)
+
+        Returns name → fetched Series.
+        """
+
+        tasks = []
+
+        batched = {}
+
+        for name, (provider_key, series_id, start, end) in requests.items():
+
+            if self.providers[provider_key].supports_batch:
+                batched.setdefault(provider_key, []).append(
+                    (name, series_id, start, end)
+                )
+            else:
+                tasks.append(
+                    ([name], provider_key, "fetch", series_id, start, end)
+                )
+
+        # One request per batch provider, widest window of its series
+        for provider_key, items in batched.items():
+
+            tasks.append((
+
+                [name for name, *_ in items],
+                provider_key,
+                "fetch_many",
+                [sid for _, sid, _, _ in items],
+                min(pd.Timestamp(s) for *_, s, _ in items).strftime("%Y-%m-%d"),
+                max(pd.Timestamp(e) for *_, e in items).strftime("%Y-%m-%d")
+
+            ))
+
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+
+            futures = [
+
+                (names, method, series_id, executor.submit(
+                    self.call, provider_key, method, series_id, start, end
+                ))
+
+                for names, provider_key, method, series_id, start, end
+                in tasks
+
+            ]
+
+            for names, method, series_id, future in futures:
+
+                if method == "fetch":
+                    results[names[0]] = future.result()
+                    continue
+
+                by_id = future.result()
+
+                for name, sid in zip(names, series_id):
+                    results[name] = by_id[sid]
+
+        return results
+
+
+# ============================
+# PANEL
+# ============================
+
+def build_panel(series, start=START, end=END, since=None, panel=None):
+
+    """
+    Align raw series into the master dataset.
+
+    With ``since`` and an existing ``panel``, rows before ``since``
+    are kept as-is and only later rows are rebuilt, seeded with the
+    last kept row for the forward fill and NIFTY_RET.
+    """
+
+    if since is not None:
+        series = {k: s.loc[since:] for k, s in series.items()}
+
+    df = pd.DataFrame({k: series[k] for k in MACRO_SERIES})
+
+    df.index = pd.to_datetime(df.index)
+
+    df = df.loc[start:end]
+
+    asset_prices = pd.DataFrame({k: series[k] for k in ASSET_SERIES})
+
+    # Assets follow the macro calendar (left join)
+    df = df.join(asset_prices, how="left")
+
+    df = df.sort_index()
+
+    kept = None
+
+    if since is not None:
+
+        kept = panel.loc[panel.index < since]
+
+        df = pd.concat([kept.iloc[-1:][df.columns], df])
+
+    # Forward fill macro publication lag + market holidays
+    df = df.ffill()
+
+    # ======================================
+    # RETURNS
+    # ======================================
+
+    df["NIFTY_RET"] = df["NIFTY"].pct_change()
+
+    if kept is not None:
+        df = pd.concat([kept, df.iloc[min(len(kept), 1):]])
+
+    return df
+
+
+def _save_panel(df):
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    df.to_csv(os.path.join(DATA_DIR, CSV_NAME))
+
+    write_dataset(df, os.path.join(DATA_DIR, STORE_NAME))
+
+
+def fetch_all(
+    refresh=False,
+    providers=None,
+    store=None,
+    start=START,
+    end=END,
+    orchestrator=None
+):
+
+    """
+    Full download (refresh=False) or append-only refresh of
+    every series, then (re)build the aligned panel.
+
+    Series are fetched concurrently through ``orchestrator``
+    (default: FetchOrchestrator over ``providers``).
+    """
+
+    if orchestrator is None:
+        orchestrator = FetchOrchestrator(providers or default_providers())
+
+    store = store or SeriesStore()
+
+    csv_path = os.path.join(DATA_DIR, CSV_NAME)
+
+    panel = None
+
+    if refresh and os.path.exists(csv_path):
+        panel = load_csv(csv_path)
+
+    all_series = {**MACRO_SERIES, **ASSET_SERIES}
+
+    requests = {
+
+        name: (
+            provider_key,
+            series_id,
+            tail_start(store, name, start, full=not refresh),
+            end
         )
 
-    series = data["Close"].copy()
+        for name, (provider_key, series_id) in all_series.items()
 
-    series.name = name
+    }
 
-    asset_prices[name] = series
+    print(f"Fetching {len(requests)} series...")
 
+    updates = orchestrator.fetch(requests)
 
-# Ensure datetime index
-asset_prices.index = pd.to_datetime(
-    asset_prices.index
-)
+    changes = {}
 
+    for name, (provider_key, series_id) in all_series.items():
 
-# ======================================
-# JOIN INTO MASTER DATASET
-# ======================================
+        changes[name] = merge_into_store(
+            store,
+            name,
+            updates[name],
+            refetch=lambda key=provider_key, sid=series_id:
+                orchestrator.call(key, "fetch", sid, start, end),
+            full=not refresh
+        )
 
-df = df.join(
-    asset_prices,
-    how="left"
-)
+    series = {name: store.load(name) for name in changes}
 
+    for name in ASSET_SERIES:
 
-# ======================================
-# ALIGNMENT (ONE TIME ONLY)
-# ======================================
+        if series[name] is None or series[name].empty:
 
-df = df.sort_index()
+            raise ValueError(
+                f"{name} download failed."
+            )
 
-# Forward fill macro publication lag + market holidays
-df = df.ffill()
+    changed = [d for d in changes.values() if d is not None]
 
+    if panel is None:
 
-# ======================================
-# SANITY CHECK
-# ======================================
+        df = build_panel(series, start, end)
 
-print("\nMissing Asset Values After Alignment:")
+    elif not changed:
 
-print(
-    df[["NIFTY","GLD","SPY"]]
-    .isna()
-    .sum()
-)
+        print("\nNo new observations.")
 
+        return panel
 
-# ======================================
-# RETURNS
-# ======================================
+    else:
 
-df["NIFTY_RET"] = df["NIFTY"].pct_change()
+        since = min(changed)
 
+        print(f"\nRebuilding panel from {since.date()}")
 
-# ======================================
-# SAVE DATASET
-# ======================================
+        df = build_panel(series, start, end, since=since, panel=panel)
 
-import os
+    # ======================================
+    # SANITY CHECK
+    # ======================================
 
-os.makedirs(
-    "data_processed",
-    exist_ok=True
-)
+    print("\nMissing Asset Values After Alignment:")
 
-df.to_csv(
+    print(
+        df[list(ASSET_SERIES)]
+        .isna()
+        .sum()
+    )
 
-    "data_processed/macro_v4_clean.csv"
+    _save_panel(df)
 
-)
+    print("\nClean dataset saved.")
+
+    print(df.tail())
+
+    return df
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Download macro + asset data and build the panel."
+    )
+
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="append-only refresh of the local series store"
+    )
 
-print("\nClean dataset saved.")
+    args = parser.parse_args()
 
-print(df.tail())
\ No newline at end of file
+    fetch_all(refresh=args.refresh)
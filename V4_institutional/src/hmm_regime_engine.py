@@ -0,0 +1,546 @@
+"""
+Gaussian hidden Markov regimes on the liquidity composite.
+
+Array kernels work on a batch of R parameter sets at once
+(restarts): observations x (T,), log start probabilities (R, K),
+log transition matrices (R, K, K), means / variances (R, K).
+Forward / backward results are log space; the recursions run
+normalised (one batched matrix product per step, log normalisers
+accumulated), so only the time loop is in Python.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.regime_engine import RegimeEngine
+
+
+LOG_2PI = np.log(2 * np.pi)
+
+
+# --------------------------------------------------
+# Kernels (batched over restarts)
+# --------------------------------------------------
+def log_emissions(x, means, variances):
+
+    """
+    Gaussian log densities, (R, T, K).
+    """
+
+    return -0.5 * (
+        LOG_2PI
+        + np.log(variances)[:, None, :]
+        + (x[None, :, None] - means[:, None, :]) ** 2
+        / variances[:, None, :]
+    )
+
+
+def _log_matmul(log_v, a):
+
+    """
+    log(exp(log_v) @ a) per batch row: log_v (R, K), a (R, K, K).
+    """
+
+    shift = log_v.max(axis=-1, keepdims=True)
+    shift = np.where(np.isfinite(shift), shift, 0.0)
+
+    with np.errstate(divide="ignore"):
+
+        return np.log(
+            np.matmul(np.exp(log_v - shift)[:, None, :], a)[:, 0]
+        ) + shift
+
+
+def _scaled_inputs(log_b, log_a):
+
+    """
+    Emissions shifted to a maximum of 1 per step (log shift kept)
+    and transitions floored at a tiny positive value, so scaled
+    recursions never see an all-zero step.
+    """
+
+    shift = log_b.max(axis=-1)
+
+    return np.exp(log_b - shift[..., None]), shift, np.maximum(
+        np.exp(log_a), 1e-300
+    )
+
+
+def forward(log_b, log_pi, log_a):
+
+    """
+    Log forward variables log p(x_1..t, s_t), (R, T, K).
+
+    Runs as a normalised recursion: each step is one batched
+    matrix product, and the log normalisers plus emission shifts
+    are added back as a cumulative sum.
+    """
+
+    b, shift, a = _scaled_inputs(log_b, log_a)
+
+    n_obs = log_b.shape[1]
+
+    alpha = np.empty(b.shape)
+    scale = np.empty(b.shape[:2])
+
+    step = np.exp(log_pi) * b[:, 0]
+
+    for t in range(n_obs):
+
+        if t:
+            step = np.matmul(alpha[:, t - 1, None, :], a)[:, 0] * b[:, t]
+
+        scale[:, t] = step.sum(axis=-1)
+
+        alpha[:, t] = step / scale[:, t, None]
+
+    offset = np.cumsum(np.log(scale) + shift, axis=1)
+
+    with np.errstate(divide="ignore"):
+        return np.log(alpha) + offset[..., None]
+
+
+def backward(log_b, log_a):
+
+    """
+    Log backward variables log p(x_t+1..T | s_t), (R, T, K).
+    """
+
+    b, shift, a = _scaled_inputs(log_b, log_a)
+
+    n_obs = log_b.shape[1]
+
+    beta = np.empty(b.shape)
+    scale = np.ones(b.shape[:2])
+
+    beta[:, -1] = 1.0
+
+    for t in range(n_obs - 2, -1, -1):
+
+        step = np.matmul(a, (b[:, t + 1] * beta[:, t + 1])[..., None])[..., 0]
+
+        scale[:, t] = step.max(axis=-1)
+
+        beta[:, t] = step / scale[:, t, None]
+
+    # log p(x_t+1..T | s_t) = log beta_t + Σ_{u ≥ t} log scale_u
+    #                          + Σ_{u > t} shift_u
+    offset = np.cumsum(np.log(scale[:, ::-1]), axis=1)[:, ::-1]
+
+    shifts = np.zeros(shift.shape)
+    shifts[:, :-1] = np.cumsum(shift[:, :0:-1], axis=1)[:, ::-1]
+
+    with np.errstate(divide="ignore"):
+        return np.log(beta) + (offset + shifts)[..., None]
+
+
+def logsumexp(values, axis=-1):
+
+    shift = values.max(axis=axis, keepdims=True)
+    shift = np.where(np.isfinite(shift), shift, 0.0)
+
+    return (
+        np.log(np.exp(values - shift).sum(axis=axis, keepdims=True)) + shift
+    ).squeeze(axis)
+
+
+def baum_welch(
+    x,
+    log_pi,
+    log_a,
+    means,
+    variances,
+    max_iter=100,
+    tol=1e-3,
+    min_var=1e-3
+):
+
+    """
+    EM for every restart in the batch until each log likelihood
+    improves by less than ``tol`` (converged restarts drop out of
+    the batch). Returns updated copies of the parameters, the log
+    likelihoods (R,) and the iterations run.
+    """
+
+    log_pi, log_a = log_pi.copy(), log_a.copy()
+    means, variances = means.copy(), variances.copy()
+
+    loglik = np.full(len(means), -np.inf)
+    active = np.arange(len(means))
+
+    n_iter = 0
+
+    while n_iter < max_iter and len(active):
+
+        n_iter += 1
+
+        r = active
+
+        log_b = log_emissions(x, means[r], variances[r])
+
+        log_alpha = forward(log_b, log_pi[r], log_a[r])
+        log_beta = backward(log_b, log_a[r])
+
+        ll = logsumexp(log_alpha[:, -1])
+
+        # -----------------------------------
+        # E step: state and transition posteriors
+        # -----------------------------------
+        gamma = np.exp(log_alpha + log_beta - ll[:, None, None])
+
+        log_xi = (
+            log_alpha[:, :-1, :, None]
+            + log_a[r][:, None]
+            + (log_b + log_beta)[:, 1:, None, :]
+            - ll[:, None, None, None]
+        )
+
+        xi = np.exp(log_xi).sum(axis=1)
+
+        # -----------------------------------
+        # M step
+        # -----------------------------------
+        weight = gamma.sum(axis=1)
+        safe = np.where(weight > 0, weight, 1.0)
+
+        new_means = (gamma * x[None, :, None]).sum(axis=1) / safe
+
+        new_vars = (
+            gamma * (x[None, :, None] - new_means[:, None, :]) ** 2
+        ).sum(axis=1) / safe
+
+        # empty states keep their previous parameters
+        alive = weight > 1e-10
+
+        means[r] = np.where(alive, new_means, means[r])
+        variances[r] = np.maximum(
+            np.where(alive, new_vars, variances[r]), min_var
+        )
+
+        rows = xi.sum(axis=-1, keepdims=True)
+
+        with np.errstate(divide="ignore"):
+
+            log_a[r] = np.where(
+                rows > 0, np.log(xi / np.where(rows > 0, rows, 1.0)), log_a[r]
+            )
+
+            log_pi[r] = np.log(gamma[:, 0])
+
+        # -----------------------------------
+        # Convergence (log likelihood of the E step parameters)
+        # -----------------------------------
+        done = ll - loglik[r] < tol
+
+        loglik[r] = ll
+
+        active = r[~done]
+
+    return log_pi, log_a, means, variances, loglik, n_iter
+
+
+def viterbi(log_b, log_pi, log_a):
+
+    """
+    Most likely state paths, (R, T).
+    """
+
+    n_batch, n_obs, n_states = log_b.shape
+
+    back = np.empty((n_batch, n_obs, n_states), dtype=np.intp)
+
+    score = log_pi + log_b[:, 0]
+
+    for t in range(1, n_obs):
+
+        candidates = score[:, :, None] + log_a
+
+        back[:, t] = candidates.argmax(axis=1)
+
+        score = candidates.max(axis=1) + log_b[:, t]
+
+    path = np.empty((n_batch, n_obs), dtype=np.intp)
+    path[:, -1] = score.argmax(axis=-1)
+
+    rows = np.arange(n_batch)
+
+    for t in range(n_obs - 1, 0, -1):
+        path[:, t - 1] = back[rows, t, path[:, t]]
+
+    return path
+
+
+class HMMRegimeEngine:
+    """
+    Hidden Markov Liquidity Regime Engine
+
+    Drop-in for RegimeEngine (same fit / predict / fit_composite /
+    classify contract): a Gaussian HMM with ``n_states`` states on
+    the liquidity composite, sampled at ``frequency`` (a period end
+    rule such as "ME", "QE" or "W-FRI"; month ends by default, the
+    rotation's rebalance frequency; None fits the daily series). States are ordered by mean and labelled with
+    ``labels`` (default -1, 0, 1, 2 as in the allocation table).
+
+    Baum-Welch runs ``n_restarts`` initialisations as one batch and
+    keeps the best likelihood. With warm_start=True a refit starts
+    from the previous fit only (e.g. the previous walk-forward
+    split), which converges in a few iterations.
+
+    Classification is causal ("filter"): the regime on a day is the
+    most likely state given all earlier periods and that day's
+    composite, so at each period end it is the filtered state.
+    decoding="viterbi" labels with the most likely in-sample path
+    instead (uses future observations; analysis only).
+    """
+
+    def __init__(
+        self,
+        n_states=4,
+        labels=(-1, 0, 1, 2),
+        frequency="ME",
+        n_restarts=8,
+        max_iter=100,
+        tol=1e-3,
+        min_var=1e-3,
+        warm_start=True,
+        decoding="filter",
+        seed=0
+    ):
+
+        if len(labels) != n_states:
+            raise ValueError("labels must have one entry per state.")
+
+        if decoding not in ("filter", "viterbi"):
+            raise ValueError("decoding must be 'filter' or 'viterbi'.")
+
+        self.n_states = n_states
+        self.labels = np.asarray(labels, dtype=float)
+        self.frequency = frequency
+        self.n_restarts = n_restarts
+        self.max_iter = max_iter
+        self.tol = tol
+        self.min_var = min_var
+        self.warm_start = warm_start
+        self.decoding = decoding
+        self.seed = seed
+
+        # train standardisation (as RegimeEngine)
+        self.mean_ = None
+        self.std_ = None
+
+        # HMM parameters in composite units, states by mean
+        self.startprob_ = None
+        self.transmat_ = None
+        self.means_ = None
+        self.vars_ = None
+
+        self.loglik_ = None
+        self.n_iter_ = None
+
+        self.fitted = False
+
+    # =====================================================
+    # FIT (TRAIN ONLY)
+    # =====================================================
+
+    def fit(self, train_df: pd.DataFrame):
+
+        self.fit_composite(self._build_liquidity_composite(train_df))
+
+    def fit_composite(self, liquidity: pd.Series):
+
+        observations = self._observations(liquidity)
+
+        if observations.empty:
+            raise ValueError(
+                "Liquidity series empty after preprocessing."
+            )
+
+        self.mean_ = observations.mean()
+        self.std_ = observations.std()
+
+        if self.std_ == 0 or np.isnan(self.std_):
+
+            raise ValueError(
+                "Standard deviation invalid during training."
+            )
+
+        x = self._standardize(observations)
+
+        log_pi, log_a, means, variances, loglik, n_iter = baum_welch(
+            x,
+            *self._initial_parameters(x),
+            max_iter=self.max_iter,
+            tol=self.tol,
+            min_var=self.min_var
+        )
+
+        best = np.argmax(loglik)
+
+        order = np.argsort(means[best])
+
+        with np.errstate(divide="ignore"):
+
+            self.startprob_ = np.exp(log_pi[best][order])
+            self.transmat_ = np.exp(log_a[best][np.ix_(order, order)])
+
+        self.means_ = means[best][order] * self.std_ + self.mean_
+        self.vars_ = variances[best][order] * self.std_ ** 2
+
+        self.loglik_ = loglik[best]
+        self.n_iter_ = n_iter
+
+        self.fitted = True
+
+    def _initial_parameters(self, x):
+
+        """
+        Batched starting points (R = restarts): the previous fit
+        when warm starting, else quantile means plus random draws.
+        """
+
+        k = self.n_states
+
+        if self.warm_start and self.means_ is not None:
+            return self._log_parameters()
+
+        rng = np.random.default_rng(self.seed)
+
+        r = self.n_restarts
+
+        means = np.empty((r, k))
+        means[0] = np.quantile(x, (np.arange(k) + 0.5) / k)
+        means[1:] = np.sort(
+            rng.choice(x, size=(r - 1, k)) + rng.normal(0, 0.1, (r - 1, k)),
+            axis=1
+        )
+
+        variances = np.full((r, k), max(x.var() / k, self.min_var))
+
+        stay = np.empty((r, 1, 1))
+        stay[0] = 0.9
+        stay[1:] = rng.uniform(0.6, 0.98, (r - 1, 1, 1))
+
+        eye = np.eye(k)
+
+        transmat = stay * eye + (1 - stay) * (1 - eye) / (k - 1)
+
+        log_pi = np.full((r, k), -np.log(k))
+
+        return log_pi, np.log(transmat), means, variances
+
+    # =====================================================
+    # PREDICT (OUT OF SAMPLE SAFE)
+    # =====================================================
+
+    def predict(self, df: pd.DataFrame):
+
+        if not self.fitted:
+
+            raise RuntimeError(
+                "HMMRegimeEngine must be fitted before predict()."
+            )
+
+        return self.classify(self._build_liquidity_composite(df))
+
+    def classify(self, liquidity: pd.Series):
+
+        if not self.fitted:
+
+            raise RuntimeError(
+                "HMMRegimeEngine must be fitted before classify()."
+            )
+
+        observations = self._observations(liquidity)
+
+        daily = liquidity.dropna()
+
+        if observations.empty or daily.empty:
+            return pd.Series(dtype="float")
+
+        # period (position in observations) of each daily value:
+        # observations are labelled at their period's end, so the
+        # first label on or after the day
+        if self.frequency is None:
+            period = np.arange(len(daily))
+        else:
+            period = observations.index.searchsorted(daily.index)
+
+        x = self._standardize(observations)
+
+        log_pi, log_a, means, variances = self._log_parameters()
+
+        log_b = log_emissions(x, means, variances)
+
+        if self.decoding == "viterbi":
+
+            states = viterbi(log_b, log_pi, log_a)[0][period]
+
+        else:
+
+            # prior of each period given all earlier periods
+            log_alpha = forward(log_b, log_pi, log_a)[0]
+
+            prior = np.empty(log_alpha.shape)
+            prior[0] = log_pi[0]
+            prior[1:] = _log_matmul(log_alpha[:-1], np.exp(log_a))
+
+            posterior = prior[period] + log_emissions(
+                self._standardize(daily.to_numpy()), means, variances
+            )[0]
+
+            states = posterior.argmax(axis=-1)
+
+        regimes = pd.Series(self.labels[states], index=daily.index)
+
+        return regimes.reindex(liquidity.index).ffill().dropna()
+
+    def viterbi_path(self, liquidity: pd.Series):
+
+        """
+        Most likely labelled state path at the observation
+        frequency (in sample analysis).
+        """
+
+        observations = self._observations(liquidity)
+
+        log_pi, log_a, means, variances = self._log_parameters()
+
+        path = viterbi(
+            log_emissions(self._standardize(observations), means, variances),
+            log_pi,
+            log_a
+        )[0]
+
+        return pd.Series(self.labels[path], index=observations.index)
+
+    # =====================================================
+    # HELPERS
+    # =====================================================
+
+    def _build_liquidity_composite(self, df: pd.DataFrame):
+
+        # same composite as the z-score engine
+        return RegimeEngine()._build_liquidity_composite(df)
+
+    def _observations(self, liquidity):
+
+        if self.frequency is None:
+            return liquidity.dropna()
+
+        return liquidity.ffill().resample(self.frequency).last().dropna()
+
+    def _standardize(self, values):
+
+        return (np.asarray(values, dtype=float) - self.mean_) / self.std_
+
+    def _log_parameters(self):
+
+        with np.errstate(divide="ignore"):
+
+            return (
+                np.log(self.startprob_)[None],
+                np.log(self.transmat_)[None],
+                self._standardize(self.means_)[None],
+                (self.vars_ / self.std_ ** 2)[None]
+            )
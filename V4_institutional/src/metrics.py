@@ -1,6 +1,8 @@
 import numpy as np
 import pandas as pd
 
+from src.rolling import rolling_mean, rolling_std
+
 
 def annualized_return(returns: pd.Series, periods_per_year: int = 12) -> float:
     """
@@ -33,4 +35,175 @@ def max_drawdown(cumulative_series: pd.Series) -> float:
     """
     rolling_max = cumulative_series.cummax()
     drawdown = (cumulative_series - rolling_max) / rolling_max
-    return drawdown.min()
\ No newline at end of file
+    return drawdown.min()
+
+
+# --------------------------------------------------
+# Batch metrics (time × series matrices)
+# --------------------------------------------------
+def _as_matrix(returns):
+    """
+    Return (values, index, columns) with time on axis 0.
+    """
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame()
+
+    if isinstance(returns, pd.DataFrame):
+        return returns.to_numpy(dtype=float), returns.index, returns.columns
+
+    values = np.asarray(returns, dtype=float)
+
+    if values.ndim == 1:
+        values = values[:, None]
+
+    return values, pd.RangeIndex(len(values)), pd.RangeIndex(values.shape[1])
+
+
+def drawdown_series(returns, index=None):
+    """
+    Drawdown path of every column (equity / running max - 1).
+    NaN returns count as flat periods.
+    """
+    values, idx, columns = _as_matrix(returns)
+
+    equity = np.cumprod(1 + np.nan_to_num(values), axis=0)
+
+    running_max = np.maximum.accumulate(equity, axis=0)
+
+    return pd.DataFrame(
+        (equity - running_max) / running_max,
+        index=idx if index is None else index,
+        columns=columns
+    )
+
+
+def rolling_sharpe(returns, window: int = 12, periods_per_year: int = 12):
+    """
+    Rolling annualized Sharpe ratio of every column.
+    """
+    values, idx, columns = _as_matrix(returns)
+
+    std = rolling_std(values, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = rolling_mean(values, window) / std * np.sqrt(periods_per_year)
+
+    sharpe[std == 0] = np.nan
+
+    return pd.DataFrame(sharpe, index=idx, columns=columns)
+
+
+def batch_metrics(
+    returns,
+    turnover=None,
+    transaction_cost: float = None,
+    periods_per_year: int = 12
+) -> pd.DataFrame:
+    """
+    Performance metrics for every column of a returns matrix in
+    one vectorized pass (no per-column Python loop).
+
+    Definitions match the scalar functions above; NaN returns are
+    skipped in moments and count as flat periods in the equity curve.
+
+    turnover :
+        optional matrix (same shape) of per-period turnover; adds
+        annual turnover, and with transaction_cost the annual cost
+        drag and net-of-cost CAGR / Sharpe.
+
+    Returns
+    -------
+    DataFrame indexed by column, one row per return stream.
+    """
+    values, _, columns = _as_matrix(returns)
+
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=0)
+
+    years = n / periods_per_year
+
+    # -----------------------------
+    # Return / risk
+    # -----------------------------
+    with np.errstate(divide="ignore", invalid="ignore"):
+
+        cumulative = np.prod(1 + np.nan_to_num(values), axis=0)
+
+        cagr = np.where(years > 0, cumulative ** (1 / years) - 1, np.nan)
+
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0, ddof=1)
+
+        sharpe = np.where(std == 0, np.nan, mean / std * np.sqrt(periods_per_year))
+
+        downside = np.sqrt(
+            np.nanmean(np.minimum(values, 0.0) ** 2, axis=0)
+        )
+
+        sortino = np.where(
+            downside == 0, np.nan,
+            mean / downside * np.sqrt(periods_per_year)
+        )
+
+        hit_rate = (values > 0).sum(axis=0) / n
+
+    # -----------------------------
+    # Drawdown depth and duration
+    # -----------------------------
+    equity = np.cumprod(1 + np.nan_to_num(values), axis=0)
+
+    running_max = np.maximum.accumulate(equity, axis=0)
+
+    drawdown = (equity - running_max) / running_max
+
+    max_dd = drawdown.min(axis=0)
+
+    # periods since the last high, longest stretch per column
+    t = np.arange(len(values))[:, None]
+
+    last_peak = np.maximum.accumulate(
+        np.where(drawdown == 0, t, -1),
+        axis=0
+    )
+
+    max_dd_duration = (t - last_peak).max(axis=0) if len(values) else 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        calmar = np.where(max_dd < 0, cagr / np.abs(max_dd), np.nan)
+
+    metrics = {
+
+        "cagr": cagr,
+        "volatility": std * np.sqrt(periods_per_year),
+        "sharpe": sharpe,
+        "sortino": sortino,
+        "calmar": calmar,
+        "max_drawdown": max_dd,
+        "max_drawdown_duration": max_dd_duration,
+        "hit_rate": hit_rate,
+        "periods": n
+
+    }
+
+    # -----------------------------
+    # Turnover adjusted
+    # -----------------------------
+    if turnover is not None:
+
+        turn, _, _ = _as_matrix(turnover)
+
+        metrics["annual_turnover"] = np.nanmean(turn, axis=0) * periods_per_year
+
+        if transaction_cost is not None:
+
+            net = values - np.nan_to_num(turn) * transaction_cost
+
+            net_metrics = batch_metrics(net, periods_per_year=periods_per_year)
+
+            metrics["annual_cost"] = (
+                metrics["annual_turnover"] * transaction_cost
+            )
+            metrics["net_cagr"] = net_metrics["cagr"].to_numpy()
+            metrics["net_sharpe"] = net_metrics["sharpe"].to_numpy()
+
+    return pd.DataFrame(metrics, index=columns)
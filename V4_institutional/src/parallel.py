@@ -0,0 +1,149 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# --------------------------------------------------
+# Worker State (one copy per process)
+# --------------------------------------------------
+_WORKER_DATA = None
+_WORKER_CACHE = {}
+
+
+def resolve_n_jobs(n_jobs):
+
+    """
+    None / 1 → serial, -1 → all cores, -2 → all but one, ...
+    """
+
+    cpu = os.cpu_count() or 1
+
+    if n_jobs is None:
+        return 1
+
+    if n_jobs < 0:
+        return max(cpu + 1 + n_jobs, 1)
+
+    return max(n_jobs, 1)
+
+
+def worker_cache():
+
+    """
+    Per process cache for state that is expensive to rebuild
+    (e.g. a prepared portfolio engine) and shared across tasks.
+    """
+
+    return _WORKER_CACHE
+
+
+# --------------------------------------------------
+# Memory Mapped Frame
+# --------------------------------------------------
+def _dump_frame(df, directory):
+
+    """
+    Write a numeric DatetimeIndex frame to .npy files so workers
+    can memory map it instead of receiving a pickled copy.
+    """
+
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("Data must have DatetimeIndex.")
+
+    values_path = os.path.join(directory, "values.npy")
+    index_path = os.path.join(directory, "index.npy")
+
+    index = df.index
+
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+
+    np.save(values_path, df.to_numpy(dtype="float64"))
+    np.save(index_path, index.to_numpy())
+
+    return {
+
+        "values": values_path,
+        "index": index_path,
+        "columns": list(df.columns),
+        "tz": df.index.tz,
+        "name": df.index.name
+
+    }
+
+
+def _load_frame(spec):
+
+    values = np.load(spec["values"], mmap_mode="r")
+
+    index = pd.DatetimeIndex(
+        np.load(spec["index"]),
+        name=spec["name"]
+    )
+
+    if spec["tz"] is not None:
+        index = index.tz_localize("UTC").tz_convert(spec["tz"])
+
+    return pd.DataFrame(
+        values,
+        index=index,
+        columns=spec["columns"],
+        copy=False
+    )
+
+
+def _init_worker(spec):
+
+    global _WORKER_DATA
+
+    _WORKER_DATA = _load_frame(spec)
+
+    _WORKER_CACHE.clear()
+
+
+def _call(func, task, kwargs):
+
+    return func(_WORKER_DATA, task, **kwargs)
+
+
+# --------------------------------------------------
+# Parallel Map
+# --------------------------------------------------
+def parallel_map(func, data, tasks, n_jobs=-1, **kwargs):
+
+    """
+    Run ``func(data, task, **kwargs)`` for every task on a process pool.
+
+    ``data`` is written once to a memory mapped file and attached by
+    each worker at start up; only the task and kwargs are pickled per
+    call. Results are returned in task order, so output is
+    deterministic regardless of completion order.
+
+    ``func`` must be a module level function.
+    """
+
+    tasks = list(tasks)
+
+    n_workers = min(resolve_n_jobs(n_jobs), max(len(tasks), 1))
+
+    with tempfile.TemporaryDirectory(prefix="wf_panel_") as directory:
+
+        spec = _dump_frame(data, directory)
+
+        with ProcessPoolExecutor(
+
+            max_workers=n_workers,
+            initializer=_init_worker,
+            initargs=(spec,)
+
+        ) as executor:
+
+            futures = [
+                executor.submit(_call, func, task, kwargs)
+                for task in tasks
+            ]
+
+            return [f.result() for f in futures]
@@ -1,10 +1,346 @@
+import copy
+
+import numpy as np
 import pandas as pd
 
-from src.regime_engine import RegimeEngine
-from src.risk_engine import RiskEngine
+from src.cost_engine import CostEngine
+from src.metrics import batch_metrics, drawdown_series
+from src.profiling import PipelineReport
+from src.regime_engine import (
+    COMPOSITE_WEIGHTS,
+    LIQUIDITY_COLUMNS,
+    SMOOTHING_WINDOW,
+    CompositeMoments,
+    RegimeEngine,
+)
+from src.risk_engine import RiskEngine, inverse_vol_scale
 from src.vol_target_engine import VolTargetEngine
 
 
+# --------------------------------------------------
+# Compute Precision
+# --------------------------------------------------
+# float32 stores asset prices at ~7 significant digits: monthly
+# returns agree with float64 to ~1e-6 absolute and momentum ties
+# closer than that may pick a different leader. The liquidity
+# composite always stays float64 (its growth rates are small
+# differences of large levels, and regimes switch on thresholds).
+COMPUTE_DTYPES = ("float64", "float32")
+
+FLOAT32_TOLERANCE = 1e-5
+
+
+def compact_panel(df, assets):
+
+    """
+    Engine columns only (assets + liquidity inputs) with asset
+    prices as float32: one compact copy instead of the full panel.
+    """
+
+    liquidity = [c for c in LIQUIDITY_COLUMNS if c in df.columns]
+
+    return pd.concat(
+        [
+            df[liquidity],
+            df[list(assets)].astype(np.float32)
+        ],
+        axis=1
+    )
+
+
+def month_end_last(frame):
+
+    """
+    Last valid value of every column in each calendar month, as
+    ``frame.resample("ME").last()`` restricted to months with rows.
+
+    Gathers rows by position (running last-valid index) instead of
+    a groupby: the frame's dtype is kept and peak memory stays a
+    small multiple of the panel.
+    """
+
+    values = frame.to_numpy()
+
+    n = len(values)
+
+    month = np.asarray(frame.index.year * 12 + frame.index.month)
+
+    ends = np.flatnonzero(np.append(month[1:] != month[:-1], True))
+    starts = np.append(0, ends[:-1] + 1)
+
+    position = np.where(
+        np.isnan(values),
+        -1,
+        np.arange(n, dtype=np.int32 if n < 2 ** 31 else np.int64)[:, None]
+    )
+
+    np.maximum.accumulate(position, axis=0, out=position)
+
+    last = position[ends]
+
+    out = np.take_along_axis(values, np.maximum(last, 0), axis=0)
+
+    out[last < starts[:, None]] = np.nan
+
+    index = (frame.index[ends] + pd.offsets.MonthEnd(0)).normalize()
+    index.name = frame.index.name
+
+    return pd.DataFrame(out, index=index, columns=frame.columns)
+
+
+# --------------------------------------------------
+# Regime State → (Equity Share, Defensive Share)
+# --------------------------------------------------
+DEFAULT_ALLOCATION_TABLE = {
+
+    2: (0.80, 0.20),    # Strong Risk On
+    1: (0.60, 0.40),    # Moderate Risk On
+    0: (0.30, 0.70),    # Defensive
+    -1: (0.00, 1.00),   # Strong Risk Off
+
+}
+
+
+def top_k_picks(momentum, equity_cols, top_k=1):
+
+    """
+    Top ``top_k`` momentum equities per date (NaN safe).
+
+    Returns positions into ``equity_cols`` (best first) and
+    whether each pick has a momentum estimate.
+
+    Ties go to the equity listed first, as in the original loop's
+    descending sort: the first maximum leads, and equal scores at
+    the top_k cut are taken in column order.
+    """
+
+    scores = momentum[..., np.asarray(equity_cols, dtype=int)]
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+
+    n = scores.shape[-1]
+    k = min(top_k, n)
+
+    if k == 1:
+
+        # first max, as a ranked leader
+        picks = np.argmax(scores, axis=-1)[..., None]
+
+    else:
+
+        # everything above the k-th score, then the first of the
+        # scores tied with it (a partial sort, not a full ranking)
+        kth = np.partition(scores, n - k, axis=-1)[..., n - k, None]
+
+        above = scores > kth
+        tied = scores == kth
+
+        chosen = above | (
+            tied
+            & (
+                np.cumsum(tied, axis=-1)
+                <= k - above.sum(axis=-1, keepdims=True)
+            )
+        )
+
+        # the k chosen positions in column order (stable sort of a
+        # boolean key)
+        picks = np.argsort(~chosen, axis=-1, kind="stable")[..., :k]
+
+        # best first within the k (for rank weighting)
+        order = np.argsort(
+            -np.take_along_axis(scores, picks, axis=-1),
+            axis=-1,
+            kind="stable"
+        )
+
+        picks = np.take_along_axis(picks, order, axis=-1)
+
+    valid = np.take_along_axis(scores, picks, axis=-1) > -np.inf
+
+    return picks, valid
+
+
+def allocation_weights(
+    momentum,
+    states,
+    allocation_table,
+    equity_cols,
+    defensive_cols,
+    top_k=1,
+    weighting="equal",
+    vol=None
+):
+
+    """
+    Raw regime allocation on arrays.
+
+    momentum : (..., dates, assets)
+    states   : (..., dates) regime state per date
+    vol      : (..., dates, assets), only for weighting="inverse_vol"
+
+    Leading axes (paths, configs) are independent, so a whole
+    stack is allocated in one pass. The ``top_k`` momentum equities
+    share the table's equity share (weighted "equal", by "rank" or
+    by "inverse_vol"), the defensive assets split the rest equally;
+    dates without any momentum estimate stay in cash and states
+    missing from the table are fully defensive.
+
+    Selection is a partial sort (np.partition) per date rather than
+    a full ranking; ties are broken as in top_k_picks.
+    """
+
+    if weighting not in ("equal", "rank", "inverse_vol"):
+        raise ValueError(
+            "weighting must be 'equal', 'rank' or 'inverse_vol'."
+        )
+
+    equity_cols = np.asarray(equity_cols, dtype=int)
+    defensive_cols = np.atleast_1d(np.asarray(defensive_cols, dtype=int))
+
+    # -----------------------------------
+    # Regime → equity / defensive shares
+    # -----------------------------------
+    equity_share = np.zeros(states.shape)
+    defensive_share = np.ones(states.shape)
+
+    for state, (eq, dfn) in allocation_table.items():
+
+        mask = states == state
+
+        equity_share[mask] = eq
+        defensive_share[mask] = dfn
+
+    active = ~np.isnan(momentum).all(axis=-1)
+
+    weights = np.zeros(momentum.shape)
+
+    weights[..., defensive_cols] = (
+        np.where(active, defensive_share, 0.0)[..., None]
+        / len(defensive_cols)
+    )
+
+    if len(equity_cols) == 0:
+        return weights
+
+    picks, valid = top_k_picks(momentum, equity_cols, top_k)
+
+    k = picks.shape[-1]
+
+    # -----------------------------------
+    # Weights within the equity sleeve
+    # -----------------------------------
+    if weighting == "rank":
+
+        sleeve = (k - np.arange(k)) * valid
+
+    elif weighting == "inverse_vol":
+
+        picked_vol = np.take_along_axis(
+            vol[..., equity_cols], picks, axis=-1
+        )
+
+        usable = valid & np.isfinite(picked_vol) & (picked_vol > 0)
+
+        sleeve = np.where(
+            usable, 1 / np.where(usable, picked_vol, 1.0), 0.0
+        )
+
+        # no vol estimate yet: fall back to equal weights
+        sleeve = np.where(
+            sleeve.sum(axis=-1, keepdims=True) > 0, sleeve, valid
+        )
+
+    else:
+
+        sleeve = valid.astype(float)
+
+    total = sleeve.sum(axis=-1, keepdims=True)
+
+    sleeve = sleeve / np.where(total > 0, total, 1.0)
+
+    np.put_along_axis(
+        weights,
+        equity_cols[picks],
+        sleeve * equity_share[..., None],
+        axis=-1
+    )
+
+    return weights
+
+
+# --------------------------------------------------
+# Event Driven Rebalancing
+# --------------------------------------------------
+REBALANCE_MODES = ("monthly", "event")
+
+
+def change_points(values):
+
+    """
+    True where a row differs from the previous one (the first row
+    always). ``values`` is (dates,) or (dates, k); NaN equals NaN.
+    """
+
+    values = np.asarray(values, dtype=float)
+
+    if values.ndim == 1:
+        values = values[:, None]
+
+    same = (values[1:] == values[:-1]) | (
+        np.isnan(values[1:]) & np.isnan(values[:-1])
+    )
+
+    return np.append(True, ~same.all(axis=1)) if len(values) else (
+        np.zeros(0, dtype=bool)
+    )
+
+
+def carry_forward(targets, starts, returns):
+
+    """
+    Holdings of a sparse rebalance schedule, all rows at once.
+
+    targets : (rebalances, assets) traded to at rows ``starts``
+    returns : (dates, assets) period returns
+
+    Between rebalances holdings drift with prices (cash at 0),
+    from prefix products of the gross returns; rows before the
+    first rebalance are in cash. Returns the weights held in each
+    row and the drifted (pre-trade) weights at the start of it.
+    """
+
+    n, n_assets = returns.shape
+
+    growth = np.ones((n + 1, n_assets))
+
+    np.cumprod(1 + returns, axis=0, out=growth[1:])
+
+    # last rebalance before each row (-1: none yet)
+    owner = np.searchsorted(starts, np.arange(n) - 1, side="right") - 1
+
+    drifted = np.zeros((n, n_assets))
+
+    invested = owner >= 0
+
+    if invested.any():
+
+        k = owner[invested]
+        rows = np.flatnonzero(invested)
+
+        target = targets[k]
+
+        held = target * (growth[rows] / growth[starts[k]])
+
+        drifted[rows] = held / (
+            1 + (held - target).sum(axis=1, keepdims=True)
+        )
+
+    weights = drifted.copy()
+    weights[starts] = targets
+
+    return weights, drifted
+
+
 class MultiAssetRotationEngine:
 
     def __init__(
@@ -12,17 +348,115 @@ class MultiAssetRotationEngine:
         df,
         assets=["NIFTY", "SPY", "GLD"],
         lookback=12,
-        transaction_cost=0.001
+        transaction_cost=0.001,
+        allocation_table=None,
+        defensive_asset="GLD",
+        vol_lookback=12,
+        target_vol=0.10,
+        vol_target_lookback=12,
+        regime_thresholds=(-1.0, 0.0, 1.0),
+        defensive_assets=None,
+        equity_assets=None,
+        top_k=1,
+        selection_weighting="equal",
+        report=None,
+        pipeline=None,
+        compute_dtype="float64",
+        cost_engine=None,
+        regime_model=None,
+        rebalance="monthly",
+        drift_band=0.05
     ):
 
-        self.df = df.copy()
+        if compute_dtype not in COMPUTE_DTYPES:
+            raise ValueError(f"compute_dtype must be one of {COMPUTE_DTYPES}.")
+
+        if rebalance not in REBALANCE_MODES:
+            raise ValueError(f"rebalance must be one of {REBALANCE_MODES}.")
+
+        self.compute_dtype = compute_dtype
+
+        # The panel is referenced, not copied: the engine never
+        # writes to it (callers must not mutate it during a run).
+        # float32 mode keeps one compact copy of the engine columns.
+        if compute_dtype == "float32":
+            df = compact_panel(df, assets)
+
+        self.df = df
+
+        # Stage timings / counters (PipelineReport)
+        self.report = PipelineReport() if report is None else report
+
+        # Optional data_pipeline.Pipeline: cached intermediates
+        self.pipeline = pipeline
         self.assets = assets
         self.lookback = lookback
         self.transaction_cost = transaction_cost
 
+        # Turnover / cost model (proportional transaction_cost unless
+        # a CostEngine with spread / impact is given)
+        self.cost_engine = (
+            CostEngine(proportional=transaction_cost)
+            if cost_engine is None
+            else cost_engine
+        )
+
+        # Regime states missing from the table are fully defensive
+        self.allocation_table = (
+            DEFAULT_ALLOCATION_TABLE
+            if allocation_table is None
+            else allocation_table
+        )
+
+        # -----------------------------------
+        # Sleeves
+        # -----------------------------------
+        # defensive_assets (list) overrides the single defensive_asset;
+        # the risky sleeve defaults to every other asset
+        self.defensive_assets = (
+            [defensive_asset]
+            if defensive_assets is None
+            else list(defensive_assets)
+        )
+        self.defensive_asset = self.defensive_assets[0]
+
+        self.equity_assets = (
+            [a for a in assets if a not in self.defensive_assets]
+            if equity_assets is None
+            else list(equity_assets)
+        )
+
+        unknown = [
+            a for a in self.defensive_assets + self.equity_assets
+            if a not in assets
+        ]
+
+        if unknown:
+            raise ValueError(f"Sleeve assets not in assets: {unknown}")
+
+        # Equities per date and how the sleeve is split among them
+        self.top_k = top_k
+        self.selection_weighting = selection_weighting
+
+        self.vol_lookback = vol_lookback
+        self.regime_thresholds = regime_thresholds
+
+        # Optional RegimeEngine-compatible model (e.g. HMMRegimeEngine)
+        # used instead of the z-score buckets. The engine refits its
+        # own copy (the caller's model is never modified), so warm
+        # starts carry over between its backtest_until() calls
+        self.regime_model = regime_model
+
+        # "monthly": trade to target every month end. "event": trade
+        # only when the regime or the momentum leaders change, or a
+        # weight drifts more than drift_band (None: never) from its
+        # target; holdings drift with prices in between
+        self.rebalance = rebalance
+        self.drift_band = drift_band
+
         self.vol_target_engine = VolTargetEngine(
-            target_vol=0.10,
-            lookback=12
+            target_vol=target_vol,
+            lookback=vol_target_lookback
         )
 
         self.monthly_prices = None
@@ -33,16 +467,71 @@ class MultiAssetRotationEngine:
         self.turnover = None
         self.portfolio_returns = None
 
+        # Event mode: regime change points (decision dates),
+        # absolute trades per month and the reason ("regime",
+        # "leader", "drift") of each rebalance
+        self.regime_changes = None
+        self.trades = None
+        self.rebalances = None
+
+        # Daily mode (backtest_daily)
+        self.daily_returns = None
+        self.daily_weights = None
+        self.daily_turnover = None
+        self.daily_equity = None
+        self.daily_drawdown = None
+
+        # Regime independent state reused by backtest_until()
+        self.risk_engine = None
+        self.regime_engine = None
+        self.liquidity = None
+        self.liquidity_monthly = None
+        self.liquidity_moments = None
+
+    # --------------------------------------------------
+    # Cached Intermediates
+    # --------------------------------------------------
+    def _artifact(self, name, **overrides):
+
+        """
+        Intermediate ``name`` from the pipeline (shared object,
+        treat as read only). ``overrides`` replace the engine's
+        own parameters, e.g. lookback=6. The liquidity composite
+        takes the regime model's smoothing window and weights.
+        """
+
+        model = self.regime_model
+
+        params = {
+
+            "assets": tuple(self.assets),
+            "lookback": self.lookback,
+            "vol_lookback": self.vol_lookback,
+            "smoothing_window": getattr(
+                model, "smoothing_window", SMOOTHING_WINDOW
+            ),
+            "weights": tuple(
+                float(w) for w in getattr(model, "weights", COMPOSITE_WEIGHTS)
+            ),
+            **overrides
+
+        }
+
+        return self.pipeline.run(name, {"panel": self.df}, **params)
+
     # --------------------------------------------------
     # Monthly Data
     # --------------------------------------------------
     def _build_monthly_data(self):
 
-        monthly_prices = (
-            self.df[self.assets]
-            .resample("ME")
-            .last()
-        )
+        if self.pipeline is not None:
+
+            self.monthly_prices = self._artifact("monthly_prices")
+            self.monthly_returns = self._artifact("monthly_returns")
+
+            return
+
+        monthly_prices = month_end_last(self.df[self.assets])
 
         monthly_prices = monthly_prices.dropna()
 
@@ -57,13 +546,32 @@ class MultiAssetRotationEngine:
     # --------------------------------------------------
     # Liquidity Regime (Strength Based)
     # --------------------------------------------------
+    def _new_regime_engine(self):
+
+        if self.regime_model is not None:
+            return copy.deepcopy(self.regime_model)
+
+        return RegimeEngine(
+            thresholds=self.regime_thresholds
+        )
+
     def _build_regime(self):
 
-        engine = RegimeEngine()
+        engine = self._new_regime_engine()
+
+        if self.pipeline is not None:
+
+            liquidity = self._artifact("liquidity")
+
+            engine.fit_composite(liquidity)
+
+            daily_regime = engine.classify(liquidity)
 
-        engine.fit(self.df)
+        else:
 
-        daily_regime = engine.predict(self.df)
+            engine.fit(self.df)
+
+            daily_regime = engine.predict(self.df)
 
         if isinstance(daily_regime, pd.DataFrame):
             daily_regime = daily_regime.squeeze()
@@ -85,11 +593,67 @@ class MultiAssetRotationEngine:
     # --------------------------------------------------
     def _build_momentum(self):
 
+        if self.pipeline is not None:
+
+            self.momentum = self._artifact("momentum")
+
+            return
+
         self.momentum = (
             self.monthly_prices
             .pct_change(self.lookback)
         )
 
+    # --------------------------------------------------
+    # Sleeve Columns
+    # --------------------------------------------------
+    def sleeve_columns(self):
+
+        """
+        Column positions in ``assets`` of the equity and
+        defensive sleeves.
+        """
+
+        assets = list(self.assets)
+
+        equity_cols = [assets.index(a) for a in self.equity_assets]
+        defensive_cols = [assets.index(a) for a in self.defensive_assets]
+
+        return equity_cols, defensive_cols
+
+    # --------------------------------------------------
+    # Allocation Kernel (Vectorized)
+    # --------------------------------------------------
+    def _allocation_matrix(self, momentum, regime, vol=None):
+
+        """
+        Map regime states to raw target weights in one array pass.
+
+        The top_k momentum equities receive the equity share of the
+        allocation table, the defensive sleeve receives the rest.
+        Months without any momentum estimate stay in cash.
+        """
+
+        assets = list(self.assets)
+
+        equity_cols, defensive_cols = self.sleeve_columns()
+
+        if vol is not None:
+            vol = vol[assets].to_numpy(dtype=float)
+
+        weights = allocation_weights(
+            momentum[assets].to_numpy(dtype=float),
+            regime.to_numpy(dtype=float),
+            self.allocation_table,
+            equity_cols,
+            defensive_cols,
+            top_k=self.top_k,
+            weighting=self.selection_weighting,
+            vol=vol
+        )
+
+        return weights
+
     # --------------------------------------------------
     # Institutional Regime Strength Allocation
     # --------------------------------------------------
@@ -105,102 +669,211 @@ class MultiAssetRotationEngine:
         momentum = self.momentum.loc[common_index]
         regime = self.regime_monthly.loc[common_index]
 
+        risk_engine = self.risk_engine
+
+        if risk_engine is None:
+
+            risk_engine = RiskEngine(
+                returns=self.monthly_returns,
+                vol_lookback=self.vol_lookback
+            )
+
+        vol = None
+
+        if self.selection_weighting == "inverse_vol":
+
+            if risk_engine.volatility is None:
+                risk_engine.compute_volatility()
+
+            vol = risk_engine.volatility.loc[common_index]
+
+        if self.rebalance == "event":
+
+            self._generate_event_weights(
+                returns, momentum, regime, vol, risk_engine
+            )
+
+            return
+
         weights = pd.DataFrame(
-            0.0,
+            self._allocation_matrix(momentum, regime, vol),
             index=returns.index,
             columns=self.assets
         )
 
-        for date in returns.index:
+        # -----------------------------------
+        # Prevent Lookahead Bias
+        # -----------------------------------
+        weights = weights.shift(1).fillna(0.0)
 
-            if momentum.loc[date].isna().all():
-                continue
+        # -----------------------------------
+        # Apply Risk Budget (Inverse Vol)
+        # -----------------------------------
+        weights = risk_engine.apply_inverse_vol_weights(
+            weights
+        )
 
-            regime_state = regime.loc[date]
+        self.weights = weights
 
-            equity_assets = [
-                a for a in self.assets if a != "GLD"
-            ]
+    # --------------------------------------------------
+    # Event Driven Rebalancing
+    # --------------------------------------------------
+    def _generate_event_weights(
+        self,
+        returns,
+        momentum,
+        regime,
+        vol,
+        risk_engine
+    ):
 
-            equity_mom = (
-                momentum.loc[date, equity_assets]
-                .dropna()
-            )
+        """
+        Sparse rebalance schedule with holdings carried forward.
 
-            # Rank equities by momentum
-            ranked = equity_mom.sort_values(
-                ascending=False
-            )
+        Targets (allocation + inverse vol) are computed only at the
+        regime / leader change points; in between the positions
+        drift with prices, carried forward in array passes.
+        A weight more than drift_band off its target trades back
+        to the same target. Decisions lag one month as in the
+        monthly schedule.
+        """
 
-            # -----------------------------------
-            # STRONG RISK ON (+2)
-            # 80% equity / 20% gold
-            # -----------------------------------
-            if regime_state == 2:
+        assets = list(self.assets)
 
-                if not ranked.empty:
-                    weights.loc[date, ranked.index[0]] = 0.80
+        equity_cols, defensive_cols = self.sleeve_columns()
 
-                weights.loc[date, "GLD"] = 0.20
+        momentum = momentum[assets].to_numpy(dtype=float)
+        states = regime.to_numpy(dtype=float)
 
-            # -----------------------------------
-            # MODERATE RISK ON (+1)
-            # 60% equity / 40% gold
-            # -----------------------------------
-            elif regime_state == 1:
+        # -----------------------------------
+        # Change points (decision dates)
+        # -----------------------------------
+        picks, valid = top_k_picks(momentum, equity_cols, self.top_k)
 
-                if not ranked.empty:
-                    weights.loc[date, ranked.index[0]] = 0.60
+        leaders = np.where(valid, picks, -1)
 
-                weights.loc[date, "GLD"] = 0.40
+        if self.selection_weighting != "rank":
+            leaders = np.sort(leaders, axis=-1)
 
-            # -----------------------------------
-            # DEFENSIVE (0)
-            # 30% equity / 70% gold
-            # -----------------------------------
-            elif regime_state == 0:
+        active = ~np.isnan(momentum).all(axis=-1)
 
-                if not ranked.empty:
-                    weights.loc[date, ranked.index[0]] = 0.30
+        regime_change = change_points(states)
 
-                weights.loc[date, "GLD"] = 0.70
+        leader_change = change_points(
+            np.column_stack([leaders, active])
+        )
 
-            # -----------------------------------
-            # STRONG RISK OFF (-1)
-            # 100% gold
-            # -----------------------------------
-            else:
+        self.regime_changes = regime.index[regime_change]
+
+        # applied one month later; the first month is in cash
+        n = len(returns)
 
-                weights.loc[date, "GLD"] = 1.0
+        event = np.zeros(n, dtype=bool)
+        event[1:] = (regime_change | leader_change)[:-1]
+
+        events = np.flatnonzero(event)
+
+        decisions = events - 1
 
         # -----------------------------------
-        # Prevent Lookahead Bias
+        # Targets at the change points only
         # -----------------------------------
-        weights = weights.shift(1).fillna(0.0)
+        if risk_engine.volatility is None:
+            risk_engine.compute_volatility()
+
+        risk_vol = (
+            risk_engine.volatility
+            .reindex(returns.index)[assets]
+            .to_numpy(dtype=float)
+        )
+
+        raw = allocation_weights(
+            momentum[decisions],
+            states[decisions],
+            self.allocation_table,
+            equity_cols,
+            defensive_cols,
+            top_k=self.top_k,
+            weighting=self.selection_weighting,
+            vol=None if vol is None else (
+                vol[assets].to_numpy(dtype=float)[decisions]
+            )
+        )
+
+        targets = inverse_vol_scale(raw, risk_vol[events])
+
+        self.report.count("rebalance_targets", len(events))
 
         # -----------------------------------
-        # Apply Risk Budget (Inverse Vol)
+        # Carry forward between rebalances
         # -----------------------------------
-        risk_engine = RiskEngine(
-            returns=self.monthly_returns,
-            vol_lookback=12
+        # a drift band breach adds a rebalance (back to the same
+        # target) at the first breaching row of its segment; one
+        # pass per breach depth, not per month
+        period_returns = returns[assets].to_numpy(dtype=float)
+
+        starts = events
+        owner = np.arange(len(events))
+
+        reasons = np.where(
+            regime_change[decisions], "regime", "leader"
+        ).astype(object)
+
+        while True:
+
+            weights, drifted = carry_forward(
+                targets[owner], starts, period_returns
+            )
+
+            if self.drift_band is None or not len(starts):
+                break
+
+            segment = np.searchsorted(starts, np.arange(n), side="right") - 1
+
+            segment[:starts[0]] = 0
+
+            deviation = np.abs(weights - targets[owner][segment]).max(axis=1)
+
+            breach = deviation > self.drift_band
+            breach[:starts[0]] = False
+            breach[starts] = False
+
+            rows = np.flatnonzero(breach)
+
+            if not len(rows):
+                break
+
+            # first breach per segment
+            first = rows[np.unique(segment[rows], return_index=True)[1]]
+
+            order = np.argsort(np.append(starts, first), kind="stable")
+
+            starts = np.append(starts, first)[order]
+            owner = np.append(owner, owner[segment[first]])[order]
+            reasons = np.append(
+                reasons, np.full(len(first), "drift", dtype=object)
+            )[order]
+
+        traded = np.zeros((n, len(assets)))
+
+        traded[starts] = np.abs(targets[owner] - drifted[starts])
+
+        self.trades = pd.DataFrame(
+            traded, index=returns.index, columns=self.assets
         )
 
-        weights = risk_engine.apply_inverse_vol_weights(
-            weights
+        self.rebalances = pd.Series(
+            reasons, index=returns.index[starts], name="reason"
         )
 
-        self.weights = weights
+        self.weights = pd.DataFrame(
+            weights, index=returns.index, columns=self.assets
+        )
 
     # --------------------------------------------------
-    # Backtest
+    # Portfolio Returns
     # --------------------------------------------------
-    def backtest(self):
-
-        self._build_monthly_data()
-        self._build_regime()
-        self._build_momentum()
-        self._generate_weights()
+    def _build_portfolio_returns(self):
 
         aligned_returns = self.monthly_returns.loc[
             self.weights.index
@@ -210,15 +883,26 @@ class MultiAssetRotationEngine:
             self.weights * aligned_returns
         ).sum(axis=1)
 
-        self.turnover = (
-            self.weights
-            .diff()
-            .abs()
-            .sum(axis=1)
-            .fillna(0.0)
-        )
+        if self.rebalance == "event":
+
+            traded = self.trades.to_numpy()
+
+            self.turnover = pd.Series(
+                traded.sum(axis=1), index=self.weights.index
+            )
+
+            cost = pd.Series(
+                self.cost_engine.trade_cost(
+                    traded,
+                    assets=self.assets,
+                    turnover=self.turnover.to_numpy()
+                ),
+                index=self.weights.index
+            )
 
-        cost = self.turnover * self.transaction_cost
+        else:
+
+            self.turnover, cost = self.cost_engine.costs(self.weights)
 
         raw_returns = gross_returns - cost
 
@@ -232,4 +916,364 @@ class MultiAssetRotationEngine:
             1 + self.portfolio_returns
         ).cumprod()
 
-        return equity_curve
\ No newline at end of file
+        return equity_curve
+
+    # --------------------------------------------------
+    # Backtest
+    # --------------------------------------------------
+    def backtest(self):
+
+        report = self.report
+
+        with report.stage("monthly_data", rows=len(self.df)):
+            self._build_monthly_data()
+
+        with report.stage("regime", rows=len(self.df)):
+            self._build_regime()
+
+        with report.stage("momentum", rows=len(self.monthly_prices)):
+            self._build_momentum()
+
+        with report.stage("weights", rows=len(self.monthly_returns)):
+            self._generate_weights()
+
+        with report.stage("portfolio_returns", rows=len(self.weights)):
+            equity_curve = self._build_portfolio_returns()
+
+        report.count("backtests")
+
+        return equity_curve
+
+    # --------------------------------------------------
+    # Daily Backtest (Intramonth Drift)
+    # --------------------------------------------------
+    def backtest_daily(self):
+
+        """
+        Hold the monthly target weights on daily returns.
+
+        Rebalanced to target at each month end close, then weights
+        drift with prices until the next rebalance: holdings grow by
+        the (forward filled) price relative to the rebalance close,
+        gathered for all days at once (no day loop). The
+        un-invested remainder is held in cash at 0.
+
+        Costs (cost_engine) use the trades from drifted to target and
+        are charged on the first day of the month. The vol target
+        scaling of each month is applied as leverage fixed at the
+        rebalance. Each month therefore compounds to
+        s * (drifted gross - cost), the daily analogue of the
+        monthly backtest.
+
+        Sets daily_returns, daily_weights (drifted exposures),
+        daily_turnover, daily_drawdown; returns the daily equity.
+        """
+
+        if self.weights is None:
+            self.backtest()
+
+        report = self.report
+
+        with report.stage("daily", rows=len(self.df)):
+
+            targets = self.weights[self.assets]
+
+            # -----------------------------------
+            # Days held under each month's target
+            # -----------------------------------
+            month_end = self.df.index + pd.offsets.MonthEnd(0)
+
+            period = targets.index.get_indexer(month_end)
+
+            keep = period >= 0
+
+            days = self.df.index[keep]
+            period = period[keep]
+
+            target = targets.to_numpy()[period]
+
+            n_days = len(days)
+            rows = np.arange(n_days)
+
+            new_period = np.ones(n_days, dtype=bool)
+            new_period[1:] = period[1:] != period[:-1]
+
+            first = np.maximum.accumulate(np.where(new_period, rows, 0))
+
+            # -----------------------------------
+            # Growth since the last rebalance
+            # -----------------------------------
+            # price / price at the previous month's last row, in the
+            # panel dtype (a ratio, so float32 loses no accumulated
+            # precision); unlisted assets stay at 1
+            prices = (
+                self.df[self.assets]
+                .ffill()
+                .to_numpy(dtype=self.compute_dtype)
+            )
+
+            held = np.flatnonzero(keep)
+            base = np.maximum(held[first] - 1, 0)
+
+            growth = prices[held]
+
+            with np.errstate(invalid="ignore"):
+                growth /= prices[base]
+
+            del prices
+
+            growth[np.isnan(growth)] = 1
+
+            # -----------------------------------
+            # Turnover: drifted → target at rebalance
+            # -----------------------------------
+            gross_value = (
+                1
+                + np.einsum("ij,ij->i", target, growth)
+                - target.sum(axis=1)
+            )
+
+            starts = np.flatnonzero(new_period)
+            ends = starts[1:] - 1
+
+            drifted = target[ends] * growth[ends] / gross_value[ends, None]
+
+            # trades at each rebalance, the first from cash
+            traded = np.empty((len(starts), len(self.assets)))
+            traded[0] = np.abs(target[starts[0]])
+            traded[1:] = np.abs(target[starts[1:]] - drifted)
+
+            turnover = np.zeros(n_days)
+            turnover[starts] = traded.sum(axis=1)
+
+            rebalance_cost = np.zeros(n_days)
+            rebalance_cost[starts] = self.cost_engine.trade_cost(
+                traded,
+                assets=self.assets,
+                turnover=turnover[starts]
+            )
+
+            cost = rebalance_cost[first]
+
+            # Raw value relative to the rebalance (cash at 0)
+            raw_value = gross_value - cost
+
+            # -----------------------------------
+            # Vol target as leverage per month
+            # -----------------------------------
+            last = np.ones(n_days, dtype=bool)
+            last[:-1] = new_period[1:]
+
+            raw_monthly = pd.Series(
+                raw_value[last] - 1,
+                index=targets.index[period[last]]
+            )
+
+            leverage = (
+                self.vol_target_engine
+                .scaling(raw_monthly)
+                .to_numpy()[np.cumsum(new_period) - 1]
+            )
+
+            value = 1 + leverage * (raw_value - 1)
+
+            previous = np.ones(n_days)
+            previous[1:] = np.where(new_period[1:], 1.0, value[:-1])
+
+            daily_returns = value / previous - 1
+
+            self.daily_returns = pd.Series(daily_returns, index=days)
+
+            # target becomes the weights buffer (no new T × N array)
+            target *= growth
+            target *= (leverage / value)[:, None]
+
+            del growth
+
+            self.daily_weights = pd.DataFrame(
+                target,
+                index=days,
+                columns=self.assets
+            )
+
+            self.daily_turnover = pd.Series(turnover, index=days)
+
+            self.daily_equity = (1 + self.daily_returns).cumprod()
+
+            self.daily_drawdown = drawdown_series(
+                self.daily_returns
+            ).iloc[:, 0]
+
+        return self.daily_equity
+
+    # --------------------------------------------------
+    # Incremental Backtest (Walk Forward)
+    # --------------------------------------------------
+    def prepare(self):
+
+        """
+        Build every regime independent input once:
+        monthly panel, momentum, rolling asset vols and
+        the daily liquidity composite.
+        """
+
+        report = self.report
+
+        with report.stage("monthly_data", rows=len(self.df)):
+            self._build_monthly_data()
+
+        with report.stage("momentum", rows=len(self.monthly_prices)):
+            self._build_momentum()
+
+        self.risk_engine = RiskEngine(
+            returns=self.monthly_returns,
+            vol_lookback=self.vol_lookback
+        )
+
+        self.regime_engine = self._new_regime_engine()
+
+        if self.pipeline is not None:
+
+            with report.stage("volatility", rows=len(self.monthly_returns)):
+                self.risk_engine.volatility = self._artifact("volatility")
+
+            with report.stage("liquidity", rows=len(self.df)):
+
+                self.liquidity = self._artifact("liquidity")
+                self.liquidity_monthly = self._artifact("liquidity_monthly")
+
+            return
+
+        with report.stage("volatility", rows=len(self.monthly_returns)):
+            self.risk_engine.compute_volatility()
+
+        with report.stage("liquidity", rows=len(self.df)):
+
+            self.liquidity = (
+                self.regime_engine
+                ._build_liquidity_composite(self.df)
+            )
+
+        # Month end value of the daily composite, matching the
+        # ffill + resample("ME").last() of the daily regimes
+        self.liquidity_monthly = (
+            self.liquidity
+            .ffill()
+            .resample("ME")
+            .last()
+        )
+
+    def backtest_until(self, end, start=None, fit_end=None, regime_engine=None):
+
+        """
+        Backtest on data up to ``end`` reusing the prepared panel.
+
+        Only the regime statistics are refit. Every month end on or
+        before ``end`` matches a fresh engine built on
+        ``df.loc[:end]``; the partial final month is not produced.
+
+        start / fit_end restrict the regime training window to
+        [start, fit_end] (default: everything up to ``end``), as a
+        composite built on that slice alone (its first smoothing
+        window rows dropped). The z-score RegimeEngine is
+        fit from prefix sums in O(1) per call.
+
+        regime_engine : a model already fitted on that window (e.g.
+        one link of a walk-forward warm start chain); it replaces
+        the engine's regime model and is not refit.
+        """
+
+        if self.liquidity is None:
+            self.prepare()
+
+        report = self.report
+
+        fit_end = end if fit_end is None else fit_end
+
+        skip = 0 if start is None else getattr(
+            self.regime_engine, "smoothing_window", SMOOTHING_WINDOW
+        )
+
+        with report.stage("regime", rows=len(self.liquidity_monthly)):
+
+            if regime_engine is not None:
+
+                self.regime_engine = regime_engine
+
+            elif hasattr(self.regime_engine, "fit_moments"):
+
+                if self.liquidity_moments is None:
+                    self.liquidity_moments = CompositeMoments(self.liquidity)
+
+                self.regime_engine.fit_moments(
+                    *self.liquidity_moments.window(start, fit_end, skip=skip)
+                )
+
+            else:
+
+                self.regime_engine.fit_composite(
+                    self.liquidity.loc[start:fit_end].iloc[skip:]
+                )
+
+            liquidity_monthly = self.liquidity_monthly.loc[:end]
+
+            self.regime_monthly = (
+                self.regime_engine
+                .classify(liquidity_monthly)
+                .reindex(liquidity_monthly.index)
+            )
+
+        with report.stage("weights", rows=len(self.monthly_returns)):
+            self._generate_weights()
+
+        with report.stage("portfolio_returns", rows=len(self.weights)):
+            equity_curve = self._build_portfolio_returns()
+
+        report.count("backtests")
+
+        return equity_curve
+
+
+# --------------------------------------------------
+# Monthly vs Event Driven Rebalancing
+# --------------------------------------------------
+def rebalance_comparison(df, drift_band=0.05, **engine_kwargs):
+
+    """
+    The same strategy rebalanced monthly and event driven:
+    batch_metrics (with annual turnover) side by side, plus the
+    number of rebalances of each.
+    """
+
+    returns = {}
+    turnover = {}
+    rebalances = {}
+
+    for mode in REBALANCE_MODES:
+
+        engine = MultiAssetRotationEngine(
+            df,
+            rebalance=mode,
+            drift_band=drift_band,
+            **engine_kwargs
+        )
+
+        engine.backtest()
+
+        returns[mode] = engine.portfolio_returns
+        turnover[mode] = engine.turnover
+
+        rebalances[mode] = (
+            int((engine.turnover > 0).sum())
+            if engine.rebalances is None
+            else len(engine.rebalances)
+        )
+
+    table = batch_metrics(
+        pd.DataFrame(returns),
+        turnover=pd.DataFrame(turnover)
+    ).T
+
+    table.loc["rebalances"] = pd.Series(rebalances)
+
+    return table
@@ -0,0 +1,290 @@
+import cProfile
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(level=logging.INFO):
+
+    """
+    Console logging for scripts and notebooks.
+
+    The engines only emit records; without this (or the caller's
+    own logging setup) INFO / DEBUG output is dropped.
+    """
+
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s"
+    )
+
+    logging.getLogger("src").setLevel(level)
+
+
+class PipelineReport:
+    """
+    Stage Timing / Profiling Report
+
+    Collects per stage:
+
+    - wall time and number of calls
+    - rows processed (when the stage reports them)
+    - traced peak memory (trace_memory=True)
+    - cProfile statistics (profile=True)
+
+    plus free form counters (splits run, paths, ...).
+
+    Timers are always on (two perf_counter calls per stage);
+    profiling and memory tracing cost only when enabled.
+    Every finished stage is logged at ``log_level``.
+    """
+
+    def __init__(
+        self,
+        profile=False,
+        trace_memory=False,
+        log_level=logging.DEBUG
+    ):
+
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.log_level = log_level
+
+        self.stages = {}
+        self.counters = Counter()
+        self.profiles = {}
+
+        # cProfile cannot nest: only the outermost stage profiles
+        self._profiling = False
+
+        # peak so far of each open traced stage (innermost last)
+        self._peaks = []
+
+    # --------------------------------------------------
+    # Recording
+    # --------------------------------------------------
+    @contextmanager
+    def stage(self, name, rows=None):
+
+        """
+        Time (and optionally profile / trace) a block:
+
+            with report.stage("regime", rows=len(df)):
+                ...
+        """
+
+        profiler = None
+
+        if self.profile and not self._profiling:
+
+            profiler = cProfile.Profile()
+            self._profiling = True
+
+        started_tracing = False
+
+        if self.trace_memory:
+
+            if not tracemalloc.is_tracing():
+
+                tracemalloc.start()
+                started_tracing = True
+
+            elif self._peaks:
+
+                # keep the enclosing stage's peak before resetting
+                self._peaks[-1] = max(
+                    self._peaks[-1], tracemalloc.get_traced_memory()[1]
+                )
+
+            tracemalloc.reset_peak()
+
+            self._peaks.append(0)
+
+        start = time.perf_counter()
+
+        if profiler is not None:
+            profiler.enable()
+
+        try:
+            yield self
+
+        finally:
+
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+
+            seconds = time.perf_counter() - start
+
+            peak_mb = None
+
+            if self.trace_memory:
+
+                peak = max(
+                    self._peaks.pop(), tracemalloc.get_traced_memory()[1]
+                )
+
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+
+                if started_tracing:
+                    tracemalloc.stop()
+
+                peak_mb = peak / 2 ** 20
+
+            self._record(name, seconds, rows, peak_mb, profiler)
+
+    def _record(self, name, seconds, rows, peak_mb, profiler):
+
+        entry = self.stages.setdefault(name, {
+
+            "calls": 0,
+            "seconds": 0.0,
+            "rows": 0,
+            "peak_mb": None
+
+        })
+
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+
+        if rows is not None:
+            entry["rows"] += rows
+
+        if peak_mb is not None:
+            entry["peak_mb"] = max(entry["peak_mb"] or 0.0, peak_mb)
+
+        if profiler is not None:
+
+            if name in self.profiles:
+                self.profiles[name].add(profiler)
+            else:
+                self.profiles[name] = pstats.Stats(profiler)
+
+        logger.log(
+            self.log_level,
+            "stage %s: %.1f ms%s",
+            name,
+            seconds * 1e3,
+            "" if rows is None else f", {rows} rows"
+        )
+
+    def count(self, name, n=1):
+
+        self.counters[name] += n
+
+    def merge(self, other):
+
+        """
+        Fold another report (e.g. a per split engine's) into this one.
+        """
+
+        for name, entry in other.stages.items():
+
+            mine = self.stages.setdefault(name, {
+
+                "calls": 0,
+                "seconds": 0.0,
+                "rows": 0,
+                "peak_mb": None
+
+            })
+
+            mine["calls"] += entry["calls"]
+            mine["seconds"] += entry["seconds"]
+            mine["rows"] += entry["rows"]
+
+            if entry["peak_mb"] is not None:
+                mine["peak_mb"] = max(mine["peak_mb"] or 0.0, entry["peak_mb"])
+
+        self.counters.update(other.counters)
+
+        for name, stats in other.profiles.items():
+
+            if name in self.profiles:
+                self.profiles[name].add(stats)
+            else:
+                self.profiles[name] = stats
+
+        return self
+
+    # --------------------------------------------------
+    # Output
+    # --------------------------------------------------
+    def to_frame(self):
+
+        """
+        One row per stage, slowest first.
+        """
+
+        table = pd.DataFrame.from_dict(
+            self.stages,
+            orient="index",
+            columns=["calls", "seconds", "rows", "peak_mb"]
+        )
+
+        table.index.name = "stage"
+
+        return table.sort_values("seconds", ascending=False)
+
+    @property
+    def peak_mb(self):
+
+        """
+        Largest traced peak over all stages (None unless
+        trace_memory=True).
+        """
+
+        peaks = [
+            e["peak_mb"] for e in self.stages.values()
+            if e["peak_mb"] is not None
+        ]
+
+        return max(peaks) if peaks else None
+
+    def to_dict(self):
+
+        return {
+            "stages": {k: dict(v) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+            "peak_mb": self.peak_mb
+        }
+
+    def hot_spots(self, stage, n=20, sort="cumulative"):
+
+        """
+        Top ``n`` functions of a profiled stage as text.
+        """
+
+        if stage not in self.profiles:
+            raise KeyError(f"No profile recorded for stage {stage!r}.")
+
+        out = io.StringIO()
+
+        stats = pstats.Stats(stream=out)
+        stats.add(self.profiles[stage])
+        stats.sort_stats(sort).print_stats(n)
+
+        return out.getvalue()
+
+    def log_summary(self, level=logging.INFO):
+
+        if not logger.isEnabledFor(level):
+            return
+
+        logger.log(level, "stage timings:\n%s", self.to_frame().to_string())
+
+        if self.counters:
+            logger.log(level, "counters: %s", dict(self.counters))
+
+        if self.peak_mb is not None:
+            logger.log(level, "peak traced memory: %.1f MB", self.peak_mb)
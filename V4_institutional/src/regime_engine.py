@@ -1,10 +1,154 @@
+from collections import deque
+
 import pandas as pd
 import numpy as np
 
 
+LIQUIDITY_COLUMNS = ["US_M2", "ECB_ASSETS"]
+
+SMOOTHING_WINDOW = 3
+
+# US M2 / ECB assets weights of the composite
+COMPOSITE_WEIGHTS = (0.5, 0.5)
+
+
+def _window_mean(series: pd.Series, window: int):
+
+    """
+    Trailing mean as an explicit window sum.
+
+    Summed newest → oldest so RegimeEngine.update() reproduces
+    it bit for bit (pandas rolling carries running sums whose
+    rounding depends on the whole history).
+    """
+
+    total = series
+
+    for lag in range(1, window):
+        total = total + series.shift(lag)
+
+    return total / window
+
+
+def liquidity_growth(
+    df: pd.DataFrame,
+    smoothing_window: int = SMOOTHING_WINDOW
+):
+
+    """
+    Smoothed growth rate of each LIQUIDITY_COLUMNS series: the
+    inputs a liquidity composite weights together. Built once per
+    smoothing window, any set of composite weights is then a
+    linear combination of its columns.
+    """
+
+    for col in LIQUIDITY_COLUMNS:
+
+        if col not in df.columns:
+
+            raise ValueError(
+                f"{col} column missing."
+            )
+
+    return pd.DataFrame({
+
+        col: _window_mean(df[col] / df[col].shift(1) - 1, smoothing_window)
+        for col in LIQUIDITY_COLUMNS
+
+    })
+
+
+def combine_growth(growth: pd.DataFrame, weights=COMPOSITE_WEIGHTS):
+
+    """
+    Weighted liquidity composite from liquidity_growth() columns.
+    """
+
+    composite = weights[0] * growth[LIQUIDITY_COLUMNS[0]]
+
+    for col, weight in zip(LIQUIDITY_COLUMNS[1:], weights[1:]):
+        composite = composite + weight * growth[col]
+
+    return composite
+
+
+class CompositeMoments:
+    """
+    Prefix sums (count, Σx, Σx²) of a liquidity composite.
+
+    Train statistics of any date window are then O(1): the new
+    block is added and the expired block dropped by differencing
+    prefix sums, so walk-forward refits do not rescan the window.
+    Values are centred on the overall mean first, which keeps the
+    Σx² difference well conditioned.
+    """
+
+    def __init__(self, liquidity: pd.Series):
+
+        values = liquidity.to_numpy(dtype=np.float64)
+
+        valid = ~np.isnan(values)
+
+        self.index = liquidity.index
+        self.center = values[valid].mean() if valid.any() else 0.0
+
+        centred = np.where(valid, values - self.center, 0.0)
+
+        self._count = np.concatenate([[0], np.cumsum(valid)])
+        self._sum = np.concatenate([[0.0], np.cumsum(centred)])
+        self._sum_sq = np.concatenate([[0.0], np.cumsum(centred ** 2)])
+
+    def window(self, start=None, end=None, skip=0):
+
+        """
+        (count, mean, m2) of the non-NaN values dated in
+        [start, end], after skipping the first ``skip`` rows (e.g.
+        the SMOOTHING_WINDOW rows a composite built on that slice
+        alone would leave NaN).
+        """
+
+        index = self.index
+
+        i = 0 if start is None else index.searchsorted(start, "left")
+        j = len(index) if end is None else index.searchsorted(end, "right")
+
+        i = min(i + skip, j)
+
+        count = self._count[j] - self._count[i]
+
+        if count == 0:
+            return 0, np.nan, np.nan
+
+        total = self._sum[j] - self._sum[i]
+
+        mean = total / count
+
+        m2 = (self._sum_sq[j] - self._sum_sq[i]) - total * mean
+
+        return count, self.center + mean, max(m2, 0.0)
+
+
 class RegimeEngine:
 
-    def __init__(self):
+    def __init__(
+        self,
+        thresholds=(-1.0, 0.0, 1.0),
+        smoothing_window=SMOOTHING_WINDOW,
+        weights=COMPOSITE_WEIGHTS
+    ):
+
+        # z-score cut points: risk off / defensive / moderate / strong
+        self.thresholds = tuple(thresholds)
+
+        # composite: growth smoothed over smoothing_window periods,
+        # weighted per LIQUIDITY_COLUMNS
+        self.smoothing_window = smoothing_window
+        self.weights = tuple(weights)
+
+        if len(self.weights) != len(LIQUIDITY_COLUMNS):
+            raise ValueError(
+                f"weights needs one value per {LIQUIDITY_COLUMNS}."
+            )
 
         # learned ONLY from training window
         self.mean_ = None
@@ -12,6 +156,18 @@ class RegimeEngine:
 
         self.fitted = False
 
+        # running train statistics (Welford) for update(learn=True)
+        self.n_ = 0
+        self._m2 = 0.0
+
+        # streaming state for update()
+        self._levels = {col: np.nan for col in LIQUIDITY_COLUMNS}
+        self._growth = {
+            col: deque([np.nan] * smoothing_window, maxlen=smoothing_window)
+            for col in LIQUIDITY_COLUMNS
+        }
+        self._last_regime = np.nan
+
 
     # =====================================================
     # FIT (TRAIN ONLY)
@@ -25,6 +181,18 @@ class RegimeEngine:
 
         liquidity = self._build_liquidity_composite(train_df)
 
+        self.fit_composite(liquidity)
+
+
+    def fit_composite(self, liquidity: pd.Series):
+
+        """
+        Learn distribution from a prebuilt liquidity composite.
+
+        Lets callers build the composite once and refit on
+        successive training windows.
+        """
+
         liquidity = liquidity.dropna()
 
         if liquidity.empty:
@@ -42,6 +210,40 @@ class RegimeEngine:
                 "Standard deviation invalid during training."
             )
 
+        self.n_ = len(liquidity)
+        self._m2 = self.std_ ** 2 * (self.n_ - 1)
+
+        self.fitted = True
+
+
+    def fit_moments(self, count, mean, m2):
+
+        """
+        Learn distribution from sufficient statistics (count,
+        mean, sum of squared deviations), e.g. a CompositeMoments
+        window. Agrees with fit_composite() on the same window to
+        floating point tolerance.
+        """
+
+        if count == 0:
+            raise ValueError(
+                "Liquidity series empty after preprocessing."
+            )
+
+        std = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+
+        if std == 0 or np.isnan(std):
+
+            raise ValueError(
+                "Standard deviation invalid during training."
+            )
+
+        self.mean_ = mean
+        self.std_ = std
+
+        self.n_ = count
+        self._m2 = m2
+
         self.fitted = True
 
 
@@ -70,6 +272,22 @@ class RegimeEngine:
 
         liquidity = self._build_liquidity_composite(df)
 
+        return self.classify(liquidity)
+
+
+    def classify(self, liquidity: pd.Series):
+
+        """
+        Classify a prebuilt liquidity composite into regimes
+        using the fitted training distribution.
+        """
+
+        if not self.fitted:
+
+            raise RuntimeError(
+                "RegimeEngine must be fitted before classify()."
+            )
+
         # ===============================
         # APPLY TRAINING DISTRIBUTION
         # ===============================
@@ -89,23 +307,25 @@ class RegimeEngine:
         # REGIME STRENGTH CLASSIFICATION
         # =====================================
 
+        low, mid, high = self.thresholds
+
         # Strong Risk On
-        regimes[zscore > 1.0] = 2
+        regimes[zscore > high] = 2
 
         # Moderate Risk On
         regimes[
-            (zscore > 0.0)
-            & (zscore <= 1.0)
+            (zscore > mid)
+            & (zscore <= high)
         ] = 1
 
         # Neutral / Defensive
         regimes[
-            (zscore >= -1.0)
-            & (zscore <= 0.0)
+            (zscore >= low)
+            & (zscore <= mid)
         ] = 0
 
         # Strong Risk Off
-        regimes[zscore < -1.0] = -1
+        regimes[zscore < low] = -1
 
         # =====================================
         # INSTITUTIONAL CLEANUP
@@ -139,18 +359,28 @@ class RegimeEngine:
         Steps:
 
         1) Growth rate
-        2) 3 month smoothing
-        3) Equal weight combine
+        2) smoothing_window month smoothing (default 3)
+        3) Weighted combine (default equal weight)
         """
 
-        required_cols = [
+        return combine_growth(
+            liquidity_growth(df, self.smoothing_window),
+            self.weights
+        )
+
+
+    # =====================================================
+    # STREAMING (O(1) PER OBSERVATION)
+    # =====================================================
 
-            "US_M2",
-            "ECB_ASSETS"
+    def prime(self, df: pd.DataFrame):
 
-        ]
+        """
+        Load the rolling state from history so update() continues
+        exactly where predict(df) ends.
+        """
 
-        for col in required_cols:
+        for col in LIQUIDITY_COLUMNS:
 
             if col not in df.columns:
 
@@ -158,24 +388,123 @@ class RegimeEngine:
                     f"{col} column missing."
                 )
 
-        # Growth
+            levels = df[col]
+
+            growth = (
+                levels / levels.shift(1) - 1
+            ).iloc[-self.smoothing_window:]
+
+            self._levels[col] = (
+                np.float64(levels.iloc[-1]) if len(levels) else np.nan
+            )
+
+            # newest first, padded with NaN for short histories
+            buffer = self._growth[col]
+            buffer.extend([np.nan] * self.smoothing_window)
+            buffer.extend(growth.to_numpy(dtype=np.float64))
+
+            buffer.reverse()
 
-        us_growth = df["US_M2"].pct_change()
+        self._last_regime = np.nan
+
+        if self.fitted:
+
+            regimes = self.predict(df)
+
+            if not regimes.empty:
+                self._last_regime = regimes.iloc[-1]
+
+
+    def update(self, new_row, learn: bool = False):
+
+        """
+        Consume one new observation (mapping with US_M2 and
+        ECB_ASSETS) and return its regime in constant time.
+
+        Matches predict() on the same data bit for bit. With
+        learn=True the observation is first folded into the train
+        statistics (Welford running mean / variance); those agree
+        with a batch fit to floating point tolerance only.
+        """
+
+        if not self.fitted and not learn:
+
+            raise RuntimeError(
+                "RegimeEngine must be fitted before update()."
+            )
+
+        smoothed = {}
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+
+            for col in LIQUIDITY_COLUMNS:
+
+                level = np.float64(new_row[col])
+
+                buffer = self._growth[col]
+
+                buffer.appendleft(level / self._levels[col] - 1)
+
+                self._levels[col] = level
+
+                # same order as _window_mean: newest → oldest
+                total = buffer[0]
+
+                for lag in range(1, self.smoothing_window):
+                    total = total + buffer[lag]
+
+                smoothed[col] = total / self.smoothing_window
+
+        # same order as combine_growth
+        liquidity = self.weights[0] * smoothed[LIQUIDITY_COLUMNS[0]]
+
+        for col, weight in zip(LIQUIDITY_COLUMNS[1:], self.weights[1:]):
+            liquidity = liquidity + weight * smoothed[col]
+
+        if learn and not np.isnan(liquidity):
+            self._learn(liquidity)
+
+        if np.isnan(liquidity) or not self.fitted:
+            return self._last_regime
+
+        zscore = (liquidity - self.mean_) / self.std_
+
+        low, mid, high = self.thresholds
+
+        if zscore > high:
+            regime = 2.0
+        elif zscore > mid:
+            regime = 1.0
+        elif zscore >= low:
+            regime = 0.0
+        else:
+            regime = -1.0
+
+        self._last_regime = regime
+
+        return regime
+
+
+    def _learn(self, value):
+
+        """
+        Welford update of the train mean / std with one value.
+        """
 
-        ecb_growth = df["ECB_ASSETS"].pct_change()
+        self.n_ += 1
 
-        # Smooth noise
+        mean = 0.0 if self.mean_ is None else self.mean_
 
-        us_growth = us_growth.rolling(3).mean()
+        delta = value - mean
 
-        ecb_growth = ecb_growth.rolling(3).mean()
+        mean = mean + delta / self.n_
 
-        # Composite
+        self._m2 += delta * (value - mean)
 
-        global_liquidity = (
+        self.mean_ = mean
 
-            us_growth + ecb_growth
+        if self.n_ > 1:
 
-        ) / 2
+            self.std_ = np.sqrt(self._m2 / (self.n_ - 1))
 
-        return global_liquidity
\ No newline at end of file
+            self.fitted = bool(self.std_ > 0)
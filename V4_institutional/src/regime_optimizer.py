@@ -0,0 +1,602 @@
+import itertools
+import logging
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import batch_metrics
+from src.parallel import parallel_map, resolve_n_jobs, worker_cache
+from src.portfolio_engine import MultiAssetRotationEngine, allocation_weights
+from src.regime_engine import (
+    COMPOSITE_WEIGHTS,
+    LIQUIDITY_COLUMNS,
+    SMOOTHING_WINDOW,
+    CompositeMoments,
+    combine_growth,
+    liquidity_growth,
+)
+from src.risk_engine import inverse_vol_scale
+from src.sweep_engine import ParameterSweepEngine
+from src.walk_forward import WalkForwardEngine
+
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------------
+# Default Search Space
+# --------------------------------------------------
+DEFAULT_LOWS = (-1.5, -1.0, -0.5)
+DEFAULT_MIDS = (-0.25, 0.0, 0.25)
+DEFAULT_HIGHS = (0.5, 1.0, 1.5)
+
+
+def threshold_grid(lows=DEFAULT_LOWS, mids=DEFAULT_MIDS, highs=DEFAULT_HIGHS):
+
+    """
+    Every (low, mid, high) z-score cut point set with
+    low <= mid <= high.
+    """
+
+    return [
+        t for t in itertools.product(lows, mids, highs)
+        if t[0] <= t[1] <= t[2]
+    ]
+
+
+def classify_many(zscore, thresholds):
+
+    """
+    Regimes of one z-score path under many cut point sets.
+
+    zscore : (months,), thresholds : (sets, 3) → (sets, months)
+
+    One broadcast comparison per cut against the 2-D threshold
+    array, with the cuts of RegimeEngine.classify (z > high → 2,
+    z > mid → 1, z >= low → 0, else -1). Months without a
+    composite carry the previous regime (NaN before the first).
+    """
+
+    t = np.asarray(thresholds, dtype=float)
+    z = np.asarray(zscore, dtype=float)
+
+    states = (
+        (z >= t[:, 0:1]).astype(float)
+        + (z > t[:, 1:2])
+        + (z > t[:, 2:3])
+        - 1
+    )
+
+    # forward fill: gather the last month with a composite
+    last = np.maximum.accumulate(
+        np.where(np.isnan(z), -1, np.arange(len(z)))
+    )
+
+    states = states[:, np.maximum(last, 0)]
+    states[:, last < 0] = np.nan
+
+    return states
+
+
+# --------------------------------------------------
+# Regime Independent Strategy Inputs
+# --------------------------------------------------
+# weight states of a month: the four regimes (codes 0..3), no
+# regime yet (fully defensive) and the first month (cash)
+REGIMES = (-1, 0, 1, 2)
+
+NO_REGIME = len(REGIMES)
+
+CASH = NO_REGIME + 1
+
+
+def strategy_inputs(
+    data,
+    assets,
+    lookback=12,
+    transaction_cost=0.001,
+    cost_engine=None
+):
+
+    """
+    Everything of MultiAssetRotationEngine that does not depend on
+    the regime path, per weight state and month:
+
+    - gross[state, t]        : gross return of month t when the
+                               weights were set in state ``state``
+    - cost[prev, state, t]   : trading cost of month t after a
+                               month held in state ``prev``
+
+    A regime path then costs O(months) gathers, whatever the
+    number of assets.
+    """
+
+    engine = MultiAssetRotationEngine(
+        df=data,
+        assets=assets,
+        lookback=lookback,
+        transaction_cost=transaction_cost,
+        cost_engine=cost_engine
+    )
+
+    engine.prepare()
+
+    index = engine.monthly_returns.index
+
+    momentum = engine.momentum.reindex(index)[assets].to_numpy(dtype=float)
+
+    vol = (
+        engine.risk_engine.volatility
+        .reindex(index)[assets]
+        .to_numpy(dtype=float)
+    )
+
+    returns = engine.monthly_returns[assets].to_numpy(dtype=float)
+
+    equity_cols, defensive_cols = engine.sleeve_columns()
+
+    # -----------------------------------
+    # Weights per state (decided a month earlier)
+    # -----------------------------------
+    shares = [
+        engine.allocation_table.get(regime, (0.0, 1.0))
+        for regime in REGIMES
+    ] + [(0.0, 1.0)]
+
+    raw = allocation_weights(
+        np.broadcast_to(momentum, (len(shares),) + momentum.shape),
+        np.broadcast_to(
+            np.arange(len(shares))[:, None], (len(shares), len(index))
+        ),
+        dict(enumerate(shares)),
+        equity_cols,
+        defensive_cols,
+        top_k=engine.top_k,
+        weighting=engine.selection_weighting,
+        vol=np.broadcast_to(vol, (len(shares),) + vol.shape)
+    )
+
+    weights = np.zeros((CASH + 1,) + momentum.shape)
+    weights[:CASH, 1:] = raw[:, :-1]
+
+    weights[:CASH] = inverse_vol_scale(weights[:CASH], vol)
+
+    gross = (weights * returns).sum(axis=-1)
+
+    # -----------------------------------
+    # Costs per (previous, current) state
+    # -----------------------------------
+    traded = np.abs(weights[None, :, 1:] - weights[:, None, :-1])
+
+    cost = np.zeros((CASH + 1, CASH + 1, len(index)))
+
+    cost[..., 1:] = engine.cost_engine.trade_cost(traded, assets=assets)
+
+    return {
+
+        "engine": engine,
+        "index": index,
+        "gross": gross,
+        "cost": cost
+
+    }
+
+
+def candidate_returns(inputs, zscore, thresholds, months=None):
+
+    """
+    Net, vol targeted monthly returns (sets, months) of the
+    strategy under each cut point set, over the first ``months``
+    months. Matches MultiAssetRotationEngine.backtest_until() with
+    the same regime path (up to float summation order).
+    """
+
+    engine = inputs["engine"]
+
+    months = len(inputs["index"]) if months is None else months
+
+    states = classify_many(zscore[:months], thresholds)
+
+    # weights of month t were set in the state of month t - 1
+    held = np.full(states.shape, CASH)
+
+    held[:, 1:] = np.where(
+        np.isnan(states[:, :-1]), NO_REGIME, states[:, :-1] + 1
+    )
+
+    t = np.arange(months)
+
+    raw = inputs["gross"][held, t]
+
+    raw[:, 1:] -= inputs["cost"][held[:, :-1], held[:, 1:], t[1:]]
+
+    vol_target = engine.vol_target_engine
+
+    return ParameterSweepEngine._vol_target(
+        raw,
+        [vol_target.lookback],
+        [vol_target.target_vol]
+    )[:, 0, 0]
+
+
+class RegimeOptimizer:
+    """
+    Walk Forward Regime Parameter Search
+
+    Searches the z-score cut points, the composite smoothing
+    window and the US M2 / ECB composite weights of the regime
+    model, choosing per walk-forward split on the training months
+    only and applying the choice to the following test block.
+
+    - each smoothing window's growth series is built once, each
+      weight set's composite (and its prefix sum moments) once
+    - all cut point sets of a composite are classified in one
+      array pass and scored as a stack of strategy return paths
+    - smoothing windows run in parallel (n_jobs)
+
+    The strategy is MultiAssetRotationEngine with the given
+    assets / lookback / costs, as in run_portfolio_backtest().
+    """
+
+    def __init__(
+        self,
+        data,
+        assets=["NIFTY", "SPY", "GLD"],
+        lookback=12,
+        transaction_cost=0.001,
+        cost_engine=None,
+        metric="sharpe",
+        report=None,
+        **walk_forward
+    ):
+
+        # splits: warmup_years, window, train_years, test_months,
+        # purge_days, embargo_days (see WalkForwardEngine)
+        self.walk_forward = WalkForwardEngine(
+            data, report=report, **walk_forward
+        )
+
+        self.data = self.walk_forward.data
+        self.report = self.walk_forward.report
+
+        self.assets = assets
+        self.lookback = lookback
+        self.transaction_cost = transaction_cost
+        self.cost_engine = cost_engine
+        self.metric = metric
+
+        self.results = None
+        self.scores = None
+        self.oos_returns = None
+
+    # --------------------------------------------------
+    # Search
+    # --------------------------------------------------
+    def run(
+        self,
+        thresholds=None,
+        smoothing=(SMOOTHING_WINDOW,),
+        weights=(COMPOSITE_WEIGHTS,),
+        n_jobs=1
+    ):
+
+        """
+        Evaluate every (smoothing, weights, thresholds) candidate.
+
+        thresholds : (low, mid, high) sets, default threshold_grid()
+        smoothing  : smoothing windows (months of growth averaged)
+        weights    : composite weights, one per LIQUIDITY_COLUMNS
+
+        Returns one row per split with the chosen parameters and
+        their training score. Train scores of every candidate are
+        kept in ``self.scores`` and the chosen parameters' test
+        block returns in ``self.oos_returns``.
+        """
+
+        report = self.report
+
+        thresholds = [
+            tuple(t) for t in (
+                threshold_grid() if thresholds is None else thresholds
+            )
+        ]
+
+        smoothing = [int(k) for k in smoothing]
+        weights = [tuple(w) for w in weights]
+
+        if any(len(w) != len(LIQUIDITY_COLUMNS) for w in weights):
+            raise ValueError(
+                f"weights needs one value per {LIQUIDITY_COLUMNS}."
+            )
+
+        if min(smoothing) < 1:
+            raise ValueError("smoothing windows must be at least 1.")
+
+        with report.stage("splits", rows=len(self.data)):
+            splits = self.walk_forward._generate_splits()
+
+        # Align portfolio history to asset availability
+        asset_start = self.data[self.assets].dropna().index[0]
+
+        valid_data = self.data.loc[asset_start:]
+
+        kwargs = {
+
+            "assets": self.assets,
+            "lookback": self.lookback,
+            "transaction_cost": self.transaction_cost,
+            "cost_engine": self.cost_engine,
+            "metric": self.metric,
+            "rolling": self.walk_forward.window == "rolling"
+
+        }
+
+        tasks = [
+
+            {
+                "smoothing": k,
+                "weights": weights,
+                "thresholds": thresholds,
+                "splits": splits
+            }
+
+            for k in smoothing
+
+        ]
+
+        with report.stage("inputs", rows=len(valid_data)):
+
+            inputs = strategy_inputs(
+                valid_data,
+                self.assets,
+                lookback=self.lookback,
+                transaction_cost=self.transaction_cost,
+                cost_engine=self.cost_engine
+            )
+
+        n_candidates = len(smoothing) * len(weights) * len(thresholds)
+
+        with report.stage("candidates", rows=n_candidates * len(splits)):
+
+            if resolve_n_jobs(n_jobs) > 1 and len(tasks) > 1:
+
+                scores = parallel_map(
+                    _smoothing_scores, valid_data, tasks,
+                    n_jobs=n_jobs, **kwargs
+                )
+
+            else:
+
+                scores = [
+                    _smoothing_scores(valid_data, task, inputs=inputs, **kwargs)
+                    for task in tasks
+                ]
+
+        report.count("regime_candidates", n_candidates)
+
+        # (smoothing, weights, thresholds) × splits
+        scores = np.stack(scores).transpose(0, 1, 3, 2).reshape(
+            n_candidates, len(splits)
+        )
+
+        candidates = list(itertools.product(smoothing, weights, thresholds))
+
+        self.scores = pd.DataFrame(
+            scores,
+            index=pd.MultiIndex.from_tuples(
+                candidates, names=["smoothing", "weights", "thresholds"]
+            )
+        )
+
+        # -----------------------------------
+        # Chosen parameters out of sample
+        # -----------------------------------
+        with report.stage("oos", rows=len(splits)):
+            rows, oos = self._apply(inputs, valid_data, splits, candidates, scores)
+
+        if not oos:
+
+            raise RuntimeError(
+                "No valid OOS returns generated. "
+                "No split had a finite training score."
+            )
+
+        oos_returns = pd.concat(oos)
+
+        self.oos_returns = oos_returns[
+            ~oos_returns.index.duplicated()
+        ].sort_index()
+
+        self.results = pd.DataFrame(rows)
+
+        logger.info(
+            "Regime search: %d candidates x %d splits, %d OOS months.",
+            n_candidates,
+            len(splits),
+            len(self.oos_returns)
+        )
+
+        return self.results
+
+    def _apply(self, inputs, data, splits, candidates, scores):
+
+        index = inputs["index"]
+
+        rolling = self.walk_forward.window == "rolling"
+
+        growth = {}
+        rows = []
+        oos = []
+
+        for s, split in enumerate(splits):
+
+            if np.isnan(scores[:, s]).all():
+
+                logger.warning(
+                    "No finite training score for split %s → %s — skipping.",
+                    split["test_start"],
+                    split["test_end"]
+                )
+
+                continue
+
+            best = int(np.nanargmax(scores[:, s]))
+
+            k, w, t = candidates[best]
+
+            if k not in growth:
+                growth[k] = liquidity_growth(data, k)
+
+            composite = combine_growth(growth[k], w)
+
+            zscore = _train_zscore(
+                _month_end(composite, index),
+                CompositeMoments(composite),
+                split,
+                k,
+                rolling
+            )
+
+            months = index.searchsorted(split["test_end"], "right")
+
+            returns = pd.Series(
+                candidate_returns(inputs, zscore, [t], months)[0],
+                index=index[:months]
+            ).loc[split["test_start"]:split["test_end"]]
+
+            if not returns.empty:
+                oos.append(returns)
+
+            rows.append({
+
+                **{key: split[key] for key in (
+                    "train_start", "train_end", "test_start", "test_end"
+                )},
+                "smoothing": k,
+                "weights": w,
+                "thresholds": t,
+                self.metric: scores[best, s],
+                "oos_months": len(returns)
+
+            })
+
+        return rows, oos
+
+
+# ==================================================
+# TASKS (module level so process pools can pickle them)
+# ==================================================
+def _month_end(composite, index):
+
+    """
+    Month end value of a daily composite on the monthly index,
+    as MultiAssetRotationEngine.prepare() builds it.
+    """
+
+    return (
+        composite.ffill().resample("ME").last()
+        .reindex(index)
+        .to_numpy()
+    )
+
+
+def _train_zscore(monthly, moments, split, smoothing, rolling):
+
+    """
+    Month end z-scores under the split's train statistics, fit as
+    backtest_until() fits them (expanding: all history to
+    train_end; rolling: a composite built on the train slice
+    alone). None when the window cannot be fit.
+    """
+
+    count, mean, m2 = moments.window(
+        split["train_start"] if rolling else None,
+        split["train_end"],
+        skip=smoothing if rolling else 0
+    )
+
+    std = np.sqrt(m2 / (count - 1)) if count > 1 else np.nan
+
+    if std == 0 or np.isnan(std):
+        return None
+
+    return (monthly - mean) / std
+
+
+def _smoothing_scores(
+    data,
+    task,
+    assets,
+    lookback,
+    transaction_cost,
+    cost_engine,
+    metric,
+    rolling,
+    inputs=None
+):
+
+    """
+    Training scores (weights, splits, thresholds) of one
+    smoothing window.
+    """
+
+    if inputs is None:
+
+        # Process pool worker: build once, reuse per task
+        cache = worker_cache()
+
+        key = (
+            "regime_inputs", tuple(assets), lookback, transaction_cost,
+            pickle.dumps(cost_engine)
+        )
+
+        if key not in cache:
+            cache[key] = strategy_inputs(
+                data, assets, lookback, transaction_cost, cost_engine
+            )
+
+        inputs = cache[key]
+
+    index = inputs["index"]
+
+    smoothing = task["smoothing"]
+    splits = task["splits"]
+    thresholds = task["thresholds"]
+
+    growth = liquidity_growth(data, smoothing)
+
+    scores = np.full(
+        (len(task["weights"]), len(splits), len(thresholds)), np.nan
+    )
+
+    for w, weights in enumerate(task["weights"]):
+
+        composite = combine_growth(growth, weights)
+
+        moments = CompositeMoments(composite)
+        monthly = _month_end(composite, index)
+
+        for s, split in enumerate(splits):
+
+            zscore = _train_zscore(
+                monthly, moments, split, smoothing, rolling
+            )
+
+            if zscore is None:
+                continue
+
+            months = index.searchsorted(split["train_end"], "right")
+
+            train = index[:months] >= split["train_start"]
+
+            if train.sum() < 2:
+                continue
+
+            returns = candidate_returns(inputs, zscore, thresholds, months)
+
+            scores[w, s] = batch_metrics(
+                returns[:, train].T
+            )[metric].to_numpy()
+
+    return scores
@@ -1,6 +1,30 @@
 import pandas as pd
 import numpy as np
 
+from src.rolling import rolling_std
+
+
+def inverse_vol_scale(raw_weights, vol):
+
+    """
+    Inverse volatility scaling on arrays, same math as
+    RiskEngine.apply_inverse_vol_weights.
+
+    raw_weights, vol : (..., dates, assets), broadcastable.
+    """
+
+    vol = np.where(vol == 0, np.nan, vol)
+
+    risk_scaled = raw_weights * (1 / vol)
+
+    exposure = np.nansum(risk_scaled, axis=-1, keepdims=True)
+    exposure[exposure == 0] = np.nan
+
+    return np.nan_to_num(
+        risk_scaled / exposure,
+        nan=0.0, posinf=0.0, neginf=0.0
+    )
+
 
 class RiskEngine:
     """
@@ -28,7 +52,8 @@ class RiskEngine:
 
     ):
 
-        self.returns = returns.copy()
+        # read only: referenced, not copied
+        self.returns = returns
         self.vol_lookback = vol_lookback
 
         self.volatility = None
@@ -45,13 +70,17 @@ class RiskEngine:
         Annualised volatility.
         """
 
-        vol = (
+        vol = pd.DataFrame(
+
+            rolling_std(
+                self.returns.to_numpy(),
+                self.vol_lookback
+            )
 
-            self.returns
-            .rolling(self.vol_lookback)
-            .std()
+            * np.sqrt(12),
 
-            * np.sqrt(12)
+            index=self.returns.index,
+            columns=self.returns.columns
 
         )
 
@@ -0,0 +1,326 @@
+"""
+Rolling statistics kernels on 2-D arrays.
+
+Time runs along ``axis`` (default 0, pandas layout); every other
+axis is an independent series, so one call covers a whole stack
+of assets × configs.
+
+Trailing-window semantics match pandas ``.rolling(window)``:
+a window containing any NaN (or fewer than ``window`` rows)
+gives NaN. EWMA kernels match ``.ewm(alpha=alpha, adjust=False,
+ignore_na=True)``.
+"""
+
+import numpy as np
+
+
+# Relative variance below which a window is recomputed exactly
+ILL_CONDITIONED = 1e-6
+
+# Largest log rescaling within one EWMA block ((1 - alpha)^-k
+# stays far from overflow)
+EWMA_LOG_RANGE = 300.0
+
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def _to_time_first(x, axis):
+
+    x = np.asarray(x, dtype=np.float64)
+
+    return np.moveaxis(x, axis, 0)
+
+
+def _window_sums(values, window):
+
+    """
+    Trailing window sums along axis 0. First ``window - 1`` rows
+    are NaN.
+
+    Prefix sums are taken within blocks of ``window`` rows, so a
+    window sum is local[i] + (total[b-1] - local[i-window]) with
+    every term bounded by one block: no error growth with series
+    length, unlike a single long cumulative sum.
+    """
+
+    n = len(values)
+
+    if n < window:
+        return np.full(values.shape, np.nan)
+
+    n_blocks = -(-n // window)
+
+    if n_blocks * window != n:
+
+        padded = np.zeros((n_blocks * window,) + values.shape[1:])
+        padded[:n] = values
+
+        values = padded
+
+    local = np.cumsum(
+        values.reshape((n_blocks, window) + values.shape[1:]),
+        axis=1
+    )
+
+    local[1:] += local[:-1, -1:] - local[:-1]
+
+    local[0, :window - 1] = np.nan
+
+    return local.reshape(values.shape)[:n]
+
+
+def _centered(x):
+
+    """
+    Centered values (NaN → 0), validity mask (None if no NaN)
+    and the per-series reference.
+    """
+
+    ref = _reference(x)
+
+    centered = x - ref
+
+    valid = ~np.isnan(x)
+
+    if valid.all():
+        return centered, None, ref
+
+    centered[~valid] = 0.0
+
+    return centered, valid, ref
+
+
+def _mask_incomplete(result, valid, window):
+
+    """
+    NaN out windows that contain a missing value.
+    """
+
+    if valid is None:
+        return result
+
+    count = _window_sums(valid.astype(np.float64), window)
+
+    result[~(count >= window)] = np.nan
+
+    return result
+
+
+def _reference(x):
+
+    """
+    First valid value per series. Centering on it keeps the
+    cumulative sums small (less cancellation) and, being an exact
+    pick rather than a reduction, gives the same bits whatever the
+    memory layout of the stack.
+    """
+
+    valid = ~np.isnan(x)
+
+    first = np.argmax(valid, axis=0)
+
+    ref = np.take_along_axis(x, first[None], axis=0)[0]
+
+    return np.where(np.isnan(ref), 0.0, ref)
+
+
+# --------------------------------------------------
+# Rolling Mean
+# --------------------------------------------------
+def rolling_mean(x, window, axis=0):
+
+    x = _to_time_first(x, axis)
+
+    centered, valid, ref = _centered(x)
+
+    mean = _window_sums(centered, window) / window + ref
+
+    mean = _mask_incomplete(mean, valid, window)
+
+    return np.moveaxis(mean, 0, axis)
+
+
+# --------------------------------------------------
+# Rolling Std
+# --------------------------------------------------
+def rolling_std(x, window, ddof=1, axis=0):
+
+    """
+    O(n) rolling standard deviation from centered cumulative sums
+    of x and x².
+
+    Stability corrections:
+    - data centered on a per-series reference before summing
+    - block-local prefix sums (no drift over long series)
+    - negative variance from rounding clipped to 0
+    - ill-conditioned windows recomputed exactly (two-pass);
+      constant windows are exactly 0 (as pandas), not a
+      rounding residue
+    """
+
+    x = _to_time_first(x, axis)
+
+    if window - ddof <= 0:
+        return np.moveaxis(np.full(x.shape, np.nan), 0, axis)
+
+    centered, valid, ref = _centered(x)
+
+    s1 = _window_sums(centered, window)
+
+    centered *= centered
+
+    s2 = _window_sums(centered, window)
+
+    var = s1 * s1
+    var /= -window
+    var += s2
+    var /= window - ddof
+
+    np.maximum(var, 0.0, out=var)
+
+    # Ill-conditioned windows (variance tiny next to the centered
+    # second moment) lose digits to cancellation: recompute those
+    # few windows exactly with a two-pass formula. Constant
+    # windows land here too and come out exactly 0.
+    s2 *= ILL_CONDITIONED / (window - ddof)
+
+    with np.errstate(invalid="ignore"):
+        ill = var <= s2
+
+    if ill.any():
+
+        pos = np.nonzero(ill)
+
+        rows = pos[0][:, None] - np.arange(window)[None, :]
+
+        values = x[(rows,) + tuple(p[:, None] for p in pos[1:])]
+
+        exact = values.var(axis=1, ddof=ddof)
+
+        exact[values.max(axis=1) == values.min(axis=1)] = 0.0
+
+        var[pos] = exact
+
+    var = _mask_incomplete(var, valid, window)
+
+    return np.moveaxis(np.sqrt(var), 0, axis)
+
+
+# --------------------------------------------------
+# EWMA
+# --------------------------------------------------
+def _ewma_filter(inputs, valid, alpha, initial):
+
+    """
+    y_t = (1 - alpha) y_{t-1} + inputs_t on valid rows (y carried
+    over the others), from y = initial, along axis 0.
+
+    With d = 1 - alpha and k_t the valid rows so far in a block,
+    y_t = d^k_t (y_0 + Σ_{s≤t} inputs_s d^-k_s): one cumulative sum
+    per block. Blocks are short enough for d^-k to stay finite and
+    hand their last value on to the next.
+    """
+
+    if alpha == 1.0:
+
+        # no memory: the latest valid input
+        last = np.maximum.accumulate(
+            np.where(valid, np.arange(len(inputs)).reshape(
+                (-1,) + (1,) * (inputs.ndim - 1)
+            ), -1),
+            axis=0
+        )
+
+        out = np.take_along_axis(inputs, np.maximum(last, 0), axis=0)
+
+        return np.where(last >= 0, out, initial)
+
+    log_decay = np.log1p(-alpha)
+
+    block = max(1, int(EWMA_LOG_RANGE / -log_decay))
+
+    out = np.empty(inputs.shape)
+
+    state = np.broadcast_to(initial, inputs.shape[1:]).astype(np.float64)
+
+    for start in range(0, len(inputs), block):
+
+        rows = slice(start, start + block)
+
+        steps = np.cumsum(valid[rows], axis=0)
+
+        rescaled = np.cumsum(
+            np.where(valid[rows], inputs[rows], 0.0)
+            * np.exp(-log_decay * steps),
+            axis=0
+        )
+
+        out[rows] = np.exp(log_decay * steps) * (state + rescaled)
+
+        state = out[rows][-1]
+
+    return out
+
+
+def ewma_mean(x, alpha, axis=0):
+
+    """
+    Exponentially weighted mean (adjust=False):
+    m_t = (1 - alpha) m_{t-1} + alpha x_t, started at the first
+    valid value. NaN observations carry the previous value.
+    O(n), vectorized across time and all other axes.
+    """
+
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1].")
+
+    x = _to_time_first(x, axis)
+
+    valid = ~np.isnan(x)
+
+    mean = _ewma_filter(alpha * x, valid, alpha, _reference(x))
+
+    mean[~np.logical_or.accumulate(valid, axis=0)] = np.nan
+
+    return np.moveaxis(mean, 0, axis)
+
+
+def ewma_std(x, alpha, axis=0):
+
+    """
+    Exponentially weighted standard deviation (adjust=False,
+    biased, as pandas ``.ewm(...).std(bias=True)``):
+
+    v_t = (1 - alpha) (v_{t-1} + alpha (x_t - m_{t-1})²)
+
+    The recursion is linear in v once the means are known, so it
+    runs through the same blocked closed form as ewma_mean.
+    """
+
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha must be in (0, 1].")
+
+    x = _to_time_first(x, axis)
+
+    valid = ~np.isnan(x)
+    started = np.logical_or.accumulate(valid, axis=0)
+
+    first = _reference(x)
+
+    mean = _ewma_filter(alpha * x, valid, alpha, first)
+
+    # mean before each row; the first valid row has no deviation
+    previous = np.empty(x.shape)
+    previous[0] = first
+    previous[1:] = mean[:-1]
+
+    delta = x - previous
+
+    var = _ewma_filter(
+        (1 - alpha) * alpha * delta * delta, valid, alpha, 0.0
+    )
+
+    var[~started] = np.nan
+
+    return np.moveaxis(np.sqrt(var), 0, axis)
@@ -0,0 +1,546 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.benchmark import environment_info
+from src.data_pipeline import (
+    DATA_DIR,
+    content_hash,
+    find_project_root,
+    load_dataset,
+    write_dataset,
+)
+from src.metrics import batch_metrics
+
+
+# ============================
+# CONFIG
+# ============================
+
+RUNS_DIR = os.path.join(DATA_DIR, "runs")
+
+INDEX_NAME = "index.jsonl"
+
+RUN_FILE = "run.json"
+
+# stored per run, one columnar dataset each
+FIELDS = ("returns", "weights", "turnover", "regimes")
+
+# arguments that change how a run executes, not its results
+EXECUTION_PARAMS = ("n_jobs", "incremental", "report", "pipeline")
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ======================================
+# RUN IDENTITY
+# ======================================
+
+def source_hash(directory: str = SOURCE_DIR) -> str:
+
+    """
+    SHA-256 of the engine sources (src/*.py): identifies the code
+    behind a run, committed or not.
+    """
+
+    digest = hashlib.sha256()
+
+    for name in sorted(os.listdir(directory)):
+
+        if not name.endswith(".py"):
+            continue
+
+        digest.update(name.encode())
+
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def describe(value):
+
+    """
+    JSON form of a run parameter. Objects (cost engines, regime
+    models) become their class name plus public constructor
+    attributes, and a hash of their fitted state (trailing
+    underscore attributes) when they have any: a fitted model
+    warm starts differently from an unfitted one.
+    """
+
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if isinstance(value, np.generic):
+        return value.item()
+
+    if isinstance(value, (list, tuple)):
+        return [describe(v) for v in value]
+
+    if isinstance(value, dict):
+        return {str(k): describe(v) for k, v in value.items()}
+
+    if isinstance(value, (pd.Series, pd.DataFrame, np.ndarray)):
+        return {"hash": content_hash(value)}
+
+    attributes = {
+
+        k: describe(v)
+        for k, v in sorted(getattr(value, "__dict__", {}).items())
+        if not k.startswith("_") and not k.endswith("_") and k != "fitted"
+
+    }
+
+    fitted = {
+
+        k: describe(v)
+        for k, v in sorted(getattr(value, "__dict__", {}).items())
+        if k.endswith("_") and not k.startswith("_") and v is not None
+
+    }
+
+    if fitted:
+        attributes["state"] = content_hash(json.dumps(fitted, sort_keys=True))
+
+    return {"class": type(value).__name__, **attributes}
+
+
+def bound_params(func, params: dict, skip=()) -> dict:
+
+    """
+    ``params`` bound to ``func``'s signature with its defaults
+    filled in, so a run keyed with a default left out and one with
+    it passed explicitly share an id (and ``find`` matches both).
+    """
+
+    bound = inspect.signature(func).bind_partial(**params)
+
+    bound.apply_defaults()
+
+    return {k: v for k, v in bound.arguments.items() if k not in skip}
+
+
+def run_params(params: dict) -> dict:
+
+    return {
+        k: describe(v) for k, v in sorted(params.items())
+        if k not in EXECUTION_PARAMS
+    }
+
+
+# ======================================
+# RUN STORE
+# ======================================
+
+class RunStore:
+    """
+    Persistent Run Registry
+
+    root/
+        index.jsonl          one record per run: id, kind, params,
+                             created, code version, data hash,
+                             date range, headline metrics
+        <run_id>/
+            run.json         the record plus the environment
+            returns/ ...     one columnar dataset per field
+                             (data_pipeline.write_dataset)
+
+    A run id hashes (kind, params, input data, source code), so an
+    identical run is found instead of recomputed. Fields load
+    memory mapped, in milliseconds.
+    """
+
+    def __init__(self, root: str = None):
+
+        # default: data_processed/runs of the project (found from
+        # the working directory upwards)
+        if root is None:
+            root = os.path.join(find_project_root(), RUNS_DIR)
+
+        self.root = root
+
+        os.makedirs(root, exist_ok=True)
+
+        # parsed index, refreshed when the file changes
+        self._records = []
+        self._stamp = None
+
+    # --------------------------------------------------
+    # Keys
+    # --------------------------------------------------
+    def key(self, kind, params, data=None, data_hash=None, code=None):
+
+        if data_hash is None and data is not None:
+            data_hash = content_hash(data)
+
+        payload = json.dumps({
+
+            "kind": kind,
+            "params": run_params(params),
+            "data": data_hash,
+            "source": source_hash() if code is None else code
+
+        }, sort_keys=True)
+
+        return content_hash(payload)[:16]
+
+    def _path(self, run_id, *parts):
+
+        return os.path.join(self.root, run_id, *parts)
+
+    def exists(self, run_id):
+
+        return os.path.exists(self._path(run_id, RUN_FILE))
+
+    # --------------------------------------------------
+    # Write
+    # --------------------------------------------------
+    def save(
+        self,
+        kind,
+        params,
+        returns,
+        weights=None,
+        turnover=None,
+        regimes=None,
+        data=None
+    ):
+
+        """
+        Persist a run and index it. Returns its id; a run already
+        stored under the same id is kept as is.
+        """
+
+        data_hash = None if data is None else content_hash(data)
+        code = source_hash()
+
+        run_id = self.key(kind, params, data_hash=data_hash, code=code)
+
+        if self.exists(run_id):
+            return run_id
+
+        fields = {
+
+            "returns": returns,
+            "weights": weights,
+            "turnover": turnover,
+            "regimes": regimes
+
+        }
+
+        fields = {k: v for k, v in fields.items() if v is not None}
+
+        environment = environment_info()
+
+        metrics = batch_metrics(
+            returns.rename("value"),
+            turnover=None if turnover is None else turnover.rename("value")
+        ).iloc[0]
+
+        record = {
+
+            "run_id": run_id,
+            "kind": kind,
+            "created": environment["timestamp"],
+            "git_commit": environment["git_commit"],
+            "source_hash": code,
+            "data_hash": data_hash,
+            "params": run_params(params),
+            "start": str(returns.index.min().date()),
+            "end": str(returns.index.max().date()),
+            "periods": len(returns),
+            "cagr": float(metrics["cagr"]),
+            "sharpe": float(metrics["sharpe"]),
+            "max_drawdown": float(metrics["max_drawdown"]),
+            "annual_turnover": float(metrics.get("annual_turnover", np.nan)),
+            "fields": {
+                k: "series" if isinstance(v, pd.Series) else "frame"
+                for k, v in fields.items()
+            }
+
+        }
+
+        # written to a temp dir and renamed: readers never see a
+        # partial run
+        staging = tempfile.mkdtemp(prefix=".run_", dir=self.root)
+
+        try:
+
+            for name, value in fields.items():
+
+                frame = value.to_frame() if isinstance(value, pd.Series) else value
+                frame = frame.rename(columns=str).astype(float)
+
+                write_dataset(frame, os.path.join(staging, name))
+
+            with open(os.path.join(staging, RUN_FILE), "w") as f:
+                json.dump({**record, "environment": environment}, f, indent=2)
+
+            os.replace(staging, self._path(run_id))
+
+        except OSError:
+
+            shutil.rmtree(staging, ignore_errors=True)
+
+            if not self.exists(run_id):
+                raise
+
+            # a concurrent writer stored the same run
+            return run_id
+
+        with open(os.path.join(self.root, INDEX_NAME), "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+        return run_id
+
+    # --------------------------------------------------
+    # Read
+    # --------------------------------------------------
+    def records(self):
+
+        """
+        Index records, oldest first (re-read only when the index
+        file changed).
+        """
+
+        path = os.path.join(self.root, INDEX_NAME)
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return []
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        if stamp != self._stamp:
+
+            with open(path) as f:
+                self._records = [json.loads(line) for line in f if line.strip()]
+
+            self._stamp = stamp
+
+        return self._records
+
+    def index(self):
+
+        """
+        One row per run, parameters as columns.
+        """
+
+        records = self.records()
+
+        if not records:
+            return pd.DataFrame(columns=["run_id", "kind", "created"])
+
+        table = pd.json_normalize(records, sep=".")
+
+        table.columns = [
+            c[len("params."):] if c.startswith("params.") else c
+            for c in table.columns
+        ]
+
+        table["created"] = pd.to_datetime(table["created"])
+
+        return table.set_index("run_id")
+
+    def find(
+        self,
+        kind=None,
+        code_version=None,
+        since=None,
+        until=None,
+        **params
+    ):
+
+        """
+        Runs matching every given parameter, newest first.
+
+        code_version matches a git commit or source hash prefix;
+        since / until bound the creation date.
+        """
+
+        wanted = run_params(params)
+
+        since = None if since is None else pd.Timestamp(since, tz="UTC")
+        until = None if until is None else pd.Timestamp(until, tz="UTC")
+
+        matches = []
+
+        for record in self.records():
+
+            if kind is not None and record["kind"] != kind:
+                continue
+
+            if code_version is not None and not any(
+                (record.get(k) or "").startswith(code_version)
+                for k in ("git_commit", "source_hash")
+            ):
+                continue
+
+            created = pd.Timestamp(record["created"])
+
+            if since is not None and created < since:
+                continue
+
+            if until is not None and created > until:
+                continue
+
+            if any(record["params"].get(k) != v for k, v in wanted.items()):
+                continue
+
+            matches.append(record["run_id"])
+
+        index = self.index()
+
+        return index.loc[matches[::-1]] if matches else index.iloc[:0]
+
+    def load(self, run_id, fields=FIELDS, mmap=True):
+
+        """
+        {"meta": run record, field: Series / DataFrame, ...} of a
+        stored run (fields it has of those requested).
+        """
+
+        if not self.exists(run_id):
+            raise KeyError(f"No stored run {run_id!r}.")
+
+        with open(self._path(run_id, RUN_FILE)) as f:
+            meta = json.load(f)
+
+        run = {"meta": meta}
+
+        for name in fields:
+
+            if name not in meta["fields"]:
+                continue
+
+            frame = load_dataset(self._path(run_id, name), mmap=mmap)
+
+            run[name] = (
+                frame.iloc[:, 0]
+                if meta["fields"][name] == "series"
+                else frame
+            )
+
+        return run
+
+    def cached(self, kind, params, compute, data=None):
+
+        """
+        Load the run (kind, params, data, current code) when it is
+        stored, otherwise ``compute()`` it (a dict of FIELDS),
+        save and return it.
+        """
+
+        run_id = self.key(kind, params, data=data)
+
+        if not self.exists(run_id):
+            self.save(kind, params, data=data, **compute())
+
+        return self.load(run_id)
+
+    def delete(self, run_id):
+
+        """
+        Remove a run and its index record.
+        """
+
+        shutil.rmtree(self._path(run_id), ignore_errors=True)
+
+        kept = [r for r in self.records() if r["run_id"] != run_id]
+
+        path = os.path.join(self.root, INDEX_NAME)
+
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.root, delete=False, suffix=".tmp"
+        ) as f:
+
+            for record in kept:
+                f.write(json.dumps(record) + "\n")
+
+        os.replace(f.name, path)
+
+
+# ======================================
+# STORED RUNS OF THE ENGINES
+# ======================================
+
+def walk_forward_run(data, store=None, splits=None, **backtest):
+
+    """
+    WalkForwardEngine.run_portfolio_backtest through a RunStore:
+    loaded when the same run (splits, backtest arguments, data,
+    code) is stored, computed and saved otherwise.
+
+    splits   : WalkForwardEngine arguments (warmup_years, window, ...)
+    backtest : run_portfolio_backtest arguments
+    """
+
+    from src.walk_forward import WalkForwardEngine
+
+    store = RunStore() if store is None else store
+
+    splits = {} if splits is None else dict(splits)
+
+    params = {
+
+        **bound_params(WalkForwardEngine, splits, skip=("data",)),
+        **bound_params(WalkForwardEngine.run_portfolio_backtest, backtest)
+
+    }
+
+    def compute():
+
+        wf = WalkForwardEngine(data, **splits)
+
+        returns = wf.run_portfolio_backtest(**backtest)
+
+        return {
+
+            "returns": returns,
+            "weights": wf.oos_weights,
+            "turnover": wf.oos_turnover,
+            "regimes": wf.oos_regimes
+
+        }
+
+    return store.cached(
+        "walkforward", params, compute, data=data
+    )
+
+
+def backtest_run(data, store=None, **engine):
+
+    """
+    Full-sample MultiAssetRotationEngine backtest through a
+    RunStore (see walk_forward_run).
+    """
+
+    from src.portfolio_engine import MultiAssetRotationEngine
+
+    store = RunStore() if store is None else store
+
+    def compute():
+
+        portfolio = MultiAssetRotationEngine(df=data, **engine)
+
+        portfolio.backtest()
+
+        return {
+
+            "returns": portfolio.portfolio_returns,
+            "weights": portfolio.weights,
+            "turnover": portfolio.turnover,
+            "regimes": portfolio.regime_monthly
+
+        }
+
+    params = bound_params(MultiAssetRotationEngine, engine, skip=("df",))
+
+    return store.cached("backtest", params, compute, data=data)
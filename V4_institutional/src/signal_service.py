@@ -0,0 +1,663 @@
+"""
+Local signal service: current regime and target weights over HTTP.
+
+    python -m src serve [--port 8765] [--poll 60]
+    python -m src.signal_service            # latency / throughput benchmark
+
+    GET  /health    liveness and last data date
+    GET  /regime    current liquidity regime
+    GET  /weights   target weights for the next rebalance
+    GET  /signal    both
+    POST /update    JSON rows [{"date": ..., "US_M2": ..., ...}]
+
+The fitted state lives in memory: new rows update the streaming
+regime in O(1) and the weights from a short tail of month end
+prices, and GET responses are pre-rendered bytes. Only asyncio
+from the standard library is used (no web framework).
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data_pipeline import (
+    CSV_NAME,
+    DATA_DIR,
+    find_project_root,
+    load_macro_panel,
+)
+from src.portfolio_engine import MultiAssetRotationEngine, allocation_weights
+from src.regime_engine import LIQUIDITY_COLUMNS
+from src.risk_engine import inverse_vol_scale
+from src.rolling import rolling_std
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PORT = 8765
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+
+# ======================================
+# SIGNAL STATE
+# ======================================
+
+class SignalState:
+    """
+    Live Regime / Target Weight State
+
+    Built once from a panel: a MultiAssetRotationEngine prepares
+    the month end prices and liquidity composite, and its
+    RegimeEngine is fitted (on data up to ``fit_end``, default
+    all) and primed for streaming. append() then consumes new
+    daily rows incrementally.
+
+    The target weights are the engine's allocation for the latest
+    month (the current, possibly partial month valued at its last
+    prices) and the latest regime, inverse vol scaled with the
+    latest asset vols: what a rebalance now would hold through the
+    next month.
+    """
+
+    def __init__(self, panel, fit_end=None, **engine_kwargs):
+
+        self.engine = MultiAssetRotationEngine(df=panel, **engine_kwargs)
+
+        engine = self.engine
+
+        engine.prepare()
+
+        engine.regime_engine.fit_composite(
+            engine.liquidity.loc[:fit_end] if fit_end else engine.liquidity
+        )
+
+        engine.regime_engine.prime(panel)
+
+        self.assets = list(engine.assets)
+        self.equity_cols, self.defensive_cols = engine.sleeve_columns()
+
+        # month end prices kept for momentum + vol (+1 for returns)
+        self.window = max(engine.lookback, engine.vol_lookback) + 1
+
+        self._months = engine.monthly_prices.iloc[-self.window:]
+
+        # current month: last valid price per asset so far
+        last = panel.index[-1]
+
+        self._month = (last.year, last.month)
+        self._month_prices = (
+            panel.loc[
+                panel.index >= last.to_period("M").start_time,
+                self.assets
+            ]
+            .ffill()
+            .iloc[-1]
+            .to_numpy(dtype=float, copy=True)
+        )
+
+        if self._months.index[-1].to_period("M") == last.to_period("M"):
+            self._months = self._months.iloc[:-1]
+
+        self.last_date = last
+        self.rows = 0
+        self.updated_at = time.time()
+
+        self._compute()
+
+    # --------------------------------------------------
+    # Incremental Updates
+    # --------------------------------------------------
+    def append(self, rows):
+
+        """
+        Consume new daily rows (DataFrame with a DatetimeIndex,
+        liquidity and asset columns). Rows on or before the last
+        date are ignored. Returns the number of rows applied.
+
+        Rows are validated and the month end prices staged before
+        the regime engine is touched, so a rejected update leaves
+        the state unchanged.
+        """
+
+        missing = [
+            c for c in LIQUIDITY_COLUMNS + self.assets
+            if c not in rows.columns
+        ]
+
+        if missing:
+            raise ValueError(f"Update rows missing columns: {missing}")
+
+        rows = rows.sort_index()
+        rows = rows[rows.index > self.last_date]
+
+        if rows.empty:
+            return 0
+
+        # raises on non-numeric values, before any state changes
+        liquidity = rows[LIQUIDITY_COLUMNS].to_numpy(dtype=float)
+        prices = rows[self.assets].to_numpy(dtype=float)
+
+        # -----------------------------------
+        # Stage month end prices
+        # -----------------------------------
+        months = self._months
+        month = self._month
+        month_prices = self._month_prices.copy()
+
+        for date, row_prices in zip(rows.index, prices):
+
+            if (date.year, date.month) != month:
+                months = self._close_month(months, month, month_prices)
+                month = (date.year, date.month)
+                month_prices = np.full(len(self.assets), np.nan)
+
+            valid = ~np.isnan(row_prices)
+
+            month_prices[valid] = row_prices[valid]
+
+        # -----------------------------------
+        # Commit
+        # -----------------------------------
+        regime_engine = self.engine.regime_engine
+
+        for values in liquidity:
+            regime_engine.update(dict(zip(LIQUIDITY_COLUMNS, values)))
+
+        self._months = months
+        self._month = month
+        self._month_prices = month_prices
+
+        self.last_date = rows.index[-1]
+        self.rows += len(rows)
+        self.updated_at = time.time()
+
+        self._compute()
+
+        return len(rows)
+
+    def _close_month(self, months, month, month_prices):
+
+        """
+        ``months`` with the finished month appended.
+        """
+
+        # months with a missing asset are dropped, as in the engine
+        if np.isnan(month_prices).any():
+            return months
+
+        end = pd.Timestamp(*month, 1) + pd.offsets.MonthEnd(0)
+
+        closed = pd.DataFrame(
+            [month_prices],
+            index=[end],
+            columns=self.assets
+        )
+
+        return pd.concat([months, closed]).iloc[-self.window:]
+
+    # --------------------------------------------------
+    # Signal
+    # --------------------------------------------------
+    def _compute(self):
+
+        engine = self.engine
+
+        prices = self._months.to_numpy(dtype=float)
+
+        if not np.isnan(self._month_prices).any():
+            prices = np.vstack([prices, self._month_prices])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+
+            momentum = prices[-1] / prices[-1 - engine.lookback] - 1
+
+            returns = prices[1:] / prices[:-1] - 1
+
+        vol = rolling_std(
+            returns[-engine.vol_lookback:], engine.vol_lookback
+        )[-1] * np.sqrt(12)
+
+        self.regime = engine.regime_engine._last_regime
+
+        state = np.array([self.regime], dtype=float)
+
+        raw = allocation_weights(
+            momentum[None],
+            state,
+            engine.allocation_table,
+            self.equity_cols,
+            self.defensive_cols,
+            top_k=engine.top_k,
+            weighting=engine.selection_weighting,
+            vol=vol[None]
+        )
+
+        self.weights = pd.Series(
+            inverse_vol_scale(raw, vol[None])[0],
+            index=self.assets
+        )
+
+        self._render()
+
+    def signal(self):
+
+        return {
+
+            "date": self.last_date.strftime("%Y-%m-%d"),
+            "regime": _number(self.regime),
+            "weights": {a: _number(w) for a, w in self.weights.items()}
+
+        }
+
+    def _render(self):
+
+        """
+        Serialize every GET response once per state change.
+        """
+
+        signal = self.signal()
+
+        health = {
+
+            "status": "ok",
+            "date": signal["date"],
+            "rows_applied": self.rows,
+            "updated_at": self.updated_at
+
+        }
+
+        date = signal["date"]
+
+        self.responses = {
+
+            "/health": _json(health),
+            "/regime": _json({"date": date, "regime": signal["regime"]}),
+            "/weights": _json({"date": date, "weights": signal["weights"]}),
+            "/signal": _json(signal)
+
+        }
+
+
+def _number(value):
+
+    value = float(value)
+
+    return None if np.isnan(value) else value
+
+
+def _json(payload):
+
+    return json.dumps(payload).encode()
+
+
+# ======================================
+# FILE SOURCE
+# ======================================
+
+class PanelFileSource:
+    """
+    Watches data_processed/macro_v4_clean.csv and returns the rows
+    added since the last check (e.g. after ``python -m src fetch
+    --refresh``).
+    """
+
+    def __init__(self, root):
+
+        self.root = root
+        self.path = os.path.join(root, DATA_DIR, CSV_NAME)
+        self.mtime = os.path.getmtime(self.path)
+
+    def new_rows(self, after):
+
+        mtime = os.path.getmtime(self.path)
+
+        if mtime == self.mtime:
+            return None
+
+        self.mtime = mtime
+
+        panel = load_macro_panel(self.root)
+
+        return panel[panel.index > after]
+
+
+# ======================================
+# HTTP SERVICE
+# ======================================
+
+class SignalService:
+    """
+    Minimal asyncio HTTP/1.1 server (keep-alive) over a SignalState.
+
+    With ``source`` and ``poll_seconds`` a background task applies
+    new rows from the source as they land.
+    """
+
+    def __init__(
+        self,
+        state,
+        host="127.0.0.1",
+        port=DEFAULT_PORT,
+        source=None,
+        poll_seconds=None
+    ):
+
+        self.state = state
+        self.host = host
+        self.port = port
+        self.source = source
+        self.poll_seconds = poll_seconds
+
+        self.server = None
+        self._poller = None
+
+    async def start(self):
+
+        self.server = await asyncio.start_server(
+            self._handle, self.host, self.port
+        )
+
+        # port=0 picks a free port
+        self.port = self.server.sockets[0].getsockname()[1]
+
+        if self.source is not None and self.poll_seconds:
+            self._poller = asyncio.create_task(self._poll())
+
+        logger.info("signal service on http://%s:%d", self.host, self.port)
+
+        return self
+
+    async def close(self):
+
+        if self._poller is not None:
+            self._poller.cancel()
+
+        self.server.close()
+
+        await self.server.wait_closed()
+
+    async def serve_forever(self):
+
+        await self.start()
+
+        async with self.server:
+            await self.server.serve_forever()
+
+    # --------------------------------------------------
+    # Data Polling
+    # --------------------------------------------------
+    async def _poll(self):
+
+        while True:
+
+            await asyncio.sleep(self.poll_seconds)
+
+            try:
+
+                rows = self.source.new_rows(self.state.last_date)
+
+                if rows is not None and not rows.empty:
+
+                    applied = self.state.append(rows)
+
+                    logger.info("applied %d new rows", applied)
+
+            except Exception:
+
+                logger.exception("data poll failed")
+
+    # --------------------------------------------------
+    # Requests
+    # --------------------------------------------------
+    async def _handle(self, reader, writer):
+
+        try:
+
+            while True:
+
+                request_line = await reader.readline()
+
+                if not request_line:
+                    break
+
+                headers = {}
+
+                while True:
+
+                    line = await reader.readline()
+
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = b""
+
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+
+                if length > 0:
+                    body = await reader.readexactly(length)
+
+                parts = request_line.decode("latin-1").split()
+
+                if len(parts) < 2 or length < 0:
+                    status, payload = 400, _json({"error": "bad request"})
+                else:
+                    status, payload = self._route(parts[0], parts[1], body)
+
+                # without a usable Content-Length the body's end is
+                # unknown: answer, then close
+                keep_alive = (
+                    length >= 0
+                    and headers.get("connection", "").lower() != "close"
+                )
+
+                writer.write(
+                    b"HTTP/1.1 %d %s\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n"
+                    b"Connection: %s\r\n\r\n"
+                    % (
+                        status,
+                        STATUS_TEXT[status].encode(),
+                        len(payload),
+                        b"keep-alive" if keep_alive else b"close"
+                    )
+                    + payload
+                )
+
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
+
+    def _route(self, method, path, body):
+
+        path = path.split("?", 1)[0]
+
+        if method == "GET":
+
+            payload = self.state.responses.get(path)
+
+            if payload is None:
+                return 404, _json({"error": f"unknown path {path}"})
+
+            return 200, payload
+
+        if method == "POST" and path == "/update":
+
+            try:
+
+                rows = pd.DataFrame(json.loads(body or b"[]"))
+
+                rows.index = pd.to_datetime(rows.pop("date"))
+
+                applied = self.state.append(rows)
+
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, _json({"error": str(e)})
+
+            return 200, _json(dict(self.state.signal(), rows_applied=applied))
+
+        if path in self.state.responses or path == "/update":
+            return 405, _json({"error": f"{method} not allowed"})
+
+        return 404, _json({"error": f"unknown path {path}"})
+
+
+# ======================================
+# BENCHMARK
+# ======================================
+
+async def _client(host, port, path, n, latencies):
+
+    reader, writer = await asyncio.open_connection(host, port)
+
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+
+    for _ in range(n):
+
+        start = time.perf_counter()
+
+        writer.write(request)
+
+        await writer.drain()
+
+        length = 0
+
+        while True:
+
+            line = await reader.readline()
+
+            if line == b"\r\n":
+                break
+
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+
+        await reader.readexactly(length)
+
+        latencies.append(time.perf_counter() - start)
+
+    writer.close()
+
+
+async def _load(service, path, n_requests, concurrency):
+
+    latencies = []
+
+    per_client = max(1, n_requests // concurrency)
+
+    start = time.perf_counter()
+
+    await asyncio.gather(*[
+        _client(service.host, service.port, path, per_client, latencies)
+        for _ in range(concurrency)
+    ])
+
+    return time.perf_counter() - start, np.array(latencies)
+
+
+def benchmark_service(
+    state,
+    n_requests=20000,
+    concurrency=(1, 16),
+    paths=("/signal",)
+):
+
+    """
+    Latency / throughput of the HTTP service on a local ephemeral
+    port (keep-alive clients in the same event loop), plus the
+    in-process cost of one append(). One row per path ×
+    concurrency; latencies in milliseconds.
+    """
+
+    async def run():
+
+        service = await SignalService(state, port=0).start()
+
+        rows = []
+
+        try:
+
+            for path in paths:
+
+                for clients in concurrency:
+
+                    seconds, latencies = await _load(
+                        service, path, n_requests, clients
+                    )
+
+                    ms = latencies * 1e3
+
+                    rows.append({
+
+                        "path": path,
+                        "clients": clients,
+                        "requests": len(latencies),
+                        "req_per_s": len(latencies) / seconds,
+                        "p50_ms": np.percentile(ms, 50),
+                        "p99_ms": np.percentile(ms, 99),
+                        "max_ms": ms.max()
+
+                    })
+
+        finally:
+            await service.close()
+
+        return rows
+
+    table = pd.DataFrame(asyncio.run(run()))
+
+    # one synthetic next-day row through the incremental path, on a
+    # copy: the caller's state may be serving
+    scratch = copy.deepcopy(state)
+
+    last = scratch.engine.df.iloc[[-1]].copy()
+    last.index = [scratch.last_date + pd.Timedelta(days=1)]
+
+    start = time.perf_counter()
+    scratch.append(last)
+    table.attrs["append_ms"] = (time.perf_counter() - start) * 1e3
+
+    return table
+
+
+if __name__ == "__main__":
+
+    logging.basicConfig(level=logging.WARNING)
+
+    start = time.perf_counter()
+
+    state = SignalState(load_macro_panel(find_project_root()))
+
+    build = time.perf_counter() - start
+
+    table = benchmark_service(state, paths=("/signal", "/health"))
+
+    print(f"state build: {build * 1e3:.0f} ms")
+    print(f"append one row: {table.attrs['append_ms']:.2f} ms")
+    print(table.round(3).to_string(index=False))
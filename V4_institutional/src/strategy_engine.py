@@ -46,6 +46,8 @@ class StrategyEngine:
         # Align data
         # ---------------------------
 
+        # an explicit copy: without Copy-on-Write (pandas < 3) the
+        # selection may be flagged as a view of df
         aligned_df = df.loc[regimes.index].copy()
 
         aligned_df["regime"] = regimes
@@ -0,0 +1,390 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import batch_metrics
+from src.portfolio_engine import (
+    DEFAULT_ALLOCATION_TABLE,
+    MultiAssetRotationEngine,
+    allocation_weights,
+)
+from src.risk_engine import RiskEngine, inverse_vol_scale
+from src.rolling import rolling_std
+
+
+class ParameterSweepEngine:
+    """
+    Batched Parameter Sweep
+
+    Evaluates every combination of rotation, regime, risk budget,
+    cost and vol target parameters of MultiAssetRotationEngine.
+    Sleeves, top_k and selection_weighting are fixed per sweep and
+    allocated with the engine's own kernel.
+
+    Shared inputs (monthly prices, liquidity composite, regime
+    statistics) are built once; per-parameter intermediates
+    (momentum, regime states, asset vols) once per value; the rest
+    runs as array operations over all configurations at once.
+
+    Each configuration reproduces MultiAssetRotationEngine.backtest()
+    with the same parameters (up to float summation order).
+    """
+
+    def __init__(
+        self,
+        df,
+        assets=["NIFTY", "SPY", "GLD"],
+        defensive_asset="GLD",
+        pipeline=None,
+        cost_engine=None,
+        defensive_assets=None,
+        equity_assets=None,
+        top_k=1,
+        selection_weighting="equal"
+    ):
+
+        self.assets = assets
+
+        # pipeline (data_pipeline.Pipeline) caches the per-value
+        # momentum / vol intermediates across sweeps and sessions;
+        # cost_engine adds spread / impact costs (the proportional
+        # rate is the transaction_cost grid of run())
+        self._panel = MultiAssetRotationEngine(
+            df=df,
+            assets=assets,
+            defensive_asset=defensive_asset,
+            defensive_assets=defensive_assets,
+            equity_assets=equity_assets,
+            top_k=top_k,
+            selection_weighting=selection_weighting,
+            pipeline=pipeline,
+            cost_engine=cost_engine
+        )
+
+        # sleeves as resolved by the engine
+        self.defensive_assets = self._panel.defensive_assets
+        self.equity_assets = self._panel.equity_assets
+        self.defensive_asset = self.defensive_assets[0]
+
+        self.results = None
+        self.portfolio_returns = None
+
+    # --------------------------------------------------
+    # Shared Inputs (parameter independent)
+    # --------------------------------------------------
+    def _prepare(self):
+
+        panel = self._panel
+
+        if panel.liquidity is None:
+
+            panel.prepare()
+
+            # Regime statistics do not depend on the thresholds
+            panel.regime_engine.fit_composite(panel.liquidity)
+
+        self.index = panel.monthly_returns.index
+
+        self.returns = panel.monthly_returns[self.assets].to_numpy()
+
+        liquidity_monthly = panel.liquidity_monthly.reindex(self.index)
+
+        self.zscore = (
+            (liquidity_monthly - panel.regime_engine.mean_)
+            / panel.regime_engine.std_
+        ).to_numpy()
+
+    # --------------------------------------------------
+    # Regime States (thresholds × months)
+    # --------------------------------------------------
+    def _regime_states(self, thresholds):
+
+        t = np.asarray(thresholds, dtype=float)
+
+        low = t[:, 0:1]
+        mid = t[:, 1:2]
+        high = t[:, 2:3]
+
+        z = self.zscore[None, :]
+
+        states = np.where(
+            z > high, 2.0,
+            np.where(
+                z > mid, 1.0,
+                np.where(z >= low, 0.0, -1.0)
+            )
+        )
+
+        states[:, np.isnan(self.zscore)] = np.nan
+
+        # Same forward fill as RegimeEngine.classify
+        return (
+            pd.DataFrame(states.T)
+            .ffill()
+            .to_numpy()
+            .T
+        )
+
+    # --------------------------------------------------
+    # Asset Vols per vol_lookback
+    # --------------------------------------------------
+    def _volatility(self, vol_lookback):
+
+        if self._panel.pipeline is not None:
+            vol = self._panel._artifact("volatility", vol_lookback=vol_lookback)
+        else:
+            vol = RiskEngine(
+                returns=self._panel.monthly_returns,
+                vol_lookback=vol_lookback
+            ).compute_volatility()
+
+        return vol.reindex(self.index)[self.assets].to_numpy()
+
+    # --------------------------------------------------
+    # Weights (lookback × thresholds × tables × vol_lookback
+    #          × months × assets)
+    # --------------------------------------------------
+    def _weights(self, lookbacks, thresholds, tables, vol_lookbacks):
+
+        """
+        The engine's allocation kernel (allocation_weights: sleeves,
+        top_k, selection weighting) over every threshold set at
+        once, shifted one month, then the inverse vol risk budget.
+        """
+
+        panel = self._panel
+
+        n_months = len(self.index)
+        n_assets = len(self.assets)
+
+        equity_cols, defensive_cols = panel.sleeve_columns()
+
+        states = self._regime_states(thresholds)
+
+        vols = [self._volatility(v) for v in vol_lookbacks]
+
+        # inverse_vol selection uses the risk budget's vols, so the
+        # raw weights then depend on vol_lookback too
+        per_vol = panel.selection_weighting == "inverse_vol"
+
+        weights = np.empty((
+            len(lookbacks), len(thresholds), len(tables),
+            len(vol_lookbacks), n_months, n_assets
+        ))
+
+        for i, lookback in enumerate(lookbacks):
+
+            if panel.pipeline is not None:
+                mom = panel._artifact("momentum", lookback=lookback)
+            else:
+                mom = panel.monthly_prices.pct_change(lookback)
+
+            mom = np.broadcast_to(
+                mom.reindex(self.index)[self.assets].to_numpy(),
+                (len(thresholds), n_months, n_assets)
+            )
+
+            for j, table in enumerate(tables):
+
+                raw = None
+
+                for v, vol in enumerate(vols):
+
+                    if raw is None or per_vol:
+
+                        raw = allocation_weights(
+                            mom,
+                            states,
+                            table,
+                            equity_cols,
+                            defensive_cols,
+                            top_k=panel.top_k,
+                            weighting=panel.selection_weighting,
+                            vol=np.broadcast_to(vol, mom.shape)
+                        )
+
+                        # Prevent lookahead bias
+                        raw = np.roll(raw, 1, axis=-2)
+                        raw[..., 0, :] = 0.0
+
+                    weights[i, :, j, v] = inverse_vol_scale(raw, vol)
+
+        return weights
+
+    # --------------------------------------------------
+    # Vol Targeting (configs × months)
+    # --------------------------------------------------
+    @staticmethod
+    def _vol_target(raw_returns, lookbacks, target_vols):
+
+        """
+        Returns array (configs, lookbacks, target_vols, months).
+        """
+
+        out = np.empty(
+            (raw_returns.shape[0], len(lookbacks), len(target_vols),
+             raw_returns.shape[1])
+        )
+
+        for i, lookback in enumerate(lookbacks):
+
+            realized_vol = rolling_std(
+                raw_returns, lookback, axis=1
+            ) * (12 ** 0.5)
+
+            for j, target_vol in enumerate(target_vols):
+
+                with np.errstate(divide="ignore"):
+
+                    scaling = np.minimum(target_vol / realized_vol, 2.0)
+
+                prev = np.full_like(scaling, np.nan)
+                prev[:, 1:] = scaling[:, :-1]
+
+                adjusted = raw_returns * prev
+
+                out[:, i, j] = np.where(np.isnan(adjusted), 0.0, adjusted)
+
+        return out
+
+    # --------------------------------------------------
+    # Sweep
+    # --------------------------------------------------
+    def run(
+        self,
+        lookback=(12,),
+        transaction_cost=(0.001,),
+        target_vol=(0.10,),
+        vol_target_lookback=(12,),
+        vol_lookback=(12,),
+        regime_thresholds=((-1.0, 0.0, 1.0),),
+        allocation_tables=None,
+        start=None
+    ):
+
+        """
+        Evaluate the full grid.
+
+        allocation_tables :
+            list of tables, or dict name → table.
+            Defaults to the engine's allocation table.
+
+        start :
+            optional first month included in the metrics
+            (history before it still warms up the rolling stats).
+
+        Returns
+        -------
+        DataFrame with one row per configuration:
+        parameter columns followed by metric columns.
+        Monthly returns per configuration are kept in
+        ``self.portfolio_returns`` (months × configs).
+        """
+
+        self._prepare()
+
+        if allocation_tables is None:
+            allocation_tables = {"default": DEFAULT_ALLOCATION_TABLE}
+
+        if not isinstance(allocation_tables, dict):
+            allocation_tables = dict(enumerate(allocation_tables))
+
+        lookback = list(lookback)
+        transaction_cost = np.asarray(transaction_cost, dtype=float)
+        target_vol = list(target_vol)
+        vol_target_lookback = list(vol_target_lookback)
+        vol_lookback = list(vol_lookback)
+        regime_thresholds = [tuple(t) for t in regime_thresholds]
+
+        table_names = list(allocation_tables)
+        tables = [allocation_tables[k] for k in table_names]
+
+        # -----------------------------------
+        # Weights (L, K, A, V, M, N) → (W, M, N)
+        # -----------------------------------
+        weights = self._weights(
+            lookback, regime_thresholds, tables, vol_lookback
+        )
+
+        n_months = len(self.index)
+
+        weights = weights.reshape(-1, n_months, len(self.assets))
+
+        gross = (weights * self.returns[None]).sum(axis=-1)
+
+        # one pass over all weight matrices: turnover plus the
+        # spread / impact part, proportional costs per grid value
+        turnover, other_cost = self._panel.cost_engine.costs(
+            weights,
+            assets=self.assets,
+            proportional=False
+        )
+
+        # -----------------------------------
+        # Costs (W, C, M) → (W*C, M)
+        # -----------------------------------
+        raw = (
+            gross[:, None, :]
+            - turnover[:, None, :] * transaction_cost[None, :, None]
+            - other_cost[:, None, :]
+        ).reshape(-1, n_months)
+
+        returns = self._vol_target(
+            raw, vol_target_lookback, target_vol
+        ).reshape(-1, n_months)
+
+        turnover = np.repeat(
+            turnover,
+            len(transaction_cost) * len(vol_target_lookback) * len(target_vol),
+            axis=0
+        )
+
+        # -----------------------------------
+        # Results Table
+        # -----------------------------------
+        grid = pd.DataFrame(
+
+            list(itertools.product(
+                lookback,
+                regime_thresholds,
+                table_names,
+                vol_lookback,
+                transaction_cost.tolist(),
+                vol_target_lookback,
+                target_vol
+            )),
+
+            columns=[
+                "lookback",
+                "regime_thresholds",
+                "allocation_table",
+                "vol_lookback",
+                "transaction_cost",
+                "vol_target_lookback",
+                "target_vol"
+            ]
+
+        )
+
+        self.portfolio_returns = pd.DataFrame(
+            returns.T,
+            index=self.index
+        )
+
+        window = np.ones(n_months, dtype=bool)
+
+        if start is not None:
+            window = self.index >= pd.Timestamp(start)
+
+        metrics = batch_metrics(
+            returns[:, window].T,
+            turnover=turnover[:, window].T
+        )
+
+        self.results = pd.concat(
+            [grid, metrics.reset_index(drop=True)],
+            axis=1
+        )
+
+        return self.results
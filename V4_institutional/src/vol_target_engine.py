@@ -1,4 +1,4 @@
-import pandas as pd
+from src.rolling import rolling_std
 
 
 class VolTargetEngine:
@@ -7,21 +7,45 @@ class VolTargetEngine:
         self.target_vol = target_vol
         self.lookback = lookback
 
-    def apply_vol_targeting(
+    def scaling(
         self,
-        portfolio_returns: pd.Series
+        portfolio_returns
     ):
 
-        realized_vol = (
-            portfolio_returns
-            .rolling(self.lookback)
-            .std() * (12 ** 0.5)
-        )
+        """
+        Exposure multiplier applied in each month: target vol over
+        the previous month's realized vol, capped at 2x, 0 before
+        enough history.
+        """
+
+        realized_vol = portfolio_returns.copy()
+
+        realized_vol[:] = rolling_std(
+            portfolio_returns.to_numpy(),
+            self.lookback
+        ) * (12 ** 0.5)
 
         scaling = self.target_vol / realized_vol
 
         scaling = scaling.clip(upper=2.0)  # optional leverage cap
 
-        adjusted_returns = portfolio_returns * scaling.shift(1)
+        return scaling.shift(1).fillna(0.0)
+
+    def apply_vol_targeting(
+        self,
+        portfolio_returns
+    ):
+
+        """
+        Scale returns to the target volatility using the previous
+        month's realized vol.
+
+        Accepts a Series or a DataFrame of many return streams
+        (one column each); all columns go through one rolling pass.
+        """
+
+        adjusted_returns = (
+            portfolio_returns * self.scaling(portfolio_returns)
+        )
 
-        return adjusted_returns.fillna(0.0)
\ No newline at end of file
+        return adjusted_returns.fillna(0.0)
@@ -1,29 +1,99 @@
-print("DEBUG: NEW WALK_FORWARD FILE LOADED")
+import copy
+import logging
+import pickle
 
+import numpy as np
 import pandas as pd
-from src.regime_engine import RegimeEngine
+from src.regime_engine import SMOOTHING_WINDOW, CompositeMoments, RegimeEngine
+from src.parallel import parallel_map, resolve_n_jobs, worker_cache
+from src.profiling import PipelineReport
+
+
+logger = logging.getLogger(__name__)
 
 
 class WalkForwardEngine:
     """
     Institutional Walk Forward Validation Engine
     Regime + Portfolio OOS Execution
+
+    Splits:
+
+    - window="expanding" : train from the first full-feature date
+      (default), or "rolling": the last ``train_years`` only
+    - first test block starts ``warmup_years`` after that date;
+      blocks of ``test_months`` follow back to back
+    - purge_days   : gap between train end and the test block
+                     (the composite's smoothing window spans ~3
+                     observations across the cut)
+    - embargo_days : start of each test block left unscored
+
+    Regime train statistics come from prefix sums of the composite
+    built once, and run() classifies every test block in one pass,
+    so monthly refits cost about what yearly ones do. The portfolio
+    pass still reruns the engine on history up to each test_end.
+    Portfolios rebalance monthly (``rebalance_freq``); refits
+    happen once per test block.
     """
 
     def __init__(
         self,
         data: pd.DataFrame,
         warmup_years: int = 10,
-        rebalance_freq: str = "M"
+        rebalance_freq: str = "M",
+        report=None,
+        pipeline=None,
+        regime_model=None,
+        window="expanding",
+        train_years=None,
+        test_months=12,
+        purge_days=0,
+        embargo_days=0
     ):
 
         if not isinstance(data.index, pd.DatetimeIndex):
             raise ValueError("Data must have DatetimeIndex.")
 
-        self.data = data.sort_index()
+        if window not in ("expanding", "rolling"):
+            raise ValueError("window must be 'expanding' or 'rolling'.")
+
+        if test_months < 1:
+            raise ValueError("test_months must be at least 1.")
+
+        # Sorted panels are referenced, not copied
+        self.data = (
+            data
+            if data.index.is_monotonic_increasing
+            else data.sort_index()
+        )
         self.warmup_years = warmup_years
         self.rebalance_freq = rebalance_freq
 
+        self.window = window
+        self.train_years = warmup_years if train_years is None else train_years
+        self.test_months = test_months
+        self.purge_days = purge_days
+        self.embargo_days = embargo_days
+
+        # Stage timings / counters, shared with serial split engines
+        self.report = PipelineReport() if report is None else report
+
+        # Optional data_pipeline.Pipeline for the portfolio engines
+        self.pipeline = pipeline
+
+        # Optional RegimeEngine-compatible model (e.g. HMMRegimeEngine),
+        # refit per split on copies (never modified here). Models
+        # that warm start are fitted once per run as a chain in
+        # split order, each fit starting from the previous split's,
+        # so results do not depend on n_jobs or earlier runs
+        self.regime_model = regime_model
+
+        # OOS detail of the last run_portfolio_backtest(): the test
+        # block weights, turnover and monthly regimes of each split
+        self.oos_weights = None
+        self.oos_turnover = None
+        self.oos_regimes = None
+
     # --------------------------------------------------
     # Start Date (Full Feature Availability)
     # --------------------------------------------------
@@ -38,9 +108,9 @@ class WalkForwardEngine:
 
         start_date = max(first_valid_dates)
 
-        print(
-            f"V5 Start Date (Full Feature Availability): "
-            f"{start_date}"
+        logger.info(
+            "V5 Start Date (Full Feature Availability): %s",
+            start_date
         )
 
         return start_date
@@ -62,65 +132,150 @@ class WalkForwardEngine:
 
         final_date = data.index.max()
 
-        current_test_start = warmup_end
+        purge = pd.Timedelta(days=self.purge_days)
+        embargo = pd.Timedelta(days=self.embargo_days)
+
+        cutoff = warmup_end
+
+        while cutoff < final_date:
 
-        while current_test_start < final_date:
+            train_end = cutoff - purge
 
-            train_start = start_date
-            train_end = current_test_start
+            if self.window == "rolling":
+                train_start = max(
+                    start_date,
+                    train_end - pd.DateOffset(years=self.train_years)
+                )
+            else:
+                train_start = start_date
 
-            test_start = current_test_start
-            test_end = current_test_start + pd.DateOffset(years=1)
+            test_start = cutoff + embargo
+            test_end = cutoff + pd.DateOffset(months=self.test_months)
 
             if test_end > final_date:
                 test_end = final_date
 
-            splits.append({
+            if test_start <= test_end:
 
-                "train_start": train_start,
-                "train_end": train_end,
+                splits.append({
 
-                "test_start": test_start,
-                "test_end": test_end
+                    "train_start": train_start,
+                    "train_end": train_end,
 
-            })
+                    "test_start": test_start,
+                    "test_end": test_end
 
-            current_test_start = test_end
+                })
 
-        print(f"Generated {len(splits)} walk-forward splits.")
+            cutoff = test_end
+
+        logger.info("Generated %d walk-forward splits.", len(splits))
 
         return splits
 
     # --------------------------------------------------
     # OOS REGIME WALK FORWARD
     # --------------------------------------------------
-    def run(self):
+    def run(self, n_jobs=1):
 
-        splits = self._generate_splits()
-        all_oos_regimes = []
+        """
+        n_jobs > 1 (or -1 for all cores) runs splits on a process
+        pool; output is identical to the serial run. The default
+        z-score model classifies all splits in one pass instead.
+        """
 
-        for split in splits:
+        report = self.report
 
-            print(
-                f"Training "
-                f"{split['train_start']} → "
-                f"{split['train_end']}"
-            )
+        with report.stage("splits", rows=len(self.data)):
+            splits = self._generate_splits()
+
+        liquidity = None
+
+        if self.regime_model is None:
+
+            # composite built once; train stats per split from
+            # prefix sums (the same window a slice-built composite
+            # would leave after its first SMOOTHING_WINDOW rows)
+            with report.stage("liquidity", rows=len(self.data)):
+
+                liquidity = RegimeEngine()._build_liquidity_composite(
+                    self.data
+                )
+
+                moments = CompositeMoments(liquidity)
+
+            splits = [
+
+                dict(split, moments=moments.window(
+                    split["train_start"],
+                    split["train_end"],
+                    skip=SMOOTHING_WINDOW
+                ))
+
+                for split in splits
 
-            train_df = self.data.loc[
-                split["train_start"]:split["train_end"]
             ]
 
-            test_df = self.data.loc[
-                split["test_start"]:split["test_end"]
+        elif _warm_starts(self.regime_model):
+
+            with report.stage("regime_chain", rows=len(splits)):
+
+                models = _regime_chain(
+                    self.regime_model,
+                    [
+                        self.data.loc[s["train_start"]:s["train_end"]]
+                        for s in splits
+                    ],
+                    method="fit"
+                )
+
+            splits = [
+                dict(split, regime_fit=model)
+                for split, model in zip(splits, models)
             ]
 
-            regime_engine = RegimeEngine()
-            regime_engine.fit(train_df)
+        if liquidity is not None and splits:
+
+            with report.stage("regime_splits_batched", rows=len(splits)):
+
+                all_oos_regimes = [_classify_splits(liquidity, splits)]
+
+        elif resolve_n_jobs(n_jobs) > 1:
 
-            test_regimes = regime_engine.predict(test_df)
+            with report.stage("regime_splits_parallel"):
 
-            all_oos_regimes.append(test_regimes)
+                all_oos_regimes = parallel_map(
+                    _regime_split,
+                    self.data,
+                    splits,
+                    n_jobs=n_jobs,
+                    regime_model=self.regime_model
+                )
+
+        else:
+
+            all_oos_regimes = []
+
+            for split in splits:
+
+                logger.debug(
+                    "Training %s → %s",
+                    split["train_start"],
+                    split["train_end"]
+                )
+
+                with report.stage("regime_split"):
+
+                    all_oos_regimes.append(
+                        _regime_split(
+                            self.data,
+                            split,
+                            regime_model=self.regime_model,
+                            liquidity=liquidity
+                        )
+                    )
+
+        report.count("regime_splits", len(splits))
 
         oos_regimes = pd.concat(all_oos_regimes)
 
@@ -133,117 +288,452 @@ class WalkForwardEngine:
         self,
         assets=["NIFTY", "SPY", "GLD"],
         lookback=12,
-        transaction_cost=0.001
+        transaction_cost=0.001,
+        incremental=False,
+        n_jobs=1,
+        compute_dtype="float64",
+        cost_engine=None
     ):
 
+        """
+        Regime statistics are fit on each split's training window
+        (up to train_end, after the purge); the portfolio runs on
+        all history up to test_end.
+
+        Costs are charged once, inside the portfolio engine, by
+        ``cost_engine`` (default: proportional ``transaction_cost``).
+
+        incremental=True builds the monthly panel, momentum and
+        rolling vols once and only refits the regime statistics
+        per split. OOS returns are identical to the default path.
+
+        n_jobs > 1 (or -1 for all cores) runs splits on a process
+        pool. With incremental=True each worker prepares the panel
+        once and reuses it for all of its splits.
+
+        compute_dtype="float32" runs the portfolio engines on
+        float32 asset prices (see portfolio_engine.FLOAT32_TOLERANCE).
+        """
+
         from src.portfolio_engine import MultiAssetRotationEngine
 
-        splits = self._generate_splits()
+        report = self.report
+
+        with report.stage("splits", rows=len(self.data)):
+            splits = self._generate_splits()
 
         # Align portfolio history to asset availability
         asset_start = self.data[assets].dropna().index[0]
 
-        print(f"Portfolio Asset Start Date: {asset_start}")
+        logger.info("Portfolio Asset Start Date: %s", asset_start)
 
-        valid_data = self.data.loc[asset_start:].copy()
+        valid_data = self.data.loc[asset_start:]
 
-        all_oos_returns = []
+        rolling = self.window == "rolling"
 
-        for split in splits:
+        if _warm_starts(self.regime_model):
 
-            print(
-                f"\n==== OOS Portfolio Test "
-                f"{split['test_start']} → "
-                f"{split['test_end']} ===="
-            )
+            # the train windows backtest_until() would fit on
+            with report.stage("regime_chain", rows=len(splits)):
 
-            combined_df = valid_data.loc[
-                :split["test_end"]
-            ].copy()
+                liquidity = self.regime_model._build_liquidity_composite(
+                    valid_data
+                )
 
-            print("Combined DF rows:", len(combined_df))
+                skip = getattr(
+                    self.regime_model, "smoothing_window", SMOOTHING_WINDOW
+                ) if rolling else 0
 
-            portfolio = MultiAssetRotationEngine(
+                models = _regime_chain(
+                    self.regime_model,
+                    [
+                        liquidity.loc[
+                            s["train_start"] if rolling else None:
+                            s["train_end"]
+                        ].iloc[skip:]
+                        for s in splits
+                    ]
+                )
 
-                df=combined_df,
-                assets=assets,
-                lookback=lookback
+            splits = [
+                dict(split, regime_fit=model)
+                for split, model in zip(splits, models)
+            ]
 
-            )
+        split_kwargs = {
 
-            equity = portfolio.backtest()
+            "assets": assets,
+            "lookback": lookback,
+            "transaction_cost": transaction_cost,
+            "incremental": incremental,
+            "pipeline": self.pipeline,
+            "compute_dtype": compute_dtype,
+            "cost_engine": cost_engine,
+            "regime_model": self.regime_model,
+            "rolling": rolling
 
-            # -----------------------------
-            # DIAGNOSTIC SAFETY CHECKS
-            # -----------------------------
+        }
 
-            if portfolio.portfolio_returns is None:
+        if resolve_n_jobs(n_jobs) > 1:
 
-                print("Portfolio returns NONE — skipping.")
-                continue
+            # worker engines keep their own reports
+            with report.stage("portfolio_splits_parallel"):
 
-            if portfolio.portfolio_returns.empty:
+                results = parallel_map(
+                    _portfolio_split,
+                    valid_data,
+                    splits,
+                    n_jobs=n_jobs,
+                    **split_kwargs
+                )
 
-                print("Portfolio returns EMPTY — skipping.")
-                continue
+        else:
 
-            if portfolio.portfolio_returns.isna().all():
+            portfolio = None
 
-                print("Portfolio returns ALL NA — skipping.")
-                continue
+            if incremental:
 
-            gross_returns = portfolio.portfolio_returns
+                portfolio = MultiAssetRotationEngine(
 
-            turnover = (
+                    df=valid_data,
+                    assets=assets,
+                    lookback=lookback,
+                    transaction_cost=transaction_cost,
+                    report=report,
+                    pipeline=self.pipeline,
+                    compute_dtype=compute_dtype,
+                    cost_engine=cost_engine,
+                    regime_model=self.regime_model
 
-                portfolio.weights
-                .diff()
-                .abs()
-                .sum(axis=1)
+                )
 
-            )
+                with report.stage("prepare", rows=len(valid_data)):
+                    portfolio.prepare()
 
-            net_returns = (
+            results = []
 
-                gross_returns
-                - turnover * transaction_cost
+            for split in splits:
 
-            )
+                logger.debug(
+                    "OOS Portfolio Test %s → %s",
+                    split["test_start"],
+                    split["test_end"]
+                )
 
-            oos_returns = net_returns.loc[
+                with report.stage("portfolio_split"):
 
-                split["test_start"]:
-                split["test_end"]
+                    results.append(
+                        _portfolio_split(
+                            valid_data,
+                            split,
+                            portfolio=portfolio,
+                            report=report,
+                            **split_kwargs
+                        )
+                    )
 
-            ]
+        report.count("portfolio_splits", len(splits))
 
-            if oos_returns.empty:
-
-                print("OOS slice empty — skipping.")
-                continue
-
-            all_oos_returns.append(
-                oos_returns
-            )
+        results = [
+            r for r in results if r is not None
+        ]
 
-        if len(all_oos_returns) == 0:
+        if len(results) == 0:
 
             raise RuntimeError(
                 "No valid OOS returns generated. "
                 "Portfolio engine produced no usable data."
             )
 
-        oos_returns = pd.concat(
-            all_oos_returns
+        oos = {}
+
+        for name in ("returns", "weights", "turnover", "regimes"):
+
+            frame = pd.concat([r[name] for r in results])
+
+            oos[name] = frame[~frame.index.duplicated()].sort_index()
+
+        self.oos_weights = oos["weights"]
+        self.oos_turnover = oos["turnover"]
+        self.oos_regimes = oos["regimes"]
+
+        oos_returns = oos["returns"]
+
+        report.count("oos_months", len(oos_returns))
+
+        logger.info("Total OOS Months: %d", len(oos_returns))
+
+        return oos_returns
+
+
+# ==================================================
+# WARM START CHAIN
+# ==================================================
+def _warm_starts(regime_model):
+
+    return regime_model is not None and getattr(
+        regime_model, "warm_start", False
+    )
+
+
+def _regime_chain(regime_model, windows, method="fit_composite"):
+
+    """
+    Copies of ``regime_model`` fitted on each train window in split
+    order, each warm started from the previous split's fit.
+    """
+
+    model = copy.deepcopy(regime_model)
+
+    fitted = []
+
+    for window in windows:
+
+        getattr(model, method)(window)
+
+        fitted.append(copy.deepcopy(model))
+
+    return fitted
+
+
+# ==================================================
+# SPLIT TASKS (module level so process pools can pickle them)
+# ==================================================
+def _regime_split(data, split, regime_model=None, liquidity=None):
+
+    """
+    OOS regimes of one split. With ``split["moments"]`` (prefix sum
+    train statistics) the z-score engine is fit in O(1); a
+    ``split["regime_fit"]`` (warm start chain) is used as fitted.
+    With the prebuilt composite ``liquidity`` the test block is
+    classified from it instead of rebuilding the composite.
+    """
+
+    if "regime_fit" in split:
+
+        regime_engine = split["regime_fit"]
+
+    elif "moments" in split and regime_model is None:
+
+        regime_engine = RegimeEngine()
+
+        regime_engine.fit_moments(*split["moments"])
+
+    else:
+
+        regime_engine = (
+            RegimeEngine() if regime_model is None
+            else copy.deepcopy(regime_model)
         )
 
-        oos_returns = oos_returns[
-            ~oos_returns.index.duplicated()
+        regime_engine.fit(
+            data.loc[split["train_start"]:split["train_end"]]
+        )
+
+    if liquidity is None:
+
+        return regime_engine.predict(
+            data.loc[split["test_start"]:split["test_end"]]
+        )
+
+    # as predict() on the test slice: its first rows have no
+    # smoothed composite
+    return regime_engine.classify(
+        liquidity.loc[split["test_start"]:split["test_end"]]
+        .iloc[SMOOTHING_WINDOW:]
+    )
+
+
+def _classify_splits(liquidity, splits):
+
+    """
+    _regime_split() of every split in one pass over the prebuilt
+    composite: the test blocks are gathered by row position, scored
+    against their split's train distribution (``split["moments"]``)
+    and cut as RegimeEngine.classify does, forward filling within
+    each block. Blocks follow in split order.
+    """
+
+    index = liquidity.index
+    values = liquidity.to_numpy(dtype=np.float64)
+
+    rows = []
+    mean = []
+    std = []
+
+    for split in splits:
+
+        regime_engine = RegimeEngine()
+
+        regime_engine.fit_moments(*split["moments"])
+
+        i = index.searchsorted(split["test_start"], "left")
+        j = index.searchsorted(split["test_end"], "right")
+
+        # as .loc[test_start:test_end].iloc[SMOOTHING_WINDOW:]
+        rows.append(np.arange(min(i + SMOOTHING_WINDOW, j), j))
+
+        mean.append(regime_engine.mean_)
+        std.append(regime_engine.std_)
+
+    lengths = [len(r) for r in rows]
+
+    rows = np.concatenate(rows)
+
+    zscore = (
+        (values[rows] - np.repeat(mean, lengths))
+        / np.repeat(std, lengths)
+    )
+
+    low, mid, high = RegimeEngine().thresholds
+
+    regimes = np.where(
+        zscore > high, 2.0,
+        np.where(zscore > mid, 1.0, np.where(zscore >= low, 0.0, -1.0))
+    )
+
+    # forward fill from the last scored row of the same block; rows
+    # before a block's first score are dropped
+    position = np.arange(len(rows))
+
+    last = np.maximum.accumulate(
+        np.where(np.isnan(zscore), -1, position)
+    )
+
+    block_start = np.repeat(np.cumsum([0] + lengths[:-1]), lengths)
+
+    keep = last >= block_start
+
+    return pd.Series(regimes[last[keep]], index=index[rows[keep]])
+
+
+def _portfolio_split(
+    valid_data,
+    split,
+    assets,
+    lookback,
+    transaction_cost,
+    incremental=False,
+    portfolio=None,
+    report=None,
+    pipeline=None,
+    compute_dtype="float64",
+    cost_engine=None,
+    regime_model=None,
+    rolling=False
+):
+
+    """
+    OOS net returns of one split with the weights, turnover and
+    monthly regimes behind them, or None when the split produced
+    no usable data.
+    """
+
+    from src.portfolio_engine import MultiAssetRotationEngine
+
+    if incremental:
+
+        if portfolio is None:
+
+            # Process pool worker: prepare once, reuse per split
+            cache = worker_cache()
+            # cost engines arrive pickled per task: key on content
+            key = (
+                "portfolio", tuple(assets), lookback, compute_dtype,
+                transaction_cost, pickle.dumps(cost_engine),
+                pickle.dumps(regime_model)
+            )
+
+            if key not in cache:
+
+                cache[key] = MultiAssetRotationEngine(
+
+                    df=valid_data,
+                    assets=assets,
+                    lookback=lookback,
+                    transaction_cost=transaction_cost,
+                    pipeline=pipeline,
+                    compute_dtype=compute_dtype,
+                    cost_engine=cost_engine,
+                    regime_model=regime_model
+
+                )
+
+                cache[key].prepare()
+
+            portfolio = cache[key]
+
+    else:
+
+        combined_df = valid_data.loc[
+            :split["test_end"]
         ]
 
-        print(
-            f"Total OOS Months: "
-            f"{len(oos_returns)}"
+        logger.debug("Combined DF rows: %d", len(combined_df))
+
+        portfolio = MultiAssetRotationEngine(
+
+            df=combined_df,
+            assets=assets,
+            lookback=lookback,
+            transaction_cost=transaction_cost,
+            report=report,
+            pipeline=pipeline,
+            compute_dtype=compute_dtype,
+            cost_engine=cost_engine,
+            regime_model=regime_model
+
         )
 
-        return oos_returns.sort_index()
\ No newline at end of file
+    # regime statistics from the split's training window only
+    equity = portfolio.backtest_until(
+        split["test_end"],
+        start=split["train_start"] if rolling else None,
+        fit_end=split["train_end"],
+        regime_engine=split.get("regime_fit")
+    )
+
+    # -----------------------------
+    # DIAGNOSTIC SAFETY CHECKS
+    # -----------------------------
+
+    if portfolio.portfolio_returns is None:
+
+        logger.warning("Portfolio returns NONE — skipping.")
+        return None
+
+    if portfolio.portfolio_returns.empty:
+
+        logger.warning("Portfolio returns EMPTY — skipping.")
+        return None
+
+    if portfolio.portfolio_returns.isna().all():
+
+        logger.warning("Portfolio returns ALL NA — skipping.")
+        return None
+
+    # already net of costs (charged before vol targeting)
+    net_returns = portfolio.portfolio_returns
+
+    oos_returns = net_returns.loc[
+
+        split["test_start"]:
+        split["test_end"]
+
+    ]
+
+    if oos_returns.empty:
+
+        logger.warning("OOS slice empty — skipping.")
+        return None
+
+    test = slice(split["test_start"], split["test_end"])
+
+    return {
+
+        "returns": oos_returns,
+        "weights": portfolio.weights.loc[test],
+        "turnover": portfolio.turnover.loc[test],
+        "regimes": portfolio.regime_monthly.loc[test]
+
+    }
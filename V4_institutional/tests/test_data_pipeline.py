@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_pipeline import load_dataset, write_dataset
+
+
+def frame(columns, start="2020-01-01", rows=5):
+
+    index = pd.date_range(start, periods=rows, name="date")
+
+    return pd.DataFrame(
+        {c: np.arange(rows, dtype=float) + i for i, c in enumerate(columns)},
+        index=index
+    )
+
+
+def test_rewrite_replaces_the_whole_store(tmp_path):
+
+    path = tmp_path / "store"
+
+    write_dataset(frame(["A", "B"]), str(path))
+
+    # a reader holding the old mapping keeps its values
+    old = load_dataset(str(path))
+
+    new = frame(["C"], start="2021-01-01", rows=3)
+
+    write_dataset(new, str(path))
+
+    assert sorted(os.listdir(path)) == ["C.npy", "index.npy", "meta.json"]
+    assert os.listdir(tmp_path) == ["store"]
+
+    pd.testing.assert_frame_equal(
+        load_dataset(str(path)), new, check_freq=False
+    )
+    pd.testing.assert_frame_equal(old, frame(["A", "B"]), check_freq=False)
+
+
+def test_failed_write_keeps_the_previous_store(tmp_path):
+
+    path = tmp_path / "store"
+
+    write_dataset(frame(["A"]), str(path))
+
+    bad = frame(["A"]).assign(B=list("abcde")).astype({"B": object})
+
+    with pytest.raises(ValueError):
+        write_dataset(bad, str(path))
+
+    assert os.listdir(tmp_path) == ["store"]
+
+    pd.testing.assert_frame_equal(
+        load_dataset(str(path)), frame(["A"]), check_freq=False
+    )
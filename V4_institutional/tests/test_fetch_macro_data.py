@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import fetch_macro_data as fm
+from src.fetch_macro_data import (
+    ASSET_SERIES,
+    MACRO_SERIES,
+    LocalFileProvider,
+    SeriesStore,
+    fetch_all,
+)
+
+
+START = "2000-01-01"
+END = "2002-12-31"
+
+# first refresh sees data up to here
+CUTOFF = "2002-06-28"
+
+
+# ============================
+# FIXTURES
+# ============================
+
+def synthetic_series(seed):
+
+    rng = np.random.default_rng(seed)
+
+    index = pd.bdate_range(START, END)
+
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+
+    return pd.Series(values, index=index, name="value")
+
+
+def write_series(directory, series):
+
+    """
+    One <series_id>.csv per series, as LocalFileProvider reads them.
+    """
+
+    for series_id, values in series.items():
+        values.to_csv(directory / f"{series_id}.csv", index_label="date")
+
+
+class RecordingProvider(LocalFileProvider):
+
+    def __init__(self, directory):
+
+        super().__init__(directory)
+
+        self.requests = []
+
+    def fetch(self, series_id, start, end):
+
+        self.requests.append((series_id, pd.Timestamp(start)))
+
+        return super().fetch(series_id, start, end)
+
+
+@pytest.fixture
+def full_series():
+
+    ids = [sid for _, sid in {**MACRO_SERIES, **ASSET_SERIES}.values()]
+
+    return {sid: synthetic_series(seed) for seed, sid in enumerate(ids)}
+
+
+def run_fetch(root, monkeypatch, provider, refresh):
+
+    monkeypatch.chdir(root)
+
+    return fetch_all(
+        refresh=refresh,
+        providers={"fred": provider, "yahoo": provider},
+        store=SeriesStore(str(root / "series_store")),
+        start=START,
+        end=END
+    )
+
+
+# ============================
+# TESTS
+# ============================
+
+def test_refresh_round_trip_matches_full_download(
+    tmp_path, monkeypatch, full_series
+):
+
+    files = tmp_path / "files"
+    files.mkdir()
+
+    # -----------------------------------
+    # Initial download up to CUTOFF
+    # -----------------------------------
+    write_series(files, {k: s.loc[:CUTOFF] for k, s in full_series.items()})
+
+    run_fetch(tmp_path, monkeypatch, LocalFileProvider(str(files)), False)
+
+    # -----------------------------------
+    # New rows plus one revised observation inside the revision window
+    # -----------------------------------
+    revised = {k: s.copy() for k, s in full_series.items()}
+
+    revised_date = pd.Timestamp(CUTOFF) - pd.Timedelta(days=30)
+    revised_date = revised["SPY"].index[revised["SPY"].index >= revised_date][0]
+
+    revised["SPY"].loc[revised_date] *= 1.05
+
+    write_series(files, revised)
+
+    provider = RecordingProvider(str(files))
+
+    refreshed = run_fetch(tmp_path, monkeypatch, provider, True)
+
+    # only the tail (revision window) was requested
+    window = pd.Timedelta(days=fm.REVISION_WINDOW_DAYS)
+
+    assert all(
+        start >= pd.Timestamp(CUTOFF) - window
+        for _, start in provider.requests
+    )
+
+    # -----------------------------------
+    # Same panel as a full download of the final data
+    # -----------------------------------
+    fresh = tmp_path / "fresh"
+    fresh.mkdir()
+
+    expected = run_fetch(fresh, monkeypatch, LocalFileProvider(str(files)), False)
+
+    pd.testing.assert_frame_equal(refreshed, expected, check_freq=False)
+
+    assert refreshed.loc[revised_date, "SPY"] == revised["SPY"].loc[revised_date]
+
+
+def test_refresh_without_new_data_keeps_panel(
+    tmp_path, monkeypatch, full_series
+):
+
+    files = tmp_path / "files"
+    files.mkdir()
+
+    write_series(files, full_series)
+
+    provider = LocalFileProvider(str(files))
+
+    first = run_fetch(tmp_path, monkeypatch, provider, False)
+    second = run_fetch(tmp_path, monkeypatch, provider, True)
+
+    pd.testing.assert_frame_equal(first, second, check_freq=False)
@@ -0,0 +1,264 @@
+import functools
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fetch_macro_data import (
+    ASSET_SERIES,
+    MACRO_SERIES,
+    FetchOrchestrator,
+    HttpCsvProvider,
+    LocalFileProvider,
+)
+
+
+START = "2000-01-01"
+END = "2001-12-31"
+
+
+# ============================
+# FIXTURES
+# ============================
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def series_dir(tmp_path):
+
+    rng = np.random.default_rng(0)
+
+    index = pd.bdate_range(START, END)
+
+    for _, series_id in {**MACRO_SERIES, **ASSET_SERIES}.values():
+
+        values = pd.Series(rng.normal(size=len(index)).cumsum(), index=index)
+
+        values.to_csv(tmp_path / f"{series_id}.csv", index_label="date")
+
+    return tmp_path
+
+
+class CountingHandler(QuietHandler):
+
+    """
+    Holds each request briefly and records the most requests the
+    server had in flight at once.
+    """
+
+    def do_GET(self):
+
+        server = self.server
+
+        with server.lock:
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+
+        time.sleep(0.02)
+
+        # released before the response: the client is still waiting
+        with server.lock:
+            server.in_flight -= 1
+
+        super().do_GET()
+
+
+def start_server(directory, handler=QuietHandler):
+
+    """
+    Local HTTP server over the series CSVs, on a free port.
+    """
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        functools.partial(handler, directory=str(directory))
+    )
+
+    server.lock = threading.Lock()
+    server.in_flight = server.peak = 0
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def stop_server(server):
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub_server(series_dir):
+
+    server, url = start_server(series_dir)
+
+    yield url
+
+    stop_server(server)
+
+
+def all_requests(start=START, end=END):
+
+    return {
+
+        name: (provider_key, series_id, start, end)
+        for name, (provider_key, series_id)
+        in {**MACRO_SERIES, **ASSET_SERIES}.items()
+
+    }
+
+
+class FlakyProvider(LocalFileProvider):
+
+    """
+    Fails the first ``failures`` calls per series.
+    """
+
+    def __init__(self, directory, failures=1):
+
+        super().__init__(directory)
+
+        self.failures = failures
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def fetch(self, series_id, start, end):
+
+        with self.lock:
+            self.calls[series_id] = self.calls.get(series_id, 0) + 1
+            calls = self.calls[series_id]
+
+        if calls <= self.failures:
+            raise ConnectionError("stub failure")
+
+        return super().fetch(series_id, start, end)
+
+
+class BatchProvider(LocalFileProvider):
+
+    supports_batch = True
+
+    def __init__(self, directory):
+
+        super().__init__(directory)
+
+        self.batches = []
+
+    def fetch_many(self, series_ids, start, end):
+
+        self.batches.append(list(series_ids))
+
+        return super().fetch_many(series_ids, start, end)
+
+
+# ============================
+# TESTS
+# ============================
+
+def test_stub_server_matches_local_files(series_dir, stub_server):
+
+    local = LocalFileProvider(str(series_dir))
+
+    orchestrator = FetchOrchestrator({
+        "fred": HttpCsvProvider(stub_server),
+        "yahoo": HttpCsvProvider(stub_server)
+    })
+
+    results = orchestrator.fetch(all_requests("2000-06-01", END))
+
+    assert set(results) == set(all_requests())
+
+    for name, (_, series_id, start, end) in all_requests("2000-06-01", END).items():
+
+        pd.testing.assert_series_equal(
+            results[name], local.fetch(series_id, start, end)
+        )
+
+
+def test_failed_requests_are_retried(series_dir):
+
+    flaky = FlakyProvider(str(series_dir), failures=2)
+
+    orchestrator = FetchOrchestrator(
+        {"fred": flaky, "yahoo": LocalFileProvider(str(series_dir))},
+        retries=2,
+        backoff=0.0
+    )
+
+    results = orchestrator.fetch(all_requests())
+
+    fred_ids = [sid for key, sid in MACRO_SERIES.values() if key == "fred"]
+
+    assert all(flaky.calls[sid] == 3 for sid in fred_ids)
+    assert all(not results[name].empty for name in results)
+
+
+def test_retries_exhausted_raises(series_dir):
+
+    orchestrator = FetchOrchestrator(
+        {"fred": FlakyProvider(str(series_dir), failures=5),
+         "yahoo": LocalFileProvider(str(series_dir))},
+        retries=1,
+        backoff=0.0
+    )
+
+    with pytest.raises(ConnectionError):
+        orchestrator.fetch(all_requests())
+
+
+def test_batch_provider_gets_one_request(series_dir):
+
+    batch = BatchProvider(str(series_dir))
+
+    orchestrator = FetchOrchestrator({
+        "fred": LocalFileProvider(str(series_dir)),
+        "yahoo": batch
+    })
+
+    results = orchestrator.fetch(all_requests())
+
+    yahoo_ids = [
+        sid for key, sid in {**MACRO_SERIES, **ASSET_SERIES}.values()
+        if key == "yahoo"
+    ]
+
+    assert len(batch.batches) == 1
+    assert sorted(batch.batches[0]) == sorted(yahoo_ids)
+    assert set(results) == set(all_requests())
+
+
+def test_provider_limits_cap_requests_in_flight(series_dir):
+
+    limits = {"fred": 2, "yahoo": 3}
+
+    servers = {key: start_server(series_dir, CountingHandler) for key in limits}
+
+    try:
+
+        orchestrator = FetchOrchestrator(
+            {key: HttpCsvProvider(url) for key, (_, url) in servers.items()},
+            max_workers=16,
+            provider_limits=limits
+        )
+
+        results = orchestrator.fetch(all_requests())
+
+    finally:
+
+        for server, _ in servers.values():
+            stop_server(server)
+
+    assert set(results) == set(all_requests())
+
+    # every provider has more series than its limit, and no more
+    # than the limit were ever in flight
+    for key, limit in limits.items():
+        assert servers[key][0].peak == limit
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.hmm_regime_engine import HMMRegimeEngine
+
+
+# ============================
+# FIXTURES
+# ============================
+
+@pytest.fixture(scope="module")
+def composite():
+
+    # two alternating liquidity regimes plus noise, business days
+    index = pd.bdate_range("2000-01-03", "2011-12-30")
+
+    rng = np.random.default_rng(3)
+
+    level = np.where((np.arange(len(index)) // 250) % 2, 1.0, -1.0)
+
+    return pd.Series(level + rng.normal(0, 0.4, len(index)), index=index)
+
+
+# ============================
+# TESTS
+# ============================
+
+@pytest.mark.parametrize("frequency", ["ME", "QE", "W-FRI"])
+def test_classify_is_causal_at_any_frequency(composite, frequency):
+
+    engine = HMMRegimeEngine(frequency=frequency, n_restarts=2)
+
+    engine.fit_composite(composite.loc[:"2005-12-31"])
+
+    full = engine.classify(composite)
+
+    assert full.index.equals(composite.index)
+
+    # a day's regime only depends on the composite up to that day
+    for day in composite.index[::97]:
+
+        truncated = engine.classify(composite.loc[:day])
+
+        assert truncated.loc[day] == full.loc[day]
+
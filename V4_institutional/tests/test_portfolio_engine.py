@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.portfolio_engine import DEFAULT_ALLOCATION_TABLE, allocation_weights
+
+
+EQUITIES = ["E0", "E1", "E2", "E3", "E4"]
+DEFENSIVE = ["GLD", "BOND"]
+
+ASSETS = EQUITIES + DEFENSIVE
+
+
+# ============================
+# REFERENCE (the per-date loop the kernel replaced)
+# ============================
+
+def reference_weights(momentum, regime, top_k, weighting):
+
+    weights = pd.DataFrame(0.0, index=momentum.index, columns=ASSETS)
+
+    for date in momentum.index:
+
+        if momentum.loc[date].isna().all():
+            continue
+
+        equity_share, defensive_share = DEFAULT_ALLOCATION_TABLE.get(
+            regime.loc[date], (0.0, 1.0)
+        )
+
+        ranked = (
+            momentum.loc[date, EQUITIES]
+            .dropna()
+            .sort_values(ascending=False, kind="stable")
+        )
+
+        picks = list(ranked.index[:top_k])
+
+        if picks:
+
+            if weighting == "rank":
+                sleeve = np.arange(len(picks), 0, -1) + top_k - len(picks)
+            else:
+                sleeve = np.ones(len(picks))
+
+            weights.loc[date, picks] = (
+                equity_share * sleeve / sleeve.sum()
+            )
+
+        weights.loc[date, DEFENSIVE] = defensive_share / len(DEFENSIVE)
+
+    return weights
+
+
+# ============================
+# FIXTURES
+# ============================
+
+@pytest.fixture(scope="module")
+def inputs():
+
+    rng = np.random.default_rng(7)
+
+    index = pd.date_range("2000-01-31", periods=120, freq="ME")
+
+    # coarse momentum: many ties, plus missing estimates
+    momentum = pd.DataFrame(
+        np.round(rng.normal(0, 0.1, (len(index), len(ASSETS))), 1),
+        index=index,
+        columns=ASSETS
+    )
+
+    momentum = momentum.mask(rng.random(momentum.shape) < 0.2)
+    momentum.iloc[:12] = np.nan
+
+    regime = pd.Series(
+        rng.integers(-1, 3, len(index)).astype(float), index=index
+    )
+
+    return momentum, regime
+
+
+# ============================
+# TESTS
+# ============================
+
+@pytest.mark.parametrize("weighting", ["equal", "rank"])
+@pytest.mark.parametrize("top_k", [1, 2, 3, 5])
+def test_allocation_kernel_matches_reference_loop(inputs, top_k, weighting):
+
+    momentum, regime = inputs
+
+    tied = momentum[EQUITIES].apply(
+        lambda row: row.dropna().duplicated().any(), axis=1
+    )
+
+    assert tied.sum() > 50
+
+    weights = allocation_weights(
+        momentum.to_numpy(),
+        regime.to_numpy(),
+        DEFAULT_ALLOCATION_TABLE,
+        [ASSETS.index(a) for a in EQUITIES],
+        [ASSETS.index(a) for a in DEFENSIVE],
+        top_k=top_k,
+        weighting=weighting
+    )
+
+    np.testing.assert_allclose(
+        weights,
+        reference_weights(momentum, regime, top_k, weighting),
+        rtol=0,
+        atol=1e-15
+    )
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.rolling import ewma_mean, ewma_std, rolling_mean, rolling_std
+
+
+# ============================
+# FIXTURES
+# ============================
+
+@pytest.fixture(scope="module")
+def stack():
+
+    # returns-like series with gaps, a late start and an empty one
+    rng = np.random.default_rng(0)
+
+    x = rng.normal(0.01, 0.05, (2000, 4))
+
+    x[rng.random(x.shape) < 0.1] = np.nan
+    x[:50, 1] = np.nan
+    x[:, 3] = np.nan
+
+    return x
+
+
+# ============================
+# TESTS
+# ============================
+
+@pytest.mark.parametrize("window", [2, 12, 60])
+def test_rolling_kernels_match_pandas(stack, window):
+
+    frame = pd.DataFrame(stack).rolling(window)
+
+    np.testing.assert_allclose(
+        rolling_mean(stack, window), frame.mean(), rtol=0, atol=1e-14
+    )
+    np.testing.assert_allclose(
+        rolling_std(stack, window), frame.std(), rtol=0, atol=1e-14
+    )
+
+
+@pytest.mark.parametrize("alpha", [0.001, 0.06, 0.5, 1.0])
+def test_ewma_kernels_match_pandas(stack, alpha):
+
+    frame = pd.DataFrame(stack).ewm(
+        alpha=alpha, adjust=False, ignore_na=True
+    )
+
+    np.testing.assert_allclose(
+        ewma_mean(stack, alpha), frame.mean(), rtol=0, atol=1e-14
+    )
+    np.testing.assert_allclose(
+        ewma_std(stack, alpha), frame.std(bias=True), rtol=0, atol=1e-14
+    )
+
+    # time along another axis
+    np.testing.assert_array_equal(
+        ewma_mean(stack.T, alpha, axis=1), ewma_mean(stack, alpha).T
+    )
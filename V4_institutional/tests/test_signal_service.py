@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_pipeline import CSV_NAME, DATA_DIR, load_macro_panel
+from src.regime_engine import LIQUIDITY_COLUMNS, RegimeEngine
+from src.signal_service import (
+    PanelFileSource,
+    SignalService,
+    SignalState,
+    benchmark_service,
+)
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ASSETS = ["NIFTY", "SPY", "GLD"]
+
+FIT_END = "2015-12-31"
+
+# mid-month: the first appended row lands in the month the state
+# was built in
+BUILT = "2020-06-15"
+LATEST = "2020-09-30"
+
+
+# ============================
+# FIXTURES
+# ============================
+
+@pytest.fixture(scope="module")
+def panel():
+
+    df = pd.read_csv(
+        os.path.join(ROOT, DATA_DIR, CSV_NAME),
+        index_col=0,
+        parse_dates=True
+    )
+
+    return df.loc[df[ASSETS].dropna().index[0]:LATEST]
+
+
+def assert_same_signal(state, expected):
+
+    assert state.last_date == expected.last_date
+    assert state.regime == expected.regime
+
+    np.testing.assert_allclose(
+        state.weights.to_numpy(), expected.weights.to_numpy(),
+        rtol=0, atol=1e-12
+    )
+
+
+# ============================
+# STREAMING REGIME
+# ============================
+
+def test_streaming_update_matches_predict(panel):
+
+    batch = RegimeEngine()
+    batch.fit(panel.loc[:FIT_END])
+
+    expected = batch.predict(panel).reindex(panel.index)
+
+    stream = RegimeEngine()
+    stream.fit(panel.loc[:FIT_END])
+    stream.prime(panel.loc[:BUILT])
+
+    rows = panel.loc[panel.index > pd.Timestamp(BUILT), LIQUIDITY_COLUMNS]
+
+    regimes = [stream.update(row) for row in rows.to_dict("records")]
+
+    np.testing.assert_array_equal(
+        np.asarray(regimes, dtype=float),
+        expected.loc[rows.index].to_numpy(dtype=float)
+    )
+
+
+# ============================
+# SIGNAL STATE
+# ============================
+
+def test_mid_month_append_matches_fresh_state(panel):
+
+    state = SignalState(panel.loc[:BUILT], fit_end=FIT_END)
+
+    new = panel.loc[panel.index > pd.Timestamp(BUILT)]
+
+    # one row at a time, as POST /update delivers them
+    for date in new.index:
+        assert state.append(new.loc[[date]]) == 1
+
+    assert_same_signal(state, SignalState(panel, fit_end=FIT_END))
+
+
+def test_rejected_update_leaves_state_unchanged(panel):
+
+    state = SignalState(panel.loc[:BUILT], fit_end=FIT_END)
+
+    before = (
+        state.last_date,
+        state.regime,
+        state.weights.copy(),
+        dict(state.engine.regime_engine._levels)
+    )
+
+    new = panel.loc[panel.index > pd.Timestamp(BUILT)].astype(object)
+    new.iloc[-1, new.columns.get_loc("US_M2")] = "n/a"
+
+    with pytest.raises(ValueError):
+        state.append(new)
+
+    assert state.last_date == before[0]
+    assert state.regime == before[1]
+    pd.testing.assert_series_equal(state.weights, before[2])
+    assert state.engine.regime_engine._levels == before[3]
+
+    # the valid rows still apply cleanly afterwards
+    state.append(panel.loc[panel.index > pd.Timestamp(BUILT)])
+
+    assert_same_signal(state, SignalState(panel, fit_end=FIT_END))
+
+
+def test_post_update_mid_month(panel):
+
+    service = SignalService(SignalState(panel.loc[:BUILT], fit_end=FIT_END))
+
+    row = panel.loc[panel.index > pd.Timestamp(BUILT)].iloc[:1]
+
+    body = json.dumps([{
+        "date": row.index[0].strftime("%Y-%m-%d"),
+        **{c: float(row[c].iloc[0]) for c in LIQUIDITY_COLUMNS + ASSETS}
+    }]).encode()
+
+    status, payload = service._route("POST", "/update", body)
+
+    assert status == 200
+    assert json.loads(payload)["rows_applied"] == 1
+
+    status, payload = service._route("GET", "/health", b"")
+
+    assert json.loads(payload)["date"] == row.index[0].strftime("%Y-%m-%d")
+
+
+def test_malformed_content_length_is_rejected(panel):
+
+    service = SignalService(SignalState(panel.loc[:BUILT], fit_end=FIT_END))
+
+    async def request():
+
+        await service.start()
+
+        try:
+
+            reader, writer = await asyncio.open_connection(
+                service.host, service.port
+            )
+
+            writer.write(
+                b"POST /update HTTP/1.1\r\n"
+                b"Content-Length: ten\r\n\r\n"
+            )
+
+            await writer.drain()
+
+            response = await reader.read()
+
+            writer.close()
+
+            return response
+
+        finally:
+            await service.close()
+
+    response = asyncio.run(request())
+
+    assert response.startswith(b"HTTP/1.1 400")
+    assert b"Connection: close" in response
+
+
+def test_benchmark_leaves_state_unchanged(panel):
+
+    state = SignalState(panel.loc[:BUILT], fit_end=FIT_END)
+
+    last_date, weights = state.last_date, state.weights.copy()
+
+    benchmark_service(state, n_requests=20, concurrency=(1,))
+
+    assert state.last_date == last_date
+    pd.testing.assert_series_equal(state.weights, weights)
+
+
+def test_panel_file_source_round_trip(panel, tmp_path):
+
+    data_dir = tmp_path / DATA_DIR
+    data_dir.mkdir()
+
+    csv_path = data_dir / CSV_NAME
+
+    panel.loc[:BUILT].to_csv(csv_path)
+
+    state = SignalState(load_macro_panel(str(tmp_path)), fit_end=FIT_END)
+
+    source = PanelFileSource(str(tmp_path))
+
+    assert source.new_rows(state.last_date) is None
+
+    panel.to_csv(csv_path)
+
+    # make sure the rewrite is seen even on coarse mtime clocks
+    os.utime(csv_path, (source.mtime + 1,) * 2)
+
+    rows = source.new_rows(state.last_date)
+
+    assert state.append(rows) == len(rows) > 0
+
+    assert_same_signal(state, SignalState(panel, fit_end=FIT_END))